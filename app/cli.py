@@ -2,11 +2,22 @@ import os
 import click
 import pandas as pd
 from fetcher import DataFetcher
+from fetcher.Yahoo import fetch_symbols
 from backtesting.test import GOOG
-from fetcher import DataAggregator
+from fetcher import DataAggregator, AsyncDataAggregator, AlphaDataAggregator
+from fetcher.AlphaData import create_month_range, interval_timespan
+from fetcher.Transport import shared_transport
+from fetcher.Polygon import month_range
+from fetcher.Planner import plan_backfill
+from fetcher.Scheduler import BackfillScheduler
+from fetcher.Journal import FetchJournal, journal_path
 from backtest.RunTest import do_backtesting
 from data.Data import DataResampler, DataLoder
-from utils import total_months_month_array, combine_csv_files_data, convert_to_minutes
+from data.Store import BarStore, STORE_ROOT, migrate_csv_tree
+from data.Cache import ResampleCache
+from data.Ingest import read_bars
+from data.Catalog import DataCatalog, CATALOG_PATH
+from utils import total_months_month_array, combine_csv_files_data, convert_to_minutes, read_symbols
 # from test.Backtest import test_run
 
 # Define the main CLI group
@@ -22,26 +33,113 @@ def data_fetch():
     pass
 
 @data_fetch.command()
-@click.option('--symbol', prompt='Stock Symbol', help='The stock symbol to fetch data for.')
+@click.option('--symbol', prompt='Stock Symbol', help='The stock symbol to fetch data for (comma-separated for several).')
 @click.option('--start_date', prompt='Start Date (YYYY-MM-DD)', help='The start date for fetching data.')
 @click.option('--end_date', prompt='End Date (YYYY-MM-DD)', help='The end date for fetching data.')
 @click.option('--interval', default='1m', help='Comma-separated list of interval (default: 1m, 30m,1h)')
-def yahoo(symbol, start_date, end_date, interval):
-    data_fetcher = DataFetcher(symbol, start_date, end_date)
+@click.option('--max_workers', default=4, help='Chunks downloaded in parallel')
+@click.option('--csv_root', default=None, help='Also append the bars to one CSV file per series under this directory, e.g. ./data')
+def yahoo(symbol, start_date, end_date, interval, max_workers, csv_root):
+    symbols = read_symbols(symbol)
+    if len(symbols) > 1:
+        fetch_symbols(symbols, start_date, end_date, interval, max_workers=max_workers, csv_root=csv_root)
+        return
+    data_fetcher = DataFetcher(symbol, start_date, end_date, max_workers=max_workers, csv_root=csv_root)
     data_fetcher.fetch_data(interval)
 
 @data_fetch.command()
 @click.option('--symbol', prompt='Stock Symbol', help='The stock symbol to fetch data for.')
 @click.option('--start_date', prompt='Start Date (YYYY-MM-dd)', help='The start date for fetching data.')
 @click.option('--end_date', prompt='End Date (YYYY-MM-dd)', help='The end date for fetching data.')
-def polygon(symbol, start_date, end_date):
+@click.option('--requests_per_minute', default=5, help='API rate limit of your Polygon plan')
+@click.option('--burst', default=None, type=int, help='Requests allowed back to back (default: requests_per_minute)')
+@click.option('--concurrency', default=4, help='Requests kept in flight at once')
+@click.option('--offline', is_flag=True, help='Serve responses only from the HTTP cache, never the network')
+@click.option('--full', is_flag=True, help='Refetch every month instead of only the trading days missing from the store')
+@click.option('--merge_gap', default=0, help='Merge requests separated by at most this many stored trading days')
+@click.option('--resume', is_flag=True, help='Continue the unfinished requests of the last journaled run for SYMBOL')
+@click.option('--csv_root', default=None, help='Also append the bars to one CSV file per series under this directory, e.g. ./data')
+def polygon(symbol, start_date, end_date, requests_per_minute, burst, concurrency, offline, full, merge_gap, resume, csv_root):
     provider = "POLYGON"
     API_KEY = os.getenv('POLYGON_API_KEY')
     intervals_timespans = [{'interval': 1, 'timespan': 'minute'}]
-    _, month_array = total_months_month_array(start_date, end_date)
+    shared_transport().offline = offline
+    journal = FetchJournal.load(journal_path(provider, symbol)) if resume else FetchJournal(journal_path(provider, symbol))
+
+    ranges = []
+    if journal.jobs:
+        print(f"Resuming {len(journal.unfinished(symbol))} unfinished requests from {journal.path}")
+    elif full:
+        _, month_array = total_months_month_array(start_date, end_date)
+        ranges = [month_range(start_day) for start_day in month_array]
+    else:
+        ranges = plan_backfill(symbol, start_date, end_date, provider=provider, timespan='minute', merge_gap=merge_gap)
+        print(f"{len(ranges)} requests cover the missing trading days: {ranges}")
     
-    aggregator = DataAggregator(api_key=API_KEY, symbol=symbol, month_array=month_array, provider=provider)
+    aggregator = AsyncDataAggregator(api_key=API_KEY, symbol=symbol, ranges=ranges, provider=provider,
+                                     requests_per_minute=requests_per_minute, burst=burst, concurrency=concurrency,
+                                     journal=journal, csv_root=csv_root)
+    aggregator.run(intervals_timespans=intervals_timespans)
+    aggregator.fetcher.transport.report()
+    journal.report()
+
+@data_fetch.command()
+@click.option('--symbols', default='', help='Comma-separated list of stock symbols, e.g., SPY,QQQ,AAPL')
+@click.option('--symbols_file', default=None, help='File with one symbol per line')
+@click.option('--start_date', prompt='Start Date (YYYY-MM-dd)', help='The start date for fetching data.')
+@click.option('--end_date', prompt='End Date (YYYY-MM-dd)', help='The end date for fetching data.')
+@click.option('--requests_per_minute', default=5, help='API rate limit of your Polygon plan, shared by all symbols')
+@click.option('--burst', default=None, type=int, help='Requests allowed back to back (default: requests_per_minute)')
+@click.option('--concurrency', default=4, help='Requests kept in flight at once')
+@click.option('--offline', is_flag=True, help='Serve responses only from the HTTP cache, never the network')
+@click.option('--merge_gap', default=0, help='Merge requests separated by at most this many stored trading days')
+@click.option('--resume', is_flag=True, help='Continue the unfinished requests of the last journaled universe run')
+@click.option('--csv_root', default=None, help='Also append the bars to one CSV file per series under this directory, e.g. ./data')
+def polygon_universe(symbols, symbols_file, start_date, end_date, requests_per_minute, burst, concurrency, offline, merge_gap, resume, csv_root):
+    """Backfill many Polygon symbols under one shared rate budget"""
+    journal = FetchJournal.load(journal_path('POLYGON', 'universe')) if resume else FetchJournal(journal_path('POLYGON', 'universe'))
+    symbol_list = read_symbols(symbols, symbols_file)
+    if journal.jobs:
+        print(f"Resuming {len(journal.unfinished())} unfinished requests from {journal.path}")
+        symbol_list = list(dict.fromkeys(symbol_list + [job['symbol'] for job in journal.jobs.values()]))
+    if not symbol_list:
+        print("No symbols given, use --symbols or --symbols_file")
+        exit(0)
+    shared_transport().offline = offline
+
+    scheduler = BackfillScheduler(os.getenv('POLYGON_API_KEY'), symbol_list, start_date, end_date,
+                                  requests_per_minute=requests_per_minute, burst=burst, concurrency=concurrency,
+                                  merge_gap=merge_gap, journal=journal, csv_root=csv_root)
+    scheduler.run()
+    shared_transport().report()
+    journal.report()
+
+@data_fetch.command()
+@click.option('--symbol', prompt='Stock Symbol', help='The stock symbol to fetch data for.')
+@click.option('--start_month', prompt='Start Month (YYYY-MM)', help='The first month to fetch.')
+@click.option('--end_month', prompt='End Month (YYYY-MM)', help='The last month to fetch.')
+@click.option('--interval', default='1min', help='Comma-separated list of intervals (1min,5min,15min,30min,60min)')
+@click.option('--requests_per_minute', default=5, help='API rate limit of your Alpha Vantage plan')
+@click.option('--burst', default=None, type=int, help='Requests allowed back to back (default: requests_per_minute)')
+@click.option('--concurrency', default=2, help='Requests kept in flight at once')
+@click.option('--offline', is_flag=True, help='Serve responses only from the HTTP cache, never the network')
+@click.option('--resume', is_flag=True, help='Continue the unfinished months of the last journaled run for SYMBOL')
+@click.option('--csv_root', default=None, help='Also append the bars to one CSV file per series under this directory, e.g. ./data')
+def alpha(symbol, start_month, end_month, interval, requests_per_minute, burst, concurrency, offline, resume, csv_root):
+    """Fetch intraday bars from Alpha Vantage into the bar store"""
+    intervals_timespans = [{'interval': item, 'timespan': interval_timespan(item)[1]} for item in interval.split(',')]
+    shared_transport().offline = offline
+    journal = FetchJournal.load(journal_path('ALPHA', symbol)) if resume else FetchJournal(journal_path('ALPHA', symbol))
+    if journal.jobs:
+        print(f"Resuming {len(journal.unfinished(symbol))} unfinished requests from {journal.path}")
+
+    aggregator = AlphaDataAggregator(api_key=os.getenv('ALPHA_VANTAGE_API_KEY'), symbol=symbol,
+                                     month_array=create_month_range(start_month, end_month),
+                                     requests_per_minute=requests_per_minute, burst=burst, concurrency=concurrency,
+                                     journal=journal, csv_root=csv_root)
     aggregator.run(intervals_timespans=intervals_timespans)
+    aggregator.fetcher.transport.report()
+    journal.report()
 
 # Analysis commands
 @click.group()
@@ -50,8 +148,11 @@ def data_analysis():
     pass
 
 @data_analysis.command()
+@click.option('--symbol', prompt='Stock Symbol', help='The stock symbol which you are working for.')
+@click.option('--date', prompt='Date (YYYY-MM-dd-YYYY-MM-dd)', help='The date for create data analysing path.')
 @click.option('--data_directory', prompt='data directory', help='data directory, e.g., ./data/POLYGON/minute')
-def analysis(symbol, date, data_directory):
+@click.option('--chunksize', default=100000, help='Rows read per file per merge step; bounds peak memory')
+def analysis(symbol, date, data_directory, chunksize):
     print(f"symbol: {symbol}, date: {date}, data_directory: {data_directory}")
     output_file=f"./data/{symbol}"
     
@@ -62,7 +163,67 @@ def analysis(symbol, date, data_directory):
         print("Something wrong!")
         exit(0)
     
-    combine_csv_files_data(input_directory=data_directory, output_file=f"{output_file}/{date}.csv")
+    combine_csv_files_data(input_directory=data_directory, output_file=f"{output_file}/{date}.csv", chunksize=chunksize)
+
+@data_analysis.command()
+@click.option('--data_directory', prompt='data directory', help='data directory, e.g., ./data/POLYGON/minute')
+@click.option('--file_number', default=0, help='Which number of file to resample')
+@click.option('--intervals', default='1min,5min,15min,30min,1h,1d', help='Comma-separated list of intervals built in one pass')
+@click.option('--symbol', default=None, help='Read SYMBOL from the bar store instead of a CSV file')
+@click.option('--provider', default='POLYGON', help='Bar store provider used with --symbol')
+@click.option('--source', default='store', type=click.Choice(['store', 'catalog']), help='Where --symbol data is read from')
+@click.option('--start', default=None, help='Start date (YYYY-MM-DD) of the --symbol data')
+@click.option('--end', default=None, help='End date (YYYY-MM-DD) of the --symbol data')
+def resample(data_directory, file_number, intervals, symbol, provider, source, start, end):
+    """Resample 1-minute data to several intervals at once (volume-weighted VW, saved as INTERVAL_ladder_FILE)"""
+    data_catalog = DataCatalog() if source == 'catalog' else None
+    resampler = DataResampler(data_directory, file_number, symbol=symbol, provider=provider,
+                              catalog=data_catalog, start=start, end=end)
+    output_files = resampler.process_ladder(intervals.split(','))
+    for interval, output_file in output_files.items():
+        print(f"{interval}: {output_file}")
+
+# Bar store commands
+@click.group()
+def store():
+    """Manage the columnar bar store"""
+    pass
+
+@store.command()
+@click.option('--data_directory', default='./data', help='Root of the provider CSV tree, e.g., ./data')
+@click.option('--store_root', default=STORE_ROOT, help='Bar store root directory')
+def migrate(data_directory, store_root):
+    """Convert the existing provider CSV files into the bar store"""
+    migrated = migrate_csv_tree(data_root=data_directory, store=BarStore(store_root))
+    print(f"Migrated {len(migrated)} CSV files into {store_root}")
+
+# Dataset catalog commands
+@click.group()
+def catalog():
+    """Index the bar store partitions and provider CSV files by symbol and date range"""
+    pass
+
+@catalog.command()
+@click.option('--data_directory', default='./data', help='Root of the provider CSV tree, e.g., ./data')
+@click.option('--store_root', default=STORE_ROOT, help='Bar store root directory')
+@click.option('--catalog_path', default=CATALOG_PATH, help='Catalog database file')
+def scan(data_directory, store_root, catalog_path):
+    """Register new or changed partitions and CSV files and forget deleted ones"""
+    DataCatalog(catalog_path).scan(data_directory, BarStore(store_root, catalog=False))
+
+@catalog.command(name='list')
+@click.option('--symbol', prompt='Stock Symbol', help='The stock symbol to list files for.')
+@click.option('--provider', default='POLYGON', help='Data provider')
+@click.option('--timespan', default='minute', help='Catalog interval key, e.g., minute or 1h')
+@click.option('--start', default=None, help='Start date (YYYY-MM-DD)')
+@click.option('--end', default=None, help='End date (YYYY-MM-DD)')
+@click.option('--catalog_path', default=CATALOG_PATH, help='Catalog database file')
+def list_files(symbol, provider, timespan, start, end, catalog_path):
+    """List the catalogued partitions and files covering a date range"""
+    for row in DataCatalog(catalog_path).find(symbol, provider, timespan, start, end):
+        first = pd.Timestamp(row['start_ms'], unit='ms')
+        last = pd.Timestamp(row['end_ms'], unit='ms')
+        print(f"{first} - {last} {row['rows']:>8} rows {row['path']}")
 
 # Backtest commands
 @click.group()
@@ -74,7 +235,16 @@ def backtest():
 @click.option('--data_directory', prompt='data directory', help='data directory, e.g., ./data/SPY')
 @click.option('--file_number', default=0, help='Which number of file to use for backtesting')
 @click.option('--interval', default="15min", help='Intervals for split the data (eg., 1min, 15min, 1h, 1d)')
-def run(data_directory, file_number, interval):
+@click.option('--symbol', default=None, help='Read SYMBOL from the bar store instead of a CSV file')
+@click.option('--provider', default='POLYGON', help='Bar store provider used with --symbol')
+@click.option('--cache_mb', default=1024, help='Disk budget of the resample cache in MB (0 disables it)')
+@click.option('--engine', default='pandas', type=click.Choice(['pandas', 'numpy']), help='Resample aggregation engine')
+@click.option('--chunksize', default=0, help='Resample the CSV out of core, reading this many rows at a time (0 loads it whole)')
+@click.option('--price_dtype', default='float64', type=click.Choice(['float64', 'float32']), help='dtype of price columns read from CSV files')
+@click.option('--source', default='store', type=click.Choice(['store', 'catalog']), help='Where --symbol data is read from')
+@click.option('--start', default=None, help='Start date (YYYY-MM-DD) of the --symbol data')
+@click.option('--end', default=None, help='End date (YYYY-MM-DD) of the --symbol data')
+def run(data_directory, file_number, interval, symbol, provider, cache_mb, engine, chunksize, price_dtype, source, start, end):
 
     data = None
 
@@ -88,13 +258,21 @@ def run(data_directory, file_number, interval):
         print(f"Error: {e}")
         exit(0)
 
+    data_catalog = DataCatalog() if source == 'catalog' else None
+
     if interval_minutes <= 30:
-        resampler = DataResampler(data_directory, file_number)
-        file_path = resampler.process(interval)
-        data = pd.read_csv(file_path)
+        cache = ResampleCache(max_bytes=cache_mb * 1024 * 1024) if cache_mb > 0 else False
+        resampler = DataResampler(data_directory, file_number, symbol=symbol, provider=provider, cache=cache, engine=engine, price_dtype=price_dtype,
+                                  catalog=data_catalog, start=start, end=end)
+        if chunksize > 0 and not symbol:
+            file_path = resampler.process_stream(interval, chunksize)
+        else:
+            file_path = resampler.process(interval)
+        data = read_bars(file_path, price_dtype=price_dtype)
     else:
         # Load data
-        loader = DataLoder(data_directory, file_number)
+        loader = DataLoder(data_directory, file_number, symbol=symbol, provider=provider, price_dtype=price_dtype,
+                           catalog=data_catalog, start=start, end=end)
         data = loader.load()
 
     print("Run Backtest....")
@@ -165,6 +343,9 @@ def run(data_directory, file_number, interval):
 # main.add_command(polygon_data_fetch)
 main.add_command(data_fetch)
 main.add_command(analysis)
+main.add_command(resample)
+main.add_command(store)
+main.add_command(catalog)
 main.add_command(backtest)
 # main.add_command(test)
 
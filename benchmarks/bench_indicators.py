@@ -0,0 +1,106 @@
+"""Compare the ta and NumPy backends of MomentumIndicators on a long minute series.
+
+Usage: python benchmarks/bench_indicators.py [bars] [repeat]
+
+A random-walk OHLC series of ``bars`` rows (1,000,000 by default) is run
+through every indicator on both backends; the NumPy results are checked
+against ta (same NaN warm-up, absolute difference within TOLERANCE).
+The batch ``*_grid`` methods are then timed against one NumPy call per
+parameter over a typical sweep, and checked row by row against those calls.
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators.Indicators import MomentumIndicators
+
+M = MomentumIndicators
+
+TOLERANCE = 1e-9
+
+INDICATORS = {
+    'rsi': lambda df, backend: MomentumIndicators.rsi(df, backend=backend),
+    'macd': lambda df, backend: MomentumIndicators.macd(df, backend=backend),
+    'so': lambda df, backend: MomentumIndicators.so(df, backend=backend),
+    'so_signal': lambda df, backend: MomentumIndicators.so_signal(df, backend=backend),
+    'wr': lambda df, backend: MomentumIndicators.wr(df, backend=backend),
+}
+
+PERIODS = list(range(5, 51))
+MACD_COMBINATIONS = [(short, long, signal) for short in range(6, 16, 2) for long in range(20, 40, 4) for signal in (5, 9, 13)]
+SMA_PERIODS = list(range(5, 201, 5))
+
+# name: (grid call, one call per parameter returning the matching rows)
+GRIDS = {
+    'rsi': (lambda df: M.rsi_grid(df, PERIODS),
+            lambda df: [M.rsi(df, period=period, backend='numpy') for period in PERIODS]),
+    'macd': (lambda df: M.macd_grid(df, MACD_COMBINATIONS)[0],
+             lambda df: [M.macd(df, short=short, long=long, signal=signal, backend='numpy')[0]
+                         for short, long, signal in MACD_COMBINATIONS]),
+    'sma': (lambda df: M.sma_grid(df, SMA_PERIODS),
+            lambda df: [df['Close'].rolling(period).mean() for period in SMA_PERIODS]),
+    'so': (lambda df: M.so_grid(df, PERIODS),
+           lambda df: [M.so(df, period=period, backend='numpy') for period in PERIODS]),
+    'wr': (lambda df: M.wr_grid(df, PERIODS),
+           lambda df: [M.wr(df, period=period, backend='numpy') for period in PERIODS]),
+}
+
+def random_bars(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 400 + np.cumsum(rng.normal(scale=0.05, size=bars))
+    spread = rng.random((2, bars)) * 0.1
+    index = pd.date_range('2020-01-02 14:30', periods=bars, freq='min')
+    return pd.DataFrame({'Open': close, 'High': close + spread[0], 'Low': close - spread[1], 'Close': close}, index=index)
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def max_difference(expected, actual):
+    """Largest absolute difference, or inf when the NaN positions differ."""
+    expected = expected if isinstance(expected, tuple) else (expected,)
+    actual = actual if isinstance(actual, tuple) else (actual,)
+    worst = 0.0
+    for old, new in zip(expected, actual):
+        old, new = old.to_numpy(dtype='float64'), new.to_numpy(dtype='float64')
+        if not np.array_equal(np.isnan(old), np.isnan(new)):
+            return np.inf
+        valid = ~np.isnan(old)
+        if valid.any():
+            worst = max(worst, float(np.abs(old[valid] - new[valid]).max()))
+    return worst
+
+def main(bars=1_000_000, repeat=5):
+    df = random_bars(bars)
+    print(f"{bars} bars")
+    print(f"{'indicator':>10} {'ta ms':>8} {'numpy ms':>9} {'speedup':>8} {'max diff':>10}")
+    matches = True
+    for name, func in INDICATORS.items():
+        ta_time, expected = best_of(lambda: func(df, 'ta'), repeat)
+        numpy_time, actual = best_of(lambda: func(df, 'numpy'), repeat)
+        difference = max_difference(expected, actual)
+        matches &= difference <= TOLERANCE
+        print(f"{name:>10} {ta_time * 1000:>8.1f} {numpy_time * 1000:>9.1f} {ta_time / numpy_time:>7.1f}x {difference:>10.1e}")
+    print(f"numpy backend matches ta: {matches}")
+
+    print(f"{'grid':>10} {'rows':>5} {'loop ms':>9} {'grid ms':>8} {'speedup':>8} {'max diff':>10}")
+    grid_matches = True
+    for name, (grid, loop) in GRIDS.items():
+        loop_time, expected = best_of(lambda: loop(df), repeat)
+        grid_time, actual = best_of(lambda: grid(df), repeat)
+        difference = max(max_difference(row, pd.Series(values)) for row, values in zip(expected, actual))
+        grid_matches &= difference <= TOLERANCE
+        print(f"{name:>10} {len(actual):>5} {loop_time * 1000:>9.1f} {grid_time * 1000:>8.1f} {loop_time / grid_time:>7.1f}x {difference:>10.1e}")
+    print(f"grids match single calls: {grid_matches}")
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
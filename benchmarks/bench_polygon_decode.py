@@ -0,0 +1,82 @@
+"""Compare decoding Polygon aggregate pages through json + DataFrame with decode_aggregates.
+
+Usage: python benchmarks/bench_polygon_decode.py [payload_directory] [repeat]
+
+payload_directory may hold recorded ``*.json`` responses or the gzip bodies of
+the HTTP response cache (``data/cache/http``). Without one, 50000-row pages are
+rebuilt from the Polygon CSV files under data/POLYGON/minute.
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher.Polygon import DataFetcher, decode_aggregates, PAGE_LIMIT
+
+FIELDS = {'volume': 'v', 'vw': 'vw', 'open': 'o', 'close': 'c', 'high': 'h', 'low': 'l', 't': 't', 'number_of_trades': 'n'}
+
+def recorded_payloads(payload_directory):
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(payload_directory, '**', '*.json'), recursive=True)):
+        with open(path, 'rb') as f:
+            payloads.append(f.read())
+    for path in sorted(glob.glob(os.path.join(payload_directory, '**', '*.gz'), recursive=True)):
+        with gzip.open(path, 'rb') as f:
+            payloads.append(f.read())
+    return [payload for payload in payloads if b'"results"' in payload]
+
+def rebuilt_payloads(csv_directory='data/POLYGON/minute'):
+    frames = [pd.read_csv(path) for path in sorted(glob.glob(os.path.join(csv_directory, '*.csv')))]
+    df = pd.concat(frames)
+    rows = [{FIELDS[col]: value for col, value in row.items() if col in FIELDS} for row in df.to_dict('records')]
+    for row in rows:
+        row['t'], row['n'] = int(row['t']), int(row['n'])
+    # Compact separators, as the API sends them
+    return [json.dumps({'status': 'OK', 'resultsCount': len(rows[i:i + PAGE_LIMIT]), 'results': rows[i:i + PAGE_LIMIT]},
+                       separators=(',', ':')).encode()
+            for i in range(0, len(rows), PAGE_LIMIT)]
+
+def decode_dicts(fetcher, payload):
+    return fetcher.process_data(json.loads(payload)['results'])
+
+def decode_arrays(fetcher, payload):
+    return fetcher.process_data(decode_aggregates(payload)[1])
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main(payload_directory=None, repeat=5):
+    payloads = recorded_payloads(payload_directory) if payload_directory else rebuilt_payloads()
+    fetcher = DataFetcher(api_key=None)
+    rows = sum(payload.count(b'"t":') for payload in payloads)
+    print(f"{len(payloads)} payloads, {rows} rows, {sum(map(len, payloads)) / 1e6:.1f} MB")
+
+    dict_time, expected = best_of(lambda: [decode_dicts(fetcher, payload) for payload in payloads], repeat)
+    array_time, actual = best_of(lambda: [decode_arrays(fetcher, payload) for payload in payloads], repeat)
+
+    identical = True
+    for old, new in zip(expected, actual):
+        old = old.drop(columns=[col for col in old.columns if col not in new.columns])
+        try:
+            pd.testing.assert_frame_equal(old[new.columns], new, check_exact=True, check_index_type=False, check_freq=False)
+        except AssertionError:
+            identical = False
+
+    print(f"{'path':>12} {'ms':>8} {'rows/s':>12}")
+    print(f"{'json+dicts':>12} {dict_time * 1000:>8.1f} {rows / dict_time:>12.0f}")
+    print(f"{'arrays':>12} {array_time * 1000:>8.1f} {rows / array_time:>12.0f}")
+    print(f"speedup {dict_time / array_time:.1f}x, identical: {identical}")
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
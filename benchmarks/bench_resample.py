@@ -0,0 +1,62 @@
+"""Compare the pandas and NumPy reduceat engines of DataResampler.resample_data.
+
+Usage: python benchmarks/bench_resample.py [data_directory] [repeat]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.Data import DataResampler
+from data.Aggregate import reduceat_resample
+from data.Ingest import read_bars
+from utils import combine_csv_files_data
+
+INTERVALS = ['1min', '5min', '15min', '30min', '1h', '1d']
+
+AGGREGATIONS = {
+    'volume': 'sum',
+    'vw': 'mean',
+    'open': 'first',
+    'close': 'last',
+    'high': 'max',
+    'low': 'min',
+    'number_of_trades': 'sum'
+}
+
+def best_of(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main(data_directory='data/POLYGON/minute', repeat=5):
+    combined = os.path.join('/tmp', 'findrl_bench_combined.csv')
+    combine_csv_files_data(data_directory, combined)
+
+    # Gap filling is shared by both engines, so only the aggregation is timed
+    resampler = DataResampler('.', cache=False)
+    resampler.df = read_bars(combined)
+    resampler.fill_missing()
+    filled = resampler.df
+    print(f"{len(filled)} rows")
+
+    print(f"{'interval':>8} {'pandas ms':>10} {'numpy ms':>10} {'speedup':>8} {'identical':>9}")
+    for interval in INTERVALS:
+        pandas_time, expected = best_of(lambda: filled.resample(interval).agg(AGGREGATIONS).dropna(), repeat)
+        numpy_time, actual = best_of(lambda: reduceat_resample(filled, interval, AGGREGATIONS).dropna(), repeat)
+        # pandas sums with compensated summation, so VW may differ in the last ulp
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-12)
+            identical = True
+        except AssertionError:
+            identical = False
+        print(f"{interval:>8} {pandas_time * 1000:>10.1f} {numpy_time * 1000:>10.1f} {pandas_time / numpy_time:>7.1f}x {str(identical):>9}")
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_UNIT = {'s': 1_000_000_000, 'ms': 1_000_000, 'us': 1_000, 'ns': 1}
+
+def bucket_starts(index, interval, origin=None):
+    """Return (labels, starts) of the non-empty ``interval`` buckets of a sorted DatetimeIndex.
+
+    Buckets are anchored on ``origin``, by default midnight of the first day like
+    pandas' ``origin='start_day'``, and located with one searchsorted over int64 epochs.
+    """
+    ns_per_unit = NS_PER_UNIT[index.unit]
+    step = pd.Timedelta(interval).value // ns_per_unit
+    t = index.asi8
+    origin = (index[0].normalize() if origin is None else pd.Timestamp(origin)).value // ns_per_unit
+    first = (t[0] - origin) // step
+    last = (t[-1] - origin) // step
+    edges = origin + np.arange(first, last + 2, dtype='int64') * step
+
+    positions = np.searchsorted(t, edges, side='left')
+    non_empty = positions[1:] > positions[:-1]
+    labels = pd.DatetimeIndex(edges[:-1][non_empty].view(f"datetime64[{index.unit}]"))
+    if index.tz is not None:
+        labels = labels.tz_localize('UTC').tz_convert(index.tz)
+    return labels, positions[:-1][non_empty]
+
+def reduce_sum(values, starts):
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        values = np.where(np.isnan(values), 0, values)
+    return np.add.reduceat(values, starts)
+
+def reduce_mean(values, starts):
+    valid = ~np.isnan(values)
+    total = np.add.reduceat(np.where(valid, values, 0), starts)
+    count = np.add.reduceat(valid.astype('int64'), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+def reduce_max(values, starts):
+    # fmax ignores NaN the way pandas' max does
+    return np.fmax.reduceat(values, starts)
+
+def reduce_min(values, starts):
+    return np.fmin.reduceat(values, starts)
+
+def reduce_first(values, starts):
+    """First non-NaN value of each bucket, NaN when the bucket has none."""
+    positions = np.arange(len(values))
+    if values.dtype.kind == 'f':
+        positions = np.where(np.isnan(values), len(values), positions)
+    first = np.minimum.reduceat(positions, starts)
+    padded = np.append(values.astype('float64', copy=False), np.nan)
+    return padded[first]
+
+def reduce_last(values, starts):
+    """Last non-NaN value of each bucket, NaN when the bucket has none."""
+    positions = np.arange(len(values))
+    if values.dtype.kind == 'f':
+        positions = np.where(np.isnan(values), -1, positions)
+    last = np.maximum.reduceat(positions, starts)
+    padded = np.append(values.astype('float64', copy=False), np.nan)
+    return padded[last]
+
+REDUCERS = {
+    'sum': reduce_sum,
+    'mean': reduce_mean,
+    'max': reduce_max,
+    'min': reduce_min,
+    'first': reduce_first,
+    'last': reduce_last,
+}
+
+def reduceat_resample(df, interval, aggregations, origin=None):
+    """Aggregate a DatetimeIndex frame like ``df.resample(interval).agg(aggregations)`` without empty buckets.
+
+    Bucket boundaries are computed once and every column is reduced with a
+    single ``ufunc.reduceat`` call.
+    """
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+    if df.empty:
+        return df.resample(interval).agg(aggregations)[list(aggregations)]
+
+    labels, starts = bucket_starts(df.index, interval, origin)
+    columns = {}
+    for col, how in aggregations.items():
+        values = df[col].to_numpy()
+        if values.dtype.kind not in 'iuf':
+            values = values.astype('float64')
+        reduced = REDUCERS[how](values, starts)
+        if values.dtype.kind in 'iu' and reduced.dtype.kind == 'f' and not np.isnan(reduced).any():
+            reduced = reduced.astype(values.dtype)
+        columns[col] = reduced
+    return pd.DataFrame(columns, index=labels.rename(df.index.name))
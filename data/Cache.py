@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+from data.Store import file_lock, temp_path, write_json
+
+CACHE_ROOT = os.path.join('data', 'cache', 'resample')
+
+def options_text(options):
+    return json.dumps(options, sort_keys=True, default=str) if options else None
+
+class ResampleCache:
+    """Content-addressed on-disk cache of resampled frames.
+
+    Entries are keyed on the source fingerprint (size, mtime and a content hash),
+    the interval and the ``options`` that shape the output (engine, price dtype,
+    aggregations), so a changed source or setting never hits a stale entry. The least
+    recently used entries are evicted once the cache grows past ``max_bytes``.
+
+    Every read-modify-write of the index holds ``index.lock``, so processes
+    sharing the cache neither lose each other's entries nor leave pickles the
+    index no longer counts.
+    """
+
+    def __init__(self, root=CACHE_ROOT, max_bytes=1 << 30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, 'index.json')
+        self.lock_path = os.path.join(root, 'index.lock')
+
+    def lock(self):
+        return file_lock(self.lock_path)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {'entries': {}, 'fingerprints': {}}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        write_json(self.index_path, index)
+
+    def file_fingerprint(self, file_path):
+        """Return the content hash of a file, rehashing only when its size or mtime changed."""
+        index = self.load_index()
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        known = index['fingerprints'].get(file_path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['hash']
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        with self.lock():
+            index = self.load_index()
+            index['fingerprints'][file_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest.hexdigest()}
+            self.save_index(index)
+        return digest.hexdigest()
+
+    def store_fingerprint(self, store, provider, symbol, timespan):
+        """Return a hash of a bar store series built from its partition metadata."""
+        metas = [store.read_meta(partition_path) for _, _, partition_path in store.partitions(provider, symbol, timespan)]
+        payload = json.dumps([provider, symbol, timespan, metas], sort_keys=True).encode()
+        return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+    def key(self, fingerprint, interval, options=None):
+        payload = f"{fingerprint}:{interval}"
+        if options:
+            payload += ':' + options_text(options)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, fingerprint, interval, options=None):
+        """Return ``(frame, entry)`` for a cached result, or ``(None, None)`` on a miss."""
+        key = self.key(fingerprint, interval, options)
+        with self.lock():
+            index = self.load_index()
+            entry = index['entries'].get(key)
+            if entry is None or not os.path.exists(self.entry_path(key)):
+                return None, None
+            entry['last_access'] = time.time()
+            self.save_index(index)
+            # Read under the lock so another process cannot evict the entry midway
+            return pd.read_pickle(self.entry_path(key)), entry
+
+    def put(self, source, fingerprint, interval, df, output_file=None, options=None):
+        """Store a resampled frame, drop older entries for the same source, interval and options, then evict LRU."""
+        key = self.key(fingerprint, interval, options)
+        options_key = options_text(options)
+
+        # The pickle is written before taking the lock and moved into place under it
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = temp_path(self.entry_path(key))
+        df.to_pickle(tmp_path)
+        entry = {
+            'source': source,
+            'interval': interval,
+            'options': options_key,
+            'size': os.path.getsize(tmp_path),
+            'last_access': time.time(),
+            'output_file': output_file,
+            'output_mtime_ns': os.stat(output_file).st_mtime_ns if output_file and os.path.exists(output_file) else None,
+        }
+
+        with self.lock():
+            index = self.load_index()
+            for stale_key, stale in list(index['entries'].items()):
+                if stale['source'] == source and stale['interval'] == interval \
+                        and stale.get('options') == options_key and stale_key != key:
+                    self.remove(index, stale_key)
+
+            os.replace(tmp_path, self.entry_path(key))
+            index['entries'][key] = entry
+            self.evict(index, keep=key)
+            self.save_index(index)
+        return entry
+
+    def remove(self, index, key):
+        index['entries'].pop(key, None)
+        if os.path.exists(self.entry_path(key)):
+            os.remove(self.entry_path(key))
+
+    def evict(self, index, keep=None):
+        """Remove least recently used entries until the cache fits in ``max_bytes``."""
+        total = sum(entry['size'] for entry in index['entries'].values())
+        for key, entry in sorted(index['entries'].items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entry['size']
+            self.remove(index, key)
@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from data.Store import BarStore, PRICE_COLUMNS, to_epoch_ms, to_end_ms, utc_naive, csv_series, arrays_to_frame
+from data.Ingest import read_bars
+
+CATALOG_PATH = os.path.join('data', 'catalog.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_by_end ON files (symbol, provider, interval, end_ms);
+"""
+
+class DataCatalog:
+    """SQLite index of the bar data on disk: bar store partitions and legacy CSV files.
+
+    Every partition directory or file is recorded with its symbol, provider,
+    interval, first and last timestamp (epoch ms, UTC), row count and checksum,
+    so data is selected by symbol and date range with an index seek instead of
+    a directory listing. ``BarStore.write`` registers the partitions it writes.
+    """
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+
+    @contextmanager
+    def connect(self):
+        """Open the catalog, committing on success and always closing the connection."""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def describe(self, file_path):
+        """Return (start_ms, end_ms, rows, checksum) of a CSV file in one pass over its bytes."""
+        digest = hashlib.blake2b(digest_size=20)
+        newlines = 0
+        first_line = last_line = b''
+        pending = b''
+        with open(file_path, 'rb') as f:
+            header = f.readline()
+            digest.update(header)
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+                newlines += block.count(b'\n')
+                lines = (pending + block).split(b'\n')
+                pending = lines.pop()
+                complete = [line for line in lines if line.strip()]
+                if complete:
+                    first_line = first_line or complete[0]
+                    last_line = complete[-1]
+        if pending.strip():
+            newlines += 1
+            first_line = first_line or pending
+            last_line = pending
+
+        if not first_line:
+            raise ValueError(f"No rows in {file_path}")
+        start_ms = to_epoch_ms(first_line.split(b',', 1)[0].decode())
+        end_ms = to_epoch_ms(last_line.split(b',', 1)[0].decode())
+        return start_ms, end_ms, newlines, digest.hexdigest()
+
+    def describe_partition(self, partition_path):
+        """Return (start_ms, end_ms, rows, checksum) of a bar store partition from its metadata.
+
+        Partitions written before the store kept a checksum are hashed from their column files.
+        """
+        meta = BarStore.read_meta(partition_path)
+        if not meta['rows']:
+            raise ValueError(f"No rows in {partition_path}")
+        if meta.get('checksum'):
+            return meta['start'], meta['end'], meta['rows'], meta['checksum']
+        digest = hashlib.blake2b(digest_size=20)
+        for col in meta['columns']:
+            with open(os.path.join(partition_path, f"{col}.npy"), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return meta['start'], meta['end'], meta['rows'], digest.hexdigest()
+
+    def register(self, file_path, symbol, provider, interval):
+        """Record or refresh one CSV file or store partition; unchanged ones (same size and mtime) are not re-read.
+
+        A partition is tracked through its ``_meta.json``, which every partition write replaces last.
+        """
+        file_path = os.path.abspath(file_path)
+        partition = os.path.isdir(file_path)
+        stat = os.stat(os.path.join(file_path, '_meta.json') if partition else file_path)
+        with self.connect() as connection:
+            known = connection.execute('SELECT size, mtime_ns FROM files WHERE path = ?', (file_path,)).fetchone()
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                return False
+
+            start_ms, end_ms, rows, checksum = self.describe_partition(file_path) if partition else self.describe(file_path)
+            connection.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_path, symbol, provider, str(interval), start_ms, end_ms, rows, checksum, stat.st_size, stat.st_mtime_ns)
+            )
+        return True
+
+    def scan(self, data_root='data', store=None):
+        """Register every provider CSV file under ``data_root`` and every partition of ``store``; drop entries whose data is gone."""
+        registered = 0
+        for provider, symbol, interval, file_path in csv_series(data_root):
+            registered += self.register(file_path, symbol, provider, interval)
+        if store is not None:
+            for provider, symbol, timespan, partition_path in store_partitions(store):
+                registered += self.register(partition_path, symbol, provider, timespan)
+
+        with self.connect() as connection:
+            paths = [row['path'] for row in connection.execute('SELECT path FROM files')]
+            missing = [(file_path,) for file_path in paths if not os.path.exists(file_path)]
+            connection.executemany('DELETE FROM files WHERE path = ?', missing)
+        print(f"Catalog updated: {registered} files registered, {len(missing)} removed")
+        return registered
+
+    def find(self, symbol, provider='POLYGON', interval='minute', start=None, end=None):
+        """Return the catalog rows of the files overlapping ``[start, end]``, ordered by start; a date-only end includes its day.
+
+        The (symbol, provider, interval, end_ms) index seeks straight to the first
+        file ending at or after ``start``, so files before the range are never visited.
+        """
+        start_ms = -2 ** 63 if start is None else to_epoch_ms(start)
+        end_ms = 2 ** 63 - 1 if end is None else to_end_ms(end)
+        query = ('SELECT * FROM files WHERE symbol = ? AND provider = ? AND interval = ? '
+                 'AND end_ms >= ? AND start_ms <= ? ORDER BY start_ms')
+        with self.connect() as connection:
+            rows = connection.execute(query, (symbol, provider, str(interval), start_ms, end_ms))
+            return [dict(row) for row in rows]
+
+    def fingerprint(self, symbol, provider='POLYGON', interval='minute', start=None, end=None):
+        """Hash of the checksums of the files a range resolves to."""
+        files = self.find(symbol, provider, interval, start, end)
+        payload = ':'.join([str(start), str(end)] + [row['checksum'] for row in files])
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def load(self, symbol, provider='POLYGON', interval='minute', start=None, end=None, price_dtype='float64'):
+        """Read the files covering ``[start, end]`` into one sorted frame without duplicate bars.
+
+        Columns are named as in the bar store (lower case, e.g. ``adj_close``),
+        so store partitions and legacy CSV files of a series load alike.
+        """
+        files = self.find(symbol, provider, interval, start, end)
+        if not files:
+            raise FileNotFoundError(f"No {provider} {interval} data for {symbol} between {start} and {end} in {self.path}")
+
+        df = pd.concat([read_partition(row['path'], price_dtype) if os.path.isdir(row['path'])
+                        else store_columns(read_bars(row['path'], provider, price_dtype)) for row in files])
+        df = df[~df.index.duplicated(keep='first')].sort_index(kind='stable')
+
+        index = utc_naive(df.index)
+        keep = np.ones(len(df), dtype=bool)
+        if start is not None:
+            keep &= index >= pd.Timestamp(to_epoch_ms(start), unit='ms')
+        if end is not None:
+            keep &= index <= pd.Timestamp(to_end_ms(end), unit='ms')
+        return df[keep]
+
+def store_partitions(store):
+    """Yield (provider, symbol, timespan, partition_path) for every partition of a bar store."""
+    if not os.path.isdir(store.root):
+        return
+    for provider in sorted(os.listdir(store.root)):
+        provider_path = os.path.join(store.root, provider)
+        for symbol in sorted(os.listdir(provider_path)) if os.path.isdir(provider_path) else []:
+            symbol_path = os.path.join(provider_path, symbol)
+            for timespan in sorted(os.listdir(symbol_path)) if os.path.isdir(symbol_path) else []:
+                for _, _, partition_path in store.partitions(provider, symbol, timespan):
+                    yield provider, symbol, timespan, partition_path
+
+def store_columns(df):
+    """Rename bar columns the way the bar store does (``Adj Close`` becomes ``adj_close``)."""
+    df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+    return df
+
+def read_partition(partition_path, price_dtype='float64'):
+    """Read a bar store partition as a frame indexed by ``timestamp``, with ``price_dtype`` prices."""
+    arrays = BarStore(catalog=False).load_partition(partition_path)
+    df = arrays_to_frame(arrays)
+    prices = [col for col in df.columns if col in PRICE_COLUMNS]
+    df[prices] = df[prices].astype(price_dtype)
+    return df
@@ -1,11 +1,36 @@
+import numpy as np
 import pandas as pd
-from os import listdir, path, makedirs
+from os import listdir, path, makedirs, stat
+from data.Store import BarStore
+from data.Cache import ResampleCache
+from data.Aggregate import reduceat_resample
+from data.Ingest import read_bars
+
+BACKTEST_COLUMNS = {
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume',
+    'vw': 'VW', 'number_of_trades': 'Number_of_trades', 'adj_close': 'Adj Close'
+}
 
 class DataResampler:
-    def __init__(self, folder_path, file_number=0):
+    def __init__(self, folder_path, file_number=0, symbol=None, provider='POLYGON', timespan='minute', store=None, cache=None, engine='pandas', price_dtype='float64', catalog=None, start=None, end=None):
+        if engine not in ('pandas', 'numpy'):
+            raise ValueError(f"Unsupported resample engine: {engine}")
+        self.engine = engine
+        self.price_dtype = price_dtype
         self.df = None
+        self.resampled_df = None
         self.file_number = file_number
         self.folder_path = folder_path
+        self.symbol = symbol
+        self.provider = provider
+        self.timespan = timespan
+        self.store = store or BarStore()
+        # With a catalog, ``symbol`` selects the catalogued partitions and CSV files instead of reading the bar store
+        self.catalog = catalog
+        self.start = start
+        self.end = end
+        # Pass cache=False to always resample
+        self.cache = ResampleCache() if cache is None else cache or None
 
     def correct_columns_name(self, data):
         columns = data.columns
@@ -15,7 +40,7 @@ class DataResampler:
 
     def find_csv_file(self, folder_path, file_number):
         """Find a CSV file in the specified folder based on the provided file number."""
-        csv_files = [file for file in listdir(folder_path) if file.endswith('.csv')]
+        csv_files = sorted(file for file in listdir(folder_path) if file.endswith('.csv'))
         if not csv_files:
             raise FileNotFoundError("No CSV files found in the specified folder.")
 
@@ -34,13 +59,40 @@ class DataResampler:
     def load_data(self, folder_path, file_number=0):
         """Load the 1-minute data from the specified CSV file."""
         file_path, selected_file = self.find_csv_file(folder_path, file_number)
-        self.df = pd.read_csv(file_path, parse_dates=['timestamp'], index_col='timestamp')
+        self.df = read_bars(file_path, price_dtype=self.price_dtype)
         # self.df = self.correct_columns_name(self.df)
         print("Data loaded successfully.")
         return selected_file
 
-    def resample_data(self, interval):
-        """Resample the data to the specified interval."""
+    def series_file(self):
+        """Name of the output file for a symbol source, including the selected range."""
+        selected_range = ''.join(f"_{pd.Timestamp(bound).strftime('%Y-%m-%d')}" for bound in (self.start, self.end) if bound is not None)
+        return f"{self.symbol}_{self.provider}_{self.timespan}{selected_range}.csv"
+
+    def load_store(self, start=None, end=None):
+        """Load the 1-minute data for ``self.symbol`` from the bar store."""
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        self.df = self.store.read(self.provider, self.symbol, self.timespan, start, end)
+        print("Data loaded successfully.")
+        return self.series_file()
+
+    def load_catalog(self):
+        """Load the 1-minute data for ``self.symbol`` from the catalogued data covering the range."""
+        self.df = self.catalog.load(self.symbol, self.provider, self.timespan, self.start, self.end, self.price_dtype)
+        print("Data loaded successfully.")
+        return self.series_file()
+
+    def load_source(self):
+        """Load from the catalog or the bar store when a symbol is set, otherwise from ``file_number``."""
+        if self.symbol and self.catalog is not None:
+            return self.load_catalog()
+        if self.symbol:
+            return self.load_store()
+        return self.load_data(self.folder_path, self.file_number)
+
+    def fill_missing(self):
+        """Fill gaps in the loaded 1-minute data before aggregation."""
         if self.df is None:
             raise ValueError("Data not loaded. Please load the data first.")
         
@@ -48,70 +100,196 @@ class DataResampler:
         if not isinstance(self.df.index, pd.DatetimeIndex):
             raise ValueError("Index is not a DateTimeIndex")
 
-        # Fill missing columns with appropriate values
-        self.df.fillna({
-            'volume': 0,
-            'vw': 0,
-            'open': self.df['close'].shift(),
-            'close': self.df['open'].shift(-1),
-            'high': self.df[['open', 'close']].max(axis=1),
-            'low': self.df[['open', 'close']].min(axis=1),
-            'number_of_trades': 0
-        }, inplace=True)
-
-        # Ensure open prices are carried forward correctly for resampling
-        self.df['open'] = self.df['open'].ffill()
+        self.df = fill_bars(self.df)
 
         # Handle case where 'open' may still have NaN at the start
         if pd.isnull(self.df['open'].iloc[0]):
-            self.df['open'].iloc[0] = self.df['close'].iloc[0]
-        
-        resampled_df = self.df.resample(interval).agg({
-            'volume': 'sum',  # Sum the volume
-            'vw': 'mean',     # Average the volume-weighted price
-            'open': 'first',  # Take the first open price
-            'close': 'last',  # Take the last close price
-            'high': 'max',    # Take the highest price
-            'low': 'min',     # Take the lowest price
-            'number_of_trades': 'sum'  # Sum the number of trades
-        })
-        
-        # Drop rows with any missing values
-        resampled_df.dropna(inplace=True)
+            self.df.iloc[0, self.df.columns.get_loc('open')] = self.df['close'].iloc[0]
 
-        # Reset index to convert timestamp back to a column
-        resampled_df = resampled_df.reset_index()
-        resampled_df.rename(columns={'timestamp': 'Date', 'volume': 'Volume', 'vw': 'VW', 'open': 'Open', 'close': 'Close', 'high': 'High', 'low': 'Low', 'number_of_trades': 'Number_of_trades'}, inplace=True)
-        
-        # # Split the DateTime index into Date and Time columns
-        # resampled_df['Date'] = resampled_df.index.Date.astype(str)
-        
-        # # Set the Date column as the index
-        # resampled_df.set_index('Date', inplace=True)
+    def aggregate(self, df, interval, origin='start_day'):
+        """Aggregate filled 1-minute bars to ``interval`` with the selected engine."""
+        if self.engine == 'numpy':
+            return reduceat_resample(df, interval, RESAMPLE_AGGREGATIONS, None if origin == 'start_day' else origin)
+        return df.resample(interval, origin=origin).agg(RESAMPLE_AGGREGATIONS)
 
-        return resampled_df
+    def resample_data(self, interval):
+        """Resample the data to the specified interval."""
+        self.fill_missing()
+        resampled_df = self.aggregate(self.df, interval)
+        return format_resampled(resampled_df)
+
+    def resample_stream(self, file_path, interval, output_file, chunksize=100_000):
+        """Resample a 1-minute CSV chunk by chunk and write the result to ``output_file``.
+
+        Only complete buckets are aggregated; the rows of the trailing bucket are
+        carried into the next chunk. Gap filling carries the previous close, the
+        last forward-filled open and the held-back last row (whose close may be
+        filled from the next open) across chunk boundaries, so the output matches
+        ``resample_data`` on the whole file.
+        """
+        step = pd.Timedelta(interval)
+        reader = read_bars(file_path, price_dtype=self.price_dtype, chunksize=chunksize)
+
+        origin = None
+        partial = None
+        rows_written = 0
+        with open(output_file, 'w', newline='') as out:
+            for filled in filled_chunks(reader):
+                if origin is None:
+                    origin = filled.index[0].normalize()
+                    # pandas writes naive stamps that are all midnight as bare dates; format each
+                    # batch as the whole output would be, not by what that batch happens to hold
+                    intraday = step % pd.Timedelta(days=1) != pd.Timedelta(0)
+                    date_format = '%Y-%m-%d %H:%M:%S' if intraday and filled.index.tz is None else None
+                if partial is not None:
+                    filled = pd.concat([partial, filled])
+
+                buckets = (filled.index - origin) // step
+                complete = buckets < buckets[-1]
+                partial = filled[~complete]
+                if complete.any():
+                    resampled_df = format_resampled(self.aggregate(filled[complete], interval, origin))
+                    resampled_df.to_csv(out, header=rows_written == 0, index=False, date_format=date_format)
+                    rows_written += len(resampled_df)
+
+            if partial is not None and len(partial):
+                resampled_df = format_resampled(self.aggregate(partial, interval, origin))
+                resampled_df.to_csv(out, header=rows_written == 0, index=False, date_format=date_format)
+                rows_written += len(resampled_df)
+
+        print(f"Resampled {rows_written} rows to {output_file}")
+        return rows_written
+
+    def process_stream(self, interval="15min", chunksize=100_000):
+        """Like ``process`` for CSV sources, but never holds the whole file in memory."""
+        file_path, selected_file = self.find_csv_file(self.folder_path, self.file_number)
+
+        analysis_dir = path.join(self.folder_path, 'analysis')
+        if not path.exists(analysis_dir):
+            makedirs(analysis_dir)
+
+        output_file = path.join(analysis_dir, f"{interval}_{selected_file}")
+        self.resample_stream(file_path, interval, output_file, chunksize)
+        return path.abspath(output_file)
     
+    def resample_ladder(self, intervals):
+        """Resample the loaded data to several intervals in one pass and return ``{interval: frame}``.
+
+        Each level is aggregated from the finest level already built that divides
+        it (sum of sums, max of maxes, first/last), not from the raw minutes. VW is
+        volume-weighted across the bucket, falling back to the mean of ``vw`` where
+        a bucket traded no volume; ``resample_data`` instead averages ``vw``, so
+        the two outputs differ in that column.
+        """
+        self.fill_missing()
+
+        base = self.df[['volume', 'open', 'close', 'high', 'low', 'number_of_trades']].copy()
+        base['pv'] = self.df['vw'] * self.df['volume']
+        base['vw_sum'] = self.df['vw']
+        base['vw_count'] = self.df['vw'].notna().astype('int64')
+        base['rows'] = 1
+
+        built = []
+        ladder = {}
+        for interval in sorted(intervals, key=pd.Timedelta):
+            step = pd.Timedelta(interval)
+            source = base
+            for finer_step, finer in reversed(built):
+                if step % finer_step == pd.Timedelta(0):
+                    source = finer
+                    break
+
+            level = source.resample(interval).agg(LADDER_AGGREGATIONS)
+            level = level[level['rows'] > 0]
+            built.append((step, level))
+            ladder[interval] = ladder_output(level)
+
+        return {interval: ladder[interval] for interval in intervals}
+
+    def process_ladder(self, intervals):
+        """Build every interval of the ladder together, save them under ``analysis`` and return ``{interval: path}``.
+
+        Files are named ``{interval}_ladder_{file}`` so their volume-weighted VW
+        never overwrites (or is mistaken for) the mean-VW ``process`` output.
+        """
+        selected_file = self.load_source()
+
+        analysis_dir = path.join(self.folder_path, 'analysis')
+        if not path.exists(analysis_dir):
+            makedirs(analysis_dir)
+
+        output_files = {}
+        for interval, resampled_df in self.resample_ladder(intervals).items():
+            output_file = path.join(analysis_dir, f"{interval}_ladder_{selected_file}")
+            resampled_df.to_csv(output_file, index=False)
+            output_files[interval] = path.abspath(output_file)
+            print(f"Resampled data saved to {output_file}")
+
+        return output_files
+
+    def source_fingerprint(self):
+        """Return (source, fingerprint, selected_file) for the data ``process`` resamples."""
+        if self.symbol and self.catalog is not None:
+            source = f"catalog:{self.provider}/{self.symbol}/{self.timespan}/{self.start}/{self.end}"
+            fingerprint = self.catalog.fingerprint(self.symbol, self.provider, self.timespan, self.start, self.end)
+            return source, fingerprint, self.series_file()
+
+        if self.symbol:
+            source = f"store:{self.provider}/{self.symbol}/{self.timespan}/{self.start}/{self.end}"
+            fingerprint = self.cache.store_fingerprint(self.store, self.provider, self.symbol, self.timespan)
+            fingerprint = self.cache.key(fingerprint, f"{self.start}/{self.end}")
+            return source, fingerprint, self.series_file()
+
+        file_path, selected_file = self.find_csv_file(self.folder_path, self.file_number)
+        return path.abspath(file_path), self.cache.file_fingerprint(file_path), selected_file
+
+    def cache_options(self):
+        """Settings besides the source and interval that change what ``process`` outputs, part of its cache key."""
+        return {'engine': self.engine, 'price_dtype': str(np.dtype(self.price_dtype)), 'aggregations': RESAMPLE_AGGREGATIONS}
+
     def process(self, interval="15min"):
-        """Orchestrate the data loading, resampling, and saving process, and return the new file's absolute path."""
-        selected_file = self.load_data(self.folder_path, self.file_number)
+        """Orchestrate the data loading, resampling, and saving process, and return the new file's absolute path.
+
+        When the source is unchanged since a previous run, the resampled frame comes
+        from the cache and the output file is only rewritten if it went missing.
+        """
+        # Create the analysis directory if it doesn't exist
+        analysis_dir = path.join(self.folder_path, 'analysis')
+        if not path.exists(analysis_dir):
+            makedirs(analysis_dir)
+
+        if self.cache is not None:
+            source, fingerprint, selected_file = self.source_fingerprint()
+            output_file = path.join(analysis_dir, f"{interval}_{selected_file}")
+            options = self.cache_options()
+            cached, entry = self.cache.get(fingerprint, interval, options)
+            if cached is not None:
+                self.resampled_df = cached
+                if entry['output_file'] != output_file or not path.exists(output_file) \
+                        or stat(output_file).st_mtime_ns != entry['output_mtime_ns']:
+                    cached.to_csv(output_file, index=False)
+                    self.cache.put(source, fingerprint, interval, cached, output_file, options)
+                print(f"Resampled data loaded from cache: {output_file}")
+                return path.abspath(output_file)
+
+        selected_file = self.load_source()
 
         resampled_df = self.resample_data(interval)
+        self.resampled_df = resampled_df
 
         # print("resampled_df DF")
         # print(resampled_df.head(5))
 
         # self.df = self.correct_columns_name(resampled_df)
-        
-        # Create the analysis directory if it doesn't exist
-        analysis_dir = path.join(self.folder_path, 'analysis')
-        if not path.exists(analysis_dir):
-            makedirs(analysis_dir)
 
         output_file = path.join(analysis_dir, f"{interval}_{selected_file}")
 
         # Save the resampled data to a CSV file, replacing the file if it already exists
         resampled_df.to_csv(output_file, index=False)
 
+        if self.cache is not None:
+            self.cache.put(source, fingerprint, interval, resampled_df, output_file, options)
+
         print(f"Resampled data saved to {output_file}")
 
         print("Processed data...")
@@ -119,15 +297,169 @@ class DataResampler:
 
         return path.abspath(output_file)
 
+RESAMPLE_AGGREGATIONS = {
+    'volume': 'sum',  # Sum the volume
+    'vw': 'mean',     # Average the volume-weighted price
+    'open': 'first',  # Take the first open price
+    'close': 'last',  # Take the last close price
+    'high': 'max',    # Take the highest price
+    'low': 'min',     # Take the lowest price
+    'number_of_trades': 'sum'  # Sum the number of trades
+}
+
+def fill_bars(df, prev_close=np.nan, last_open=np.nan):
+    """Fill missing values of 1-minute bars.
+
+    ``prev_close`` is the raw close of the row before ``df`` and ``last_open``
+    the last forward-filled open, so chunks can be filled one after another.
+    """
+    previous_close = df['close'].shift()
+    if len(df):
+        previous_close.iloc[0] = prev_close
+
+    # Fill missing columns with appropriate values
+    df = df.fillna({
+        'volume': 0,
+        'vw': 0,
+        'open': previous_close,
+        'close': df['open'].shift(-1),
+        'high': df[['open', 'close']].max(axis=1),
+        'low': df[['open', 'close']].min(axis=1),
+        'number_of_trades': 0
+    })
+
+    # Ensure open prices are carried forward correctly for resampling
+    if len(df) and pd.isnull(df['open'].iloc[0]) and not pd.isnull(last_open):
+        df.iloc[0, df.columns.get_loc('open')] = last_open
+    df['open'] = df['open'].ffill()
+    return df
+
+def filled_chunks(reader):
+    """Yield gap-filled chunks of a chunked CSV reader, holding back each chunk's last row.
+
+    The held row's close can only be filled once the next row's open is known.
+    """
+    held = None
+    prev_close = np.nan
+    last_open = np.nan
+    first = True
+
+    for chunk in reader:
+        work = chunk if held is None else pd.concat([held, chunk])
+        if len(work) < 2:
+            held = work
+            continue
+
+        filled = fill_bars(work, prev_close, last_open).iloc[:-1]
+        if first and pd.isnull(filled['open'].iloc[0]):
+            filled.iloc[0, filled.columns.get_loc('open')] = filled['close'].iloc[0]
+        first = False
+
+        prev_close = work['close'].iloc[-2]
+        last_open = filled['open'].iloc[-1]
+        held = work.iloc[-1:]
+        yield filled
+
+    if held is not None and len(held):
+        filled = fill_bars(held, prev_close, last_open)
+        if first and pd.isnull(filled['open'].iloc[0]):
+            filled.iloc[0, filled.columns.get_loc('open')] = filled['close'].iloc[0]
+        yield filled
+
+def format_resampled(resampled_df):
+    """Drop incomplete buckets and rename columns to the resampled output layout."""
+    # Drop rows with any missing values
+    resampled_df = resampled_df.dropna()
+
+    # Reset index to convert timestamp back to a column
+    resampled_df = resampled_df.reset_index()
+    resampled_df.rename(columns={'timestamp': 'Date', 'volume': 'Volume', 'vw': 'VW', 'open': 'Open', 'close': 'Close', 'high': 'High', 'low': 'Low', 'number_of_trades': 'Number_of_trades'}, inplace=True)
+    return resampled_df
+
+LADDER_AGGREGATIONS = {
+    'volume': 'sum',
+    'pv': 'sum',
+    'vw_sum': 'sum',
+    'vw_count': 'sum',
+    'open': 'first',
+    'close': 'last',
+    'high': 'max',
+    'low': 'min',
+    'number_of_trades': 'sum',
+    'rows': 'sum',
+}
+
+def ladder_output(level):
+    """Turn a ladder level with running sums into the ``resample_data`` output layout."""
+    volume = level['volume'].where(level['volume'] != 0)
+    vw = (level['pv'] / volume).fillna(level['vw_sum'] / level['vw_count'])
+    output = pd.DataFrame({
+        'volume': level['volume'],
+        'vw': vw,
+        'open': level['open'],
+        'close': level['close'],
+        'high': level['high'],
+        'low': level['low'],
+        'number_of_trades': level['number_of_trades'],
+    }).dropna()
+
+    output = output.reset_index()
+    output.rename(columns={'timestamp': 'Date', 'volume': 'Volume', 'vw': 'VW', 'open': 'Open', 'close': 'Close', 'high': 'High', 'low': 'Low', 'number_of_trades': 'Number_of_trades'}, inplace=True)
+    return output
+
 class DataLoder:
     
-    def __init__(self, folder_path, file_number):
+    def __init__(self, folder_path, file_number, symbol=None, provider='POLYGON', timespan='minute', store=None, mmap=True, price_dtype='float64', catalog=None, start=None, end=None):
+        self.price_dtype = price_dtype
+        self.catalog = catalog
+        self.start = start
+        self.end = end
         self.folder_path = folder_path
         self.file_number = file_number
+        self.symbol = symbol
+        self.provider = provider
+        self.timespan = timespan
+        self.store = store or BarStore()
+        self.mmap = mmap
+
+    def load_catalog(self):
+        """Load the catalogued data covering the range for ``self.symbol`` with backtesting column names."""
+        df = self.catalog.load(self.symbol, self.provider, self.timespan, self.start, self.end, self.price_dtype)
+        df = df.drop(columns=['t'], errors='ignore').rename(columns=BACKTEST_COLUMNS)
+        df.index.name = 'Date'
+        return df
+
+    def load_store(self, start=None, end=None):
+        """Load bars for ``self.symbol`` from the bar store with backtesting column names.
+
+        With ``mmap`` enabled the OHLCV columns are read-only views of memory-mapped
+        files, so parallel backtests over one symbol share a single copy of the data.
+        """
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if self.mmap:
+            arrays = self.store.memmap_arrays(self.provider, self.symbol, self.timespan, start, end)
+        else:
+            arrays = self.store.read_arrays(self.provider, self.symbol, self.timespan, start, end)
+
+        # Build the frame directly from the arrays so no column is copied
+        index = pd.DatetimeIndex(arrays['t'].view('datetime64[ms]'), name='Date', copy=False)
+        columns = {BACKTEST_COLUMNS.get(col, col): values for col, values in arrays.items() if col != 't'}
+        return pd.DataFrame(columns, index=index, copy=False)
 
     def load(self):
-        """Find a CSV file in the specified folder based on the provided file number."""
-        csv_files = [file for file in listdir(self.folder_path) if file.endswith('.csv')]
+        """Load bars from the catalog, the bar store or the ``file_number``-th CSV file of the folder.
+
+        Every source returns a frame indexed by a DatetimeIndex named ``Date``;
+        a CSV file is read with ``read_bars``, so its ``Date`` column becomes the
+        index (it used to be returned as a column over a RangeIndex).
+        """
+        if self.symbol and self.catalog is not None:
+            return self.load_catalog()
+        if self.symbol:
+            return self.load_store()
+
+        csv_files = sorted(file for file in listdir(self.folder_path) if file.endswith('.csv'))
         if not csv_files:
             raise FileNotFoundError("No CSV files found in the specified folder.")
 
@@ -136,7 +468,7 @@ class DataLoder:
         
         selected_file = csv_files[self.file_number]
         data_path = path.join(self.folder_path, selected_file)
-        df = pd.read_csv(data_path)
+        df = read_bars(data_path, price_dtype=self.price_dtype)
         # df['Date'] = pd.to_datetime(df['Date'])  # Convert 'Date' column to datetime
         # df.set_index('Date', inplace=True)  # Set 'Date' column as index
 
@@ -0,0 +1,94 @@
+import re
+import pandas as pd
+from importlib.util import find_spec
+
+# pyarrow's multithreaded parser is much faster when it is installed
+CSV_ENGINE = 'pyarrow' if find_spec('pyarrow') else 'c'
+
+MARKET_TZ = 'America/New_York'
+
+SCHEMAS = {
+    # timestamp,volume,vw,open,close,high,low,t,number_of_trades
+    'POLYGON': {
+        'index': 't',
+        'skip': ['timestamp'],
+        'prices': ['vw', 'open', 'close', 'high', 'low'],
+        'dtypes': {'volume': 'float64', 't': 'int64', 'number_of_trades': 'int64'},
+    },
+    # Date,Open,High,Low,Close,Adj Close,Volume (intraday files have an unnamed, tz-aware index)
+    'YAHOO': {
+        'index': 0,
+        'index_format': 'ISO8601',
+        'prices': ['Open', 'High', 'Low', 'Close', 'Adj Close'],
+        'dtypes': {'Volume': 'int64'},
+    },
+    # ,Open,High,Low,Close,Volume as written by the former AlphaData.py script
+    'ALPHA': {
+        'index': 0,
+        'index_format': '%Y-%m-%d %H:%M:%S',
+        'prices': ['Open', 'High', 'Low', 'Close'],
+        'dtypes': {'Volume': 'float64'},
+    },
+    # Date,Volume,VW,Open,Close,High,Low,Number_of_trades as written by DataResampler
+    'RESAMPLED': {
+        'index': 'Date',
+        'index_format': 'ISO8601',
+        'prices': ['VW', 'Open', 'Close', 'High', 'Low'],
+        'dtypes': {'Volume': 'float64', 'Number_of_trades': 'int64'},
+    },
+}
+
+def detect_schema(file_path):
+    """Guess the provider schema of a CSV file from its header."""
+    with open(file_path) as f:
+        header = f.readline().strip().split(',')
+    if 't' in header and 'timestamp' in header:
+        return 'POLYGON'
+    if 'Adj Close' in header:
+        return 'YAHOO'
+    if 'VW' in header and 'Date' in header:
+        return 'RESAMPLED'
+    return 'ALPHA'
+
+def read_options(schema, price_dtype='float64'):
+    dtypes = dict(schema['dtypes'])
+    dtypes.update({col: price_dtype for col in schema['prices']})
+    skip = set(schema.get('skip', []))
+    return dtypes, (lambda col: col not in skip)
+
+def to_index(df, schema):
+    """Turn the schema's time column into a DatetimeIndex without parsing text where possible."""
+    if schema['index'] == 't':
+        # Epoch milliseconds become a datetime64[ms] index by reinterpreting the int64 values
+        t = df['t'].to_numpy(dtype='int64')
+        df.index = pd.DatetimeIndex(t.view('datetime64[ms]'), name='timestamp')
+        return df
+
+    column = df.columns[0] if schema['index'] == 0 else schema['index']
+    values = df.pop(column)
+    if len(values) and re.search(r'([+-]\d\d:\d\d|Z)$', str(values.iloc[0])):
+        # Offsets change with daylight saving time, so parse through UTC
+        index = pd.to_datetime(values, format=schema['index_format'], utc=True).dt.tz_convert(MARKET_TZ)
+    else:
+        index = pd.to_datetime(values, format=schema['index_format'])
+    df.index = pd.DatetimeIndex(index, name='Date')
+    return df
+
+def read_bars(file_path, provider=None, price_dtype='float64', chunksize=None):
+    """Read a bar CSV with the declared dtypes of its provider and a DatetimeIndex.
+
+    Polygon files are indexed by their int64 epoch ``t`` column; the text
+    ``timestamp`` column is never parsed. ``price_dtype='float32'`` halves the
+    memory of the price columns. With ``chunksize`` an iterator of frames is
+    returned instead.
+    """
+    schema = SCHEMAS[provider or detect_schema(file_path)]
+    dtypes, usecols = read_options(schema, price_dtype)
+
+    if chunksize:
+        # pyarrow cannot read in chunks
+        reader = pd.read_csv(file_path, dtype=dtypes, usecols=usecols, chunksize=chunksize, engine='c')
+        return (to_index(chunk, schema) for chunk in reader)
+
+    df = pd.read_csv(file_path, dtype=dtypes, usecols=usecols, engine=CSV_ENGINE)
+    return to_index(df, schema)
@@ -0,0 +1,562 @@
+import io
+import os
+import re
+import json
+import hashlib
+import datetime
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on this platform: consolidation relies on unique temporary files alone
+    fcntl = None
+
+STORE_ROOT = os.path.join('data', 'store')
+
+# .npy header readers and writers by format version, for appending rows in place
+NPY_HEADERS = {
+    (1, 0): (np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0),
+    (2, 0): (np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0),
+}
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'vw', 'adj_close']
+# Volume stays float64: crypto, FX and adjusted volumes are fractional
+VOLUME_COLUMNS = ['volume']
+COUNT_COLUMNS = ['number_of_trades']
+
+class BarStore:
+    """Columnar bar store partitioned by provider/symbol/timespan/year/month.
+
+    Each partition is a directory holding one ``.npy`` file per column, with
+    ``t`` as int64 epoch milliseconds (UTC), and a ``_meta.json`` describing it.
+    Written partitions are registered in ``catalog``, by default the
+    ``catalog.sqlite`` next to the store root (pass ``catalog=False`` to skip).
+    """
+
+    def __init__(self, root=STORE_ROOT, price_dtype='float64', catalog=None):
+        self.root = root
+        self.price_dtype = np.dtype(price_dtype)
+        if catalog is None:
+            from data.Catalog import DataCatalog
+            catalog = DataCatalog(os.path.join(os.path.dirname(os.path.normpath(root)), 'catalog.sqlite'))
+        self.catalog = catalog or None
+
+    def series_path(self, provider, symbol, timespan):
+        return os.path.join(self.root, provider, symbol, str(timespan))
+
+    def partition_path(self, provider, symbol, timespan, year, month):
+        return os.path.join(self.series_path(provider, symbol, timespan), f"{year:04d}", f"{month:02d}")
+
+    def partitions(self, provider, symbol, timespan):
+        """Return the sorted list of (year, month, path) partitions stored for a series."""
+        series_path = self.series_path(provider, symbol, timespan)
+        if not os.path.isdir(series_path):
+            return []
+
+        partitions = []
+        for year in sorted(os.listdir(series_path)):
+            year_path = os.path.join(series_path, year)
+            if not year.isdigit() or not os.path.isdir(year_path):
+                continue
+            for month in sorted(os.listdir(year_path)):
+                month_path = os.path.join(year_path, month)
+                if month.isdigit() and os.path.exists(os.path.join(month_path, '_meta.json')):
+                    partitions.append((int(year), int(month), month_path))
+        return partitions
+
+    @staticmethod
+    def read_meta(partition_path):
+        with open(os.path.join(partition_path, '_meta.json')) as f:
+            return json.load(f)
+
+    def normalize(self, df):
+        """Convert a bar frame into typed columns keyed by lower-case name, sorted and unique on ``t``."""
+        df = df.copy()
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+
+        if 't' in df.columns:
+            t = df['t'].to_numpy(dtype='int64')
+        else:
+            index = pd.DatetimeIndex(df.index)
+            if index.tz is not None:
+                index = index.tz_convert('UTC').tz_localize(None)
+            t = index.as_unit('ms').asi8
+
+        columns = {'t': t}
+        for col in df.columns:
+            if col in ('t', 'timestamp', 'date'):
+                continue
+            values = df[col]
+            if col in PRICE_COLUMNS:
+                columns[col] = values.to_numpy(dtype=self.price_dtype, na_value=np.nan)
+            elif col in VOLUME_COLUMNS:
+                columns[col] = values.fillna(0).to_numpy(dtype='float64')
+            elif col in COUNT_COLUMNS:
+                columns[col] = values.fillna(0).to_numpy(dtype='int64')
+            elif pd.api.types.is_numeric_dtype(values):
+                columns[col] = values.to_numpy(dtype='float64', na_value=np.nan)
+
+        order = np.argsort(t, kind='stable')
+        columns = {col: values[order] for col, values in columns.items()}
+        _, first = np.unique(columns['t'], return_index=True)
+        if len(first) != len(order):
+            columns = {col: values[first] for col, values in columns.items()}
+        return columns
+
+    def load_partition(self, partition_path, columns=None, mmap_mode=None):
+        meta = self.read_meta(partition_path)
+        names = meta['columns'] if columns is None else ['t'] + [col for col in columns if col != 't']
+        # Rows past meta['rows'] belong to an append that was not committed
+        return {
+            col: np.load(os.path.join(partition_path, f"{col}.npy"), mmap_mode=mmap_mode)[:meta['rows']]
+            for col in names if col in meta['columns']
+        }
+
+    def write_partition(self, partition_path, columns):
+        """Write a partition's columns, committing by replacing ``_meta.json`` last."""
+        os.makedirs(partition_path, exist_ok=True)
+        digest = hashlib.blake2b(digest_size=20)
+        for col, values in columns.items():
+            values = np.ascontiguousarray(values)
+            digest.update(values)
+            final_path = os.path.join(partition_path, f"{col}.npy")
+            tmp_path = temp_path(final_path)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, final_path)
+
+        t = columns['t']
+        meta = {
+            'rows': int(len(t)),
+            'start': int(t[0]) if len(t) else None,
+            'end': int(t[-1]) if len(t) else None,
+            'columns': list(columns),
+            'dtypes': {col: str(values.dtype) for col, values in columns.items()},
+            'checksum': digest.hexdigest(),
+        }
+        write_json(os.path.join(partition_path, '_meta.json'), meta)
+        return meta
+
+    def append_partition(self, partition_path, meta, part):
+        """Append rows newer than a partition's last bar to its column files in place; None when they cannot take them.
+
+        Only the new rows are written, and each ``.npy`` header is rewritten in
+        place (NumPy leaves room for the row count to grow). ``_meta.json`` is
+        still replaced last, so readers never see uncommitted rows. The checksum
+        is chained from the previous one and the new rows.
+        """
+        if set(part) != set(meta['columns']) or any(str(values.dtype) != meta['dtypes'][col] for col, values in part.items()):
+            return None
+        rows = meta['rows'] + len(part['t'])
+        headers = {}
+        for col, values in part.items():
+            header = npy_append_header(os.path.join(partition_path, f"{col}.npy"), values.dtype, meta['rows'], rows)
+            if header is None:
+                return None
+            headers[col] = header
+
+        digest = hashlib.blake2b((meta.get('checksum') or '').encode(), digest_size=20)
+        for col, values in part.items():
+            values = np.ascontiguousarray(values)
+            digest.update(values)
+            offset, header = headers[col]
+            with open(os.path.join(partition_path, f"{col}.npy"), 'r+b') as f:
+                # Drop rows left by an append that never committed, then add the new ones
+                f.seek(offset + meta['rows'] * values.dtype.itemsize)
+                f.truncate()
+                f.write(values.tobytes())
+                f.seek(0)
+                f.write(header)
+
+        meta = dict(meta, rows=rows, end=int(part['t'][-1]), checksum=digest.hexdigest())
+        write_json(os.path.join(partition_path, '_meta.json'), meta)
+        return meta
+
+    def merge_columns(self, existing, new):
+        """Merge sorted new rows into stored columns; stored rows win over new rows with the same timestamp.
+
+        Stored rows before the first new timestamp are kept as they are, so only
+        the overlapping tail is re-sorted. Strictly newer rows are just appended.
+        """
+        names = list(existing) + [col for col in new if col not in existing]
+        length_existing, length_new = len(existing['t']), len(new['t'])
+        split = int(np.searchsorted(existing['t'], new['t'][0], side='left'))
+
+        head, tail = {}, {}
+        for col in names:
+            left = existing.get(col)
+            right = new.get(col)
+            dtype = (left if left is not None else right).dtype
+            if left is None:
+                left = np.full(length_existing, np.nan if dtype.kind == 'f' else 0, dtype=dtype)
+            if right is None:
+                right = np.full(length_new, np.nan if dtype.kind == 'f' else 0, dtype=dtype)
+            head[col] = np.asarray(left[:split])
+            tail[col] = np.concatenate([np.asarray(left[split:]), np.asarray(right).astype(dtype, copy=False)])
+
+        if split < length_existing:
+            order = np.argsort(tail['t'], kind='stable')
+            tail = {col: values[order] for col, values in tail.items()}
+            _, first = np.unique(tail['t'], return_index=True)
+            tail = {col: values[first] for col, values in tail.items()}
+
+        return {col: np.concatenate([head[col], tail[col]]) for col in names}
+
+    def last_timestamp(self, provider, symbol, timespan):
+        """Return the last stored ``t`` (epoch ms) of a series, or None when nothing is stored."""
+        partitions = self.partitions(provider, symbol, timespan)
+        for _, _, partition_path in reversed(partitions):
+            meta = self.read_meta(partition_path)
+            if meta['rows']:
+                return meta['end']
+        return None
+
+    def write_month(self, partition_path, part):
+        """Merge one month of normalized columns into its partition.
+
+        Rows all newer than the stored ones are appended, so a refresh costs
+        time proportional to the new rows; overlaps are merged and rewritten.
+        """
+        if os.path.exists(os.path.join(partition_path, '_meta.json')):
+            meta = self.read_meta(partition_path)
+            if meta['rows'] and part['t'][0] > meta['end']:
+                if self.append_partition(partition_path, meta, part) is not None:
+                    return
+            elif meta['rows'] and meta['end'] >= part['t'][-1] and meta['start'] <= part['t'][0] \
+                    and set(part) <= set(meta['columns']) and meta['rows'] >= len(part['t']):
+                # Possibly a pure re-download: skip the rewrite when every row is already stored
+                stored = np.load(os.path.join(partition_path, 't.npy'), mmap_mode='r')[:meta['rows']]
+                if np.isin(part['t'], stored, assume_unique=True).all():
+                    return
+            part = self.merge_columns(self.load_partition(partition_path), part)
+        self.write_partition(partition_path, part)
+
+    def write(self, df, provider, symbol, timespan):
+        """Write a bar frame into its monthly partitions and return the series path."""
+        columns = self.normalize(df)
+        if len(columns['t']) == 0:
+            return self.series_path(provider, symbol, timespan)
+
+        months = columns['t'].astype('datetime64[ms]').astype('datetime64[M]')
+        boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+        for rows in np.split(np.arange(len(months)), boundaries):
+            month = months[rows[0]].astype(object)
+            part = {col: values[rows] for col, values in columns.items()}
+            partition_path = self.partition_path(provider, symbol, timespan, month.year, month.month)
+            self.write_month(partition_path, part)
+            if self.catalog is not None:
+                self.catalog.register(partition_path, symbol, provider, timespan)
+
+        return self.series_path(provider, symbol, timespan)
+
+    def read_arrays(self, provider, symbol, timespan, start=None, end=None, columns=None, mmap_mode=None):
+        """Return a dict of NumPy columns for ``start <= t <= end`` (dates, strings or epoch ms).
+
+        A date-only ``end`` such as ``'2023-03-02'`` includes the bars of that day.
+        """
+        start_ms = None if start is None else to_epoch_ms(start)
+        end_ms = None if end is None else to_end_ms(end)
+
+        chunks = []
+        for _, _, partition_path in self.partitions(provider, symbol, timespan):
+            meta = self.read_meta(partition_path)
+            if meta['rows'] == 0:
+                continue
+            if start_ms is not None and meta['end'] < start_ms:
+                continue
+            if end_ms is not None and meta['start'] > end_ms:
+                continue
+
+            part = self.load_partition(partition_path, columns, mmap_mode=mmap_mode)
+            lo = 0 if start_ms is None else np.searchsorted(part['t'], start_ms, side='left')
+            hi = len(part['t']) if end_ms is None else np.searchsorted(part['t'], end_ms, side='right')
+            chunks.append({col: values[lo:hi] for col, values in part.items()})
+
+        if not chunks:
+            raise FileNotFoundError(f"No stored bars for {provider}/{symbol}/{timespan} in the requested range.")
+        if len(chunks) == 1:
+            return chunks[0]
+        return {col: np.concatenate([chunk[col] for chunk in chunks]) for col in chunks[0]}
+
+    def read(self, provider, symbol, timespan, start=None, end=None, columns=None):
+        """Return stored bars as a DataFrame indexed by ``timestamp``."""
+        arrays = self.read_arrays(provider, symbol, timespan, start, end, columns)
+        return arrays_to_frame(arrays)
+
+    def lock(self, provider, symbol, timespan):
+        """Hold an exclusive lock on a series' ``_mmap`` files across threads and processes."""
+        return file_lock(os.path.join(self.series_path(provider, symbol, timespan), '_mmap.lock'))
+
+    def consolidate(self, provider, symbol, timespan):
+        """Write every stored column of a series into one contiguous file per column under ``_mmap``.
+
+        The files are rebuilt only when the partitions they were built from
+        change. Concurrent callers are serialised by ``lock``: the first one
+        rebuilds and the others find the files up to date.
+        """
+        with self.lock(provider, symbol, timespan):
+            return self.build_mmap(provider, symbol, timespan)
+
+    def build_mmap(self, provider, symbol, timespan):
+        mmap_path = os.path.join(self.series_path(provider, symbol, timespan), '_mmap')
+        partitions = self.partitions(provider, symbol, timespan)
+        if not partitions:
+            raise FileNotFoundError(f"No stored bars for {provider}/{symbol}/{timespan}.")
+
+        metas = [self.read_meta(partition_path) for _, _, partition_path in partitions]
+        source = [[year, month, meta['rows'], meta['end']] for (year, month, _), meta in zip(partitions, metas)]
+        meta_path = os.path.join(mmap_path, '_meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)['source'] == source:
+                    return mmap_path
+
+        columns = [col for col in metas[0]['columns'] if all(col in meta['columns'] for meta in metas)]
+        dtypes = {col: np.result_type(*[meta['dtypes'][col] for meta in metas]) for col in columns}
+        rows = sum(meta['rows'] for meta in metas)
+
+        os.makedirs(mmap_path, exist_ok=True)
+        for col in columns:
+            final_path = os.path.join(mmap_path, f"{col}.npy")
+            tmp_path = temp_path(final_path)
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtypes[col], shape=(rows,))
+            offset = 0
+            for (_, _, partition_path), meta in zip(partitions, metas):
+                values = np.load(os.path.join(partition_path, f"{col}.npy"), mmap_mode='r')[:meta['rows']]
+                out[offset:offset + len(values)] = values
+                offset += len(values)
+            out.flush()
+            del out
+            os.replace(tmp_path, final_path)
+
+        write_json(meta_path, {'rows': rows, 'columns': columns, 'source': source})
+        return mmap_path
+
+    def memmap_arrays(self, provider, symbol, timespan, start=None, end=None, columns=None):
+        """Return read-only memory-mapped views of a series' columns for ``start <= t <= end`` (a date-only end includes its day).
+
+        Every process mapping the same series shares the OS page cache instead of
+        holding a private copy, and slicing a range never copies data.
+        """
+        # Mapped under the lock, so the columns all come from the same build
+        with self.lock(provider, symbol, timespan):
+            mmap_path = self.build_mmap(provider, symbol, timespan)
+            with open(os.path.join(mmap_path, '_meta.json')) as f:
+                available = json.load(f)['columns']
+
+            names = available if columns is None else ['t'] + [col for col in columns if col != 't' and col in available]
+            arrays = {col: np.load(os.path.join(mmap_path, f"{col}.npy"), mmap_mode='r') for col in names}
+
+        t = arrays['t']
+        lo = 0 if start is None else np.searchsorted(t, to_epoch_ms(start), side='left')
+        hi = len(t) if end is None else np.searchsorted(t, to_end_ms(end), side='right')
+        return {col: values[lo:hi] for col, values in arrays.items()}
+
+def npy_append_header(path, dtype, rows, new_rows):
+    """Return ``(data_offset, header)`` to grow a 1-D ``.npy`` file from ``rows`` to ``new_rows`` in place, or None.
+
+    None when the file is not a plain 1-D ``dtype`` array holding at least
+    ``rows`` values, or when the new header would not fit over the old one.
+    """
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version not in NPY_HEADERS:
+            return None
+        shape, fortran_order, stored_dtype = NPY_HEADERS[version][0](f)
+        offset = f.tell()
+    if fortran_order or len(shape) != 1 or stored_dtype != dtype or shape[0] < rows:
+        return None
+    header = io.BytesIO()
+    NPY_HEADERS[version][1](header, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (new_rows,)})
+    if header.tell() != offset:
+        return None
+    return offset, header.getvalue()
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive advisory lock on ``lock_path`` (created if missing) across threads and processes."""
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    with open(lock_path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def temp_path(final_path):
+    """Create a uniquely named empty file next to ``final_path`` to be written and moved over it with ``os.replace``.
+
+    Unique names keep concurrent writers from truncating each other's files.
+    """
+    fd, path = tempfile.mkstemp(prefix=f"{os.path.basename(final_path)}.", suffix='.tmp', dir=os.path.dirname(final_path))
+    os.close(fd)
+    return path
+
+def write_json(path, data):
+    tmp_path = temp_path(path)
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def to_epoch_ms(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return int(timestamp.value // 1_000_000)
+
+def is_date_only(value):
+    """True for a calendar date without a time: a ``YYYY-MM-DD`` string or a ``datetime.date``."""
+    if isinstance(value, str):
+        return re.fullmatch(r'\s*\d{4}-\d{2}-\d{2}\s*', value) is not None
+    return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+
+def to_end_ms(value):
+    """Inclusive upper bound in epoch ms for a range end; a date-only end includes that whole day."""
+    if is_date_only(value):
+        return to_epoch_ms(pd.Timestamp(value) + pd.Timedelta(days=1)) - 1
+    return to_epoch_ms(value)
+
+def arrays_to_frame(arrays, copy=True):
+    """Build a frame indexed by ``timestamp`` from store columns, keeping ``t`` as a column.
+
+    With ``copy=False`` the index and columns stay views of the given arrays.
+    """
+    index = pd.DatetimeIndex(np.asarray(arrays['t']).view('datetime64[ms]'), name='timestamp', copy=copy)
+    return pd.DataFrame({col: values for col, values in arrays.items()}, index=index, copy=copy)
+
+def csv_series(data_root='data'):
+    """Yield (provider, symbol, key, file_path) for every provider CSV file under ``data_root``.
+
+    POLYGON and ALPHA files live in ``{provider}/{timespan}/{symbol}_{interval}.csv``
+    (older ones ``{symbol}_{from}_to_{to}_{interval}.csv``) and are keyed like the
+    bar store (``minute``, ``5minute``); YAHOO files are ``YAHOO/{symbol}_{interval}.csv``
+    (older ones ``{symbol}_{start}_{end}_{interval}.csv``) and keyed by their interval.
+    """
+    for provider in ('POLYGON', 'ALPHA'):
+        provider_path = os.path.join(data_root, provider)
+        if not os.path.isdir(provider_path):
+            continue
+        for timespan in sorted(os.listdir(provider_path)):
+            timespan_path = os.path.join(provider_path, timespan)
+            if not os.path.isdir(timespan_path):
+                continue
+            for file in sorted(os.listdir(timespan_path)):
+                if not file.endswith('.csv'):
+                    continue
+                parts = file[:-4].split('_')
+                symbol, interval = parts[0], parts[-1]
+                key = timespan if interval == '1' else f"{interval}{timespan}"
+                yield provider, symbol, key, os.path.join(timespan_path, file)
+
+    yahoo_path = os.path.join(data_root, 'YAHOO')
+    if os.path.isdir(yahoo_path):
+        for file in sorted(os.listdir(yahoo_path)):
+            if not file.endswith('.csv'):
+                continue
+            parts = file[:-4].split('_')
+            yield 'YAHOO', parts[0], parts[-1], os.path.join(yahoo_path, file)
+
+def migrate_csv_tree(data_root='data', store=None):
+    """Convert the provider CSV tree (POLYGON, ALPHA and YAHOO) under ``data_root`` into the bar store."""
+    store = store or BarStore()
+    migrated = []
+
+    for provider, symbol, key, file_path in csv_series(data_root):
+        if provider == 'YAHOO':
+            df = pd.read_csv(file_path, index_col=0)
+            df.index = pd.to_datetime(df.index, utc=True)
+        else:
+            df = pd.read_csv(file_path, index_col=0, parse_dates=True)
+        store.write(df, provider, symbol, key)
+        migrated.append(file_path)
+        print(f"Migrated {os.path.basename(file_path)} to {store.series_path(provider, symbol, key)}")
+
+    return migrated
+
+def utc_naive(index):
+    """Return a DatetimeIndex as naive UTC so tz-aware and naive timestamps compare."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index
+
+def read_csv_tail(f, since, header_length, block_size=1 << 16):
+    """Scan a time-sorted CSV backwards and return (offset, lines) for the rows at or after ``since``."""
+    position = f.seek(0, os.SEEK_END)
+    buffer = b''
+    lines = []
+    while position > header_length or buffer:
+        if position > header_length:
+            read_size = min(block_size, position - header_length)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+
+        if position > header_length:
+            # Keep the leading partial line for the next block
+            cut = buffer.find(b'\n')
+            if cut < 0:
+                continue
+            complete, buffer, base = buffer[cut + 1:], buffer[:cut + 1], position + cut + 1
+        else:
+            complete, buffer, base = buffer, b'', position
+
+        line_end = base + len(complete)
+        for line in reversed(complete.splitlines(keepends=True)):
+            line_start = line_end - len(line)
+            if line.strip():
+                timestamp = utc_naive([pd.Timestamp(line.split(b',', 1)[0].decode())])[0]
+                if timestamp < since:
+                    return line_end, list(reversed(lines))
+                lines.append(line.rstrip(b'\r\n'))
+            line_end = line_start
+    return header_length, list(reversed(lines))
+
+def append_csv(df, filename):
+    """Write a time-indexed frame into a CSV incrementally.
+
+    Rows strictly newer than the last stored timestamp are appended; rows that
+    overlap the stored tail are merged with just that tail (stored rows win),
+    so the cost is proportional to the new data rather than the whole file.
+    """
+    df = df.sort_index(kind='stable')
+    df = df[~df.index.duplicated(keep='first')]
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        df.to_csv(filename)
+        return len(df)
+
+    with open(filename, 'rb+') as f:
+        header = f.readline()
+        columns = pd.read_csv(io.BytesIO(header), index_col=0).columns
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size > len(header):
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+        offset, lines = read_csv_tail(f, utc_naive(df.index)[0], len(header))
+        if lines:
+            tail = pd.read_csv(io.BytesIO(header + b'\n'.join(lines) + b'\n'), index_col=0)
+            tail.index = pd.to_datetime(tail.index, utc=df.index.tz is not None)
+            if df.index.tz is not None:
+                tail.index = tail.index.tz_convert(df.index.tz)
+            merged = pd.concat([tail, df.reindex(columns=columns)])
+            merged = merged[~merged.index.duplicated(keep='first')].sort_index(kind='stable')
+        else:
+            merged = df.reindex(columns=columns)
+
+        f.seek(offset)
+        f.truncate()
+        f.write(merged.to_csv(header=False).encode())
+
+    return len(merged) - len(lines)
@@ -1,78 +1,25 @@
-import os
-import requests
+import asyncio
+import numpy as np
 import pandas as pd
-from time import sleep
-from dotenv import load_dotenv
+from fetcher.Polygon import FileManager
+from fetcher.RateLimit import TokenBucket, RateLimited, parse_retry_after
+from fetcher.Transport import shared_transport
+from fetcher.ResponseCache import range_ttl
 
-# Load environment variables
-load_dotenv()
+ALPHA_URL = "https://www.alphavantage.co/query"
 
+# Alpha Vantage answers calls over the limit with a 200 holding one of these keys instead of data
+LIMIT_KEYS = ('Note', 'Information')
 
-class AlphaDataFetcher:
-
-    def get_intraday_data(symbol, interval, month, api_key, outputsize='full'):
-        # Construct the API URL
-
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&month={month}&outputsize={outputsize}&apikey={api_key}"
-        # url = "https://www.alphavantage.co/query"
-        # params = {
-        #     'function': 'TIME_SERIES_INTRADAY',
-        #     'symbol': symbol,
-        #     'interval': interval,
-        #     'month': month,
-        #     'apikey': api_key,
-        #     'outputsize': outputsize
-        # }
-        response = requests.get(url)
-        data = response.json()
-        
-        if 'Time Series (' + interval + ')' in data:
-            return data['Time Series (' + interval + ')']
-        else:
-            print(f"Error: {data}")  # Print the raw response for debugging
-            raise ValueError("Unexpected response format or no data available")
-
-    def process_data(data, month):
-        df = pd.DataFrame.from_dict(data, orient='index')
-        df.index = pd.to_datetime(df.index)
-        # Filter data by month
-        df = df[df.index.to_period('M') == pd.Period(month)]
-        df = df.rename(columns={
-            '1. open': 'Open',
-            '2. high': 'High',
-            '3. low': 'Low',
-            '4. close': 'Close',
-            '5. volume': 'Volume'
-        })
-        df = df.astype(float)
-        return df
-
-    def save_to_csv(provider, df, symbol, interval, timespan, start_month, end_month):
-        # Create the 'data' directory if it doesn't exist
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            # Create the 'data' directory if it doesn't exist
-        
-        if not os.path.exists(provider):
-            os.makedirs(provider)
-            # Create the 'data' directory if it doesn't exist
-    
-        # Create timespan directories if they don't exist
-        timespan_path = os.path.join('data', provider, timespan)
-        if not os.path.exists(timespan_path):
-            os.makedirs(timespan_path)
-        # Define the filename based on the symbol, date range, and interval
-        number_only = '1' if ''.join(filter(str.isdigit, interval)) == '60' else ''.join(filter(str.isdigit, interval))
-        filename = f"{timespan_path}/{symbol}_{start_month}_to_{end_month}_{number_only}.csv"
-        
-        # Save the DataFrame to a CSV file
-        df.to_csv(filename)
-        print(f"Data saved to {filename}")
-        
-        # Save the DataFrame to a CSV file
-        df.to_csv(filename)
-        print(f"Data saved to {filename}")
+SERIES_FIELDS = {'1. open': 'Open', '2. high': 'High', '3. low': 'Low', '4. close': 'Close', '5. volume': 'Volume'}
 
+INTERVALS_TIMESPANS = [
+    {'interval': '1min', 'timespan': 'minute'},
+    {'interval': '5min', 'timespan': 'minute'},
+    {'interval': '15min', 'timespan': 'minute'},
+    {'interval': '30min', 'timespan': 'minute'},
+    {'interval': '60min', 'timespan': 'hour'},
+]
 
 def create_month_range(start_month, end_month):
     # Generate a range of months between start_month and end_month
@@ -81,48 +28,168 @@ def create_month_range(start_month, end_month):
     month_range_str = [date.strftime('%Y-%m') for date in month_range]
     return month_range_str
 
-symbol = "SPY"
-provider = "ALPHA"
-start_month = "2020-01"
-end_month = "2024-06"
-
-API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
-
-# intervals_timespans =[
-#     {'interval': '1min', 'timespan': 'minute'},
-#     {'interval': '5min', 'timespan': 'minute'},
-#     {'interval': '15min', 'timespan': 'minute'},
-#     {'interval': '30min', 'timespan': 'minute'},
-#     {'interval': '60min', 'timespan': 'hour'},
-# ]
-
-month_range_array = create_month_range(start_month, end_month)
-
-def main():
-    try:
-        print("month_range_array", month_range_array)
-
-        for  month in month_range_array:
-            request_count = 0
-            total_requests = len(month_range_array)
-            for index, item in enumerate(intervals_timespans):
-                interval = item['interval']
-                timespan = item['timespan']
-                data = get_intraday_data(symbol, interval, month, API_KEY)
-                df = process_data(data, month)
-                print(f"First few rows of data for {symbol} at {interval} interval for {month}:")
-                print(df.head())
-                save_to_csv(provider, df, symbol, interval, timespan, start_month=f"{month}-01", end_month=f"{month}-30") # provider, df, symbol, interval, timespan, start_month, end_month
-
-                request_count += 1
-                if request_count % 5 == 0 and index < total_requests - 1:
-                    print("Waiting for 1/2 minute to avoid API rate limits...")
-                    sleep(30)  # Wait for 1/2 minute
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
-if __name__ == "__main__":
-    main()
+def interval_timespan(interval):
+    """Split an Alpha Vantage interval such as ``5min`` or ``60min`` into the store's ``(interval, timespan)``."""
+    minutes = int(''.join(filter(str.isdigit, interval)))
+    return (minutes // 60, 'hour') if minutes % 60 == 0 else (minutes, 'minute')
+
+def month_end(month):
+    return pd.Period(month).end_time.strftime('%Y-%m-%d')
+
+class AlphaDataFetcher:
+    """Request one month of intraday bars per call from the TIME_SERIES_INTRADAY endpoint."""
+
+    def __init__(self, api_key, base_url=ALPHA_URL, transport=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.transport = transport or shared_transport()
+
+    def query(self, symbol, interval, month, outputsize='full'):
+        return {
+            'function': 'TIME_SERIES_INTRADAY',
+            'symbol': symbol,
+            'interval': interval,
+            'month': month,
+            'outputsize': outputsize,
+            'apikey': self.api_key,
+        }
+
+    def is_cached(self, symbol, interval, month):
+        """True when ``get_intraday_data`` for this month will be answered from the response cache."""
+        return self.transport.cached(self.base_url, self.query(symbol, interval, month), range_ttl(month_end(month))) is not None
+
+    def get_intraday_data(self, symbol, interval, month, outputsize='full'):
+        """Return ``(series, time_zone)``: the month's ``Time Series`` mapping and the zone of its timestamps."""
+        print(f"Req {symbol} {interval} {month}")
+        # Months that have ended never change, so their responses are cached for good;
+        # limit notices also come back as 200s and must not be cached
+        response = self.transport.get(self.base_url, ttl=range_ttl(month_end(month)),
+                                      cacheable=lambda response: b'"Time Series' in response.content,
+                                      params=self.query(symbol, interval, month, outputsize))
+
+        if response.status_code == 429:
+            raise RateLimited(f"Rate limited: {symbol} {interval} {month}", parse_retry_after(response.headers.get('Retry-After')))
+
+        data = response.json()
+        key = f'Time Series ({interval})'
+        if key in data:
+            meta = data.get('Meta Data', {})
+            time_zone = next((value for name, value in meta.items() if name.endswith('Time Zone')), 'US/Eastern')
+            return data[key], time_zone
+        for limit_key in LIMIT_KEYS:
+            if limit_key in data:
+                raise RateLimited(f"Rate limited: {data[limit_key]}")
+        print(f"Error: {data}")  # Print the raw response for debugging
+        raise ValueError("Unexpected response format or no data available")
+
+    def process_data(self, data, month, time_zone='US/Eastern'):
+        """Decode a ``Time Series`` mapping into typed, time-sorted bars indexed in UTC.
+
+        Alpha Vantage stamps bars in exchange time; converting them to naive UTC
+        matches the Polygon series in the bar store.
+        """
+        stamps = np.array(list(data), dtype='datetime64[s]')
+        values = np.array([[bar[field] for field in SERIES_FIELDS] for bar in data.values()], dtype='float64').reshape(-1, len(SERIES_FIELDS))
+        # Filter data by month, then sort oldest first
+        rows = np.flatnonzero(stamps.astype('datetime64[M]') == np.datetime64(month, 'M'))
+        rows = rows[np.argsort(stamps[rows], kind='stable')]
+
+        index = pd.DatetimeIndex(stamps[rows]).tz_localize(time_zone).tz_convert('UTC').tz_localize(None)
+        columns = {name: values[rows, position] for position, name in enumerate(SERIES_FIELDS.values())}
+        return pd.DataFrame(columns, index=index)
+
+class AlphaDataAggregator:
+    """Download months of Alpha Vantage intraday bars concurrently under a token-bucket rate limit.
+
+    Mirrors ``fetcher.Polygon.AsyncDataAggregator``: up to ``concurrency``
+    months are in flight at once, each taking a token from a bucket allowing
+    ``requests_per_minute``, and a limit notice pauses the whole bucket before
+    the month is retried. Each month is written to the bar store as it arrives,
+    and with a ``journal`` each month is journaled as a job (see
+    ``fetcher.Journal.FetchJournal``).
+    """
+
+    def __init__(self, api_key, symbol, month_array, provider="ALPHA", store=None,
+                 requests_per_minute=5, burst=None, concurrency=2, max_retries=5, base_url=ALPHA_URL, transport=None,
+                 journal=None, csv_root=None):
+        self.symbol = symbol
+        self.month_array = month_array
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.fetcher = AlphaDataFetcher(api_key, base_url, transport)
+        self.file_manager = FileManager(provider, store, csv_root)
+        self.journal = journal
+        self.rows_fetched = 0
+
+    async def request_month(self, bucket, interval, month):
+        """Fetch one month under the rate limit, retrying limit notices; returns ``(series, time_zone)``."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            if not self.fetcher.transport.offline and not self.fetcher.is_cached(self.symbol, interval, month):
+                await bucket.acquire()
+            try:
+                return await loop.run_in_executor(None, self.fetcher.get_intraday_data, self.symbol, interval, month)
+            except RateLimited as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = e.retry_after if e.retry_after is not None else 60.0 / self.requests_per_minute
+                print(f"Rate limited, retrying in {wait:.1f}s...")
+                bucket.pause(wait)
+
+    async def fetch_month(self, bucket, semaphore, interval, timespan, month):
+        if self.journal is None:
+            return await self.fetch_bars(bucket, semaphore, interval, timespan, month)
+
+        key = self.journal.add(self.symbol, interval, timespan, f"{month}-01", month_end(month))
+        try:
+            series_path = await self.fetch_bars(bucket, semaphore, interval, timespan, month, key)
+        except Exception as e:
+            self.journal.fail(key, e)
+            raise
+        self.journal.done(key)
+        return series_path
+
+    async def fetch_bars(self, bucket, semaphore, interval, timespan, month, key=None):
+        async with semaphore:
+            if key:
+                self.journal.start(key)
+            data, time_zone = await self.request_month(bucket, interval, month)
+        df = self.fetcher.process_data(data, month, time_zone)
+        if df.empty:
+            raise ValueError(f"No data available for {month}")
+
+        series_path = self.file_manager.save(df, self.symbol, timespan, interval_timespan(interval)[0])
+        self.rows_fetched += len(df)
+        print(f"For interval {interval}: {month} downloded successfully!")
+        return series_path
+
+    def jobs(self, intervals_timespans):
+        """Return the ``(interval, timespan, month)`` requests to run, resuming the journal when it has any."""
+        if self.journal is not None and self.journal.jobs:
+            return [(interval, timespan, from_date[:7]) for _, interval, timespan, from_date, _ in self.journal.unfinished(self.symbol)]
+        jobs = [(item['interval'], item['timespan'], month) for item in intervals_timespans for month in self.month_array]
+        if self.journal is not None:
+            self.journal.plan([(self.symbol, interval, timespan, f"{month}-01", month_end(month)) for interval, timespan, month in jobs])
+        return jobs
+
+    async def run_async(self, intervals_timespans):
+        """Fetch every month of every interval and return ``{(interval, timespan, month): path or exception}``."""
+        bucket = TokenBucket(self.requests_per_minute, burst=self.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        jobs = self.jobs(intervals_timespans)
+        results = await asyncio.gather(*(self.fetch_month(bucket, semaphore, *job) for job in jobs), return_exceptions=True)
+
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f"An error occurred for {job[0]} {job[2]}: {result}")
+        return dict(zip(jobs, results))
+
+    def run(self, intervals_timespans=INTERVALS_TIMESPANS[:1]):
+        return asyncio.run(self.run_async(intervals_timespans))
 
 
 # import os
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import threading
+
+JOURNAL_ROOT = os.path.join('data', 'journal')
+
+PENDING, IN_FLIGHT, DONE, FAILED = 'pending', 'in_flight', 'done', 'failed'
+
+def journal_path(provider, name, root=JOURNAL_ROOT):
+    return os.path.join(root, f"{provider}_{name}.json")
+
+def job_id(symbol, interval, timespan, from_date, to_date):
+    return f"{symbol} {interval} {timespan} {from_date} {to_date}"
+
+class FetchJournal:
+    """Durable record of a backfill's planned requests and how far each one got.
+
+    Every job is ``pending``, ``in_flight``, ``done`` or ``failed`` (with the
+    error). Paged jobs also keep the cursor of their next page, advanced only
+    after the previous page was committed to the store. The file is rewritten
+    through a temporary file and ``os.replace`` on every change, so a crash
+    leaves either the old or the new journal, never a torn one.
+
+    A journal that already holds jobs is resumed: its unfinished jobs run
+    again in their recorded order, in-flight ones from their saved cursor.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path):
+        journal = cls(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                journal.jobs = json.load(f)['jobs']
+        return journal
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'updated_at': time.time(), 'jobs': self.jobs}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def update(self, key, **fields):
+        with self.lock:
+            self.jobs[key].update(fields, updated_at=time.time())
+            self.save()
+
+    def plan(self, jobs):
+        """Record ``(symbol, interval, timespan, from_date, to_date)`` requests; already journaled ones are kept as they are."""
+        with self.lock:
+            for symbol, interval, timespan, from_date, to_date in jobs:
+                self.jobs.setdefault(job_id(symbol, interval, timespan, from_date, to_date), {
+                    'symbol': symbol, 'interval': interval, 'timespan': timespan,
+                    'from_date': from_date, 'to_date': to_date,
+                    'state': PENDING, 'cursor': None, 'rows': 0, 'error': None,
+                })
+            self.save()
+
+    def add(self, symbol, interval, timespan, from_date, to_date):
+        """Record one request and return its key."""
+        key = job_id(symbol, interval, timespan, from_date, to_date)
+        if key not in self.jobs:
+            self.plan([(symbol, interval, timespan, from_date, to_date)])
+        return key
+
+    def start(self, key):
+        self.update(key, state=IN_FLIGHT, error=None)
+
+    def advance(self, key, cursor, rows):
+        """Record a committed page: ``cursor`` is the next page to request, ``rows`` the bars just stored."""
+        with self.lock:
+            self.update(key, cursor=cursor, rows=self.jobs[key]['rows'] + rows)
+
+    def done(self, key):
+        self.update(key, state=DONE, cursor=None)
+
+    def fail(self, key, error):
+        self.update(key, state=FAILED, error=f"{type(error).__name__}: {error}")
+
+    def cursor(self, key):
+        return self.jobs[key]['cursor']
+
+    def rows(self, key):
+        return self.jobs[key]['rows']
+
+    def unfinished(self, symbol=None):
+        """Return the jobs still to run as ``(symbol, interval, timespan, from_date, to_date)``, in planned order."""
+        return [(job['symbol'], job['interval'], job['timespan'], job['from_date'], job['to_date'])
+                for job in self.jobs.values()
+                if job['state'] != DONE and (symbol is None or job['symbol'] == symbol)]
+
+    def summary(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job['state']] = counts.get(job['state'], 0) + 1
+        return counts
+
+    def report(self):
+        counts = self.summary()
+        print(f"Journal {self.path}: " + ', '.join(f"{counts.get(state, 0)} {state}" for state in (DONE, FAILED, IN_FLIGHT, PENDING)))
+        for job in self.jobs.values():
+            if job['state'] == FAILED:
+                print(f"  {job['symbol']} {job['from_date']} to {job['to_date']}: {job['error']}")
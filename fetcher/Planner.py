@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import Day, DateOffset
+from pandas.tseries.holiday import (AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr,
+                                    USPresidentsDay, USMemorialDay, USLaborDay, USThanksgivingDay,
+                                    nearest_workday, sunday_to_monday, TH)
+from data.Store import BarStore, to_epoch_ms
+
+MARKET_TZ = 'America/New_York'
+
+# Regular session close, and the close of the half days before and after some holidays
+SESSION_CLOSE = pd.Timedelta(hours=16)
+EARLY_CLOSE = pd.Timedelta(hours=13)
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Full-day NYSE holidays (one-off closures such as national days of mourning are not included)."""
+    rules = [
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-06-19', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+class NYSEEarlyCloseCalendar(AbstractHolidayCalendar):
+    """Trading days on which the NYSE closes at 13:00.
+
+    July 3 and December 24 are half days from Monday to Thursday; on a Friday
+    they are the observed holiday instead.
+    """
+    rules = [
+        Holiday('Independence Day Eve', month=7, day=3, days_of_week=(0, 1, 2, 3)),
+        Holiday('Day after Thanksgiving', month=11, day=1, offset=[DateOffset(weekday=TH(4)), Day(1)]),
+        Holiday('Christmas Eve', month=12, day=24, days_of_week=(0, 1, 2, 3)),
+    ]
+
+def session_close(day):
+    """Return the close of the regular session on ``day`` as a time of day (13:00 on early closes)."""
+    day = pd.Timestamp(day).normalize()
+    return EARLY_CLOSE if len(NYSEEarlyCloseCalendar().holidays(day, day)) else SESSION_CLOSE
+
+def trading_days(start, end):
+    """Return the NYSE trading days between ``start`` and ``end`` (inclusive) as a DatetimeIndex."""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    holidays = NYSEHolidayCalendar().holidays(start, end)
+    return pd.bdate_range(start, end, freq='C', holidays=holidays)
+
+def stored_days(store, provider, symbol, timespan, start, end):
+    """Return the market-timezone days holding complete data in the bar store.
+
+    The last stored day only counts when its last bar ends at the session close
+    (13:00 on early closes), so a day fetched while the market was open is
+    fetched again.
+    """
+    lo = pd.Timestamp(start).tz_localize(MARKET_TZ).tz_convert('UTC')
+    hi = (pd.Timestamp(end) + pd.Timedelta(days=1)).tz_localize(MARKET_TZ).tz_convert('UTC')
+    try:
+        t = store.read_arrays(provider, symbol, timespan, to_epoch_ms(lo), to_epoch_ms(hi) - 1, columns=['t'], mmap_mode='r')['t']
+    except FileNotFoundError:
+        return pd.DatetimeIndex([])
+
+    times = pd.DatetimeIndex(np.asarray(t).view('datetime64[ms]')).tz_localize('UTC').tz_convert(MARKET_TZ)
+    days = times.normalize().tz_localize(None).unique()
+    if timespan.endswith('minute') and len(days):
+        # Series keys are 'minute' or '{interval}minute'
+        bar = pd.Timedelta(minutes=int(timespan[:-len('minute')] or 1))
+        last_day = times[-1].normalize()
+        if times[-1] - last_day + bar < session_close(last_day.tz_localize(None)):
+            days = days[:-1]
+    return days
+
+def catalog_days(catalog, provider, symbol, timespan, start, end):
+    """Return the trading days inside the time span of every catalogued CSV file of the series."""
+    covered = [trading_days(pd.Timestamp(row['start_ms'], unit='ms'), pd.Timestamp(row['end_ms'], unit='ms'))
+               for row in catalog.find(symbol, provider, timespan, start, end)]
+    return covered[0].append(covered[1:]).unique() if covered else pd.DatetimeIndex([])
+
+def plan_backfill(symbol, start, end, provider='POLYGON', timespan='minute', store=None, catalog=None, merge_gap=0):
+    """Return the fewest ``(from_date, to_date)`` requests that cover the missing trading days.
+
+    Missing days are the trading days in ``[start, end]`` without complete data
+    in the store (or inside a catalogued file). Consecutive missing trading days
+    form one request, and requests separated by at most ``merge_gap`` already
+    stored trading days are merged, trading a little refetching for fewer calls.
+    """
+    store = store or BarStore()
+    days = trading_days(start, end)
+    have = stored_days(store, provider, symbol, timespan, start, end)
+    if catalog is not None:
+        have = have.append(catalog_days(catalog, provider, symbol, timespan, start, end)).unique()
+    missing = ~days.isin(have)
+
+    ranges = []
+    run_start, gap = None, 0
+    for position, day in enumerate(days):
+        if missing[position]:
+            if run_start is not None and gap <= merge_gap:
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+            run_start, gap = day, 0
+        elif run_start is not None:
+            gap += 1
+            if gap > merge_gap:
+                run_start = None
+
+    return [(first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')) for first, last in ranges]
@@ -1,31 +1,166 @@
 import os
-import requests
+import re
+import json
+import asyncio
+import calendar
+import numpy as np
 import pandas as pd
 from time import sleep
 from datetime import datetime
 from dotenv import load_dotenv
+from data.Store import BarStore, append_csv
+from fetcher.RateLimit import TokenBucket, RateLimited, parse_retry_after
+from fetcher.Transport import shared_transport
+from fetcher.ResponseCache import range_ttl
 
 load_dotenv()
 
+POLYGON_URL = "https://api.polygon.io"
+
+# Largest page the aggregates endpoint serves; longer ranges continue through next_url
+PAGE_LIMIT = 50000
+
+def month_range(start_day):
+    """Return the first and last day (YYYY-MM-DD) of a YYYY-MM month."""
+    year, month = (int(part) for part in start_day.split('-')[:2])
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
+# Aggregate fields, their dtypes and the column names used everywhere else
+AGGREGATE_FIELDS = {
+    't': ('int64', 't'),
+    'o': ('float64', 'open'),
+    'h': ('float64', 'high'),
+    'l': ('float64', 'low'),
+    'c': ('float64', 'close'),
+    'v': ('float64', 'volume'),
+    'vw': ('float64', 'vw'),
+    'n': ('int64', 'number_of_trades'),
+}
+
+RESULTS_KEY = re.compile(rb'"results"\s*:\s*\[')
+FIRST_RESULT = re.compile(rb'"results"\s*:\s*\[\s*\{')
+STATUS_OK = re.compile(rb'"status"\s*:\s*"OK"')
+FIELD_NAME = re.compile(rb'"([a-z]+)"\s*:')
+WHITESPACE = b' \n\r\t'
+
+def results_to_arrays(results):
+    """Convert a list of result dicts into typed arrays, for payloads the fast path does not handle."""
+    df = pd.DataFrame(results)
+    # A bar without a timestamp cannot be placed, so it is dropped and ``t`` stays int64
+    if 't' not in df:
+        return {}
+    df = df[df['t'].notna()]
+    if df.empty:
+        return {}
+    arrays = {}
+    for field, (dtype, _) in AGGREGATE_FIELDS.items():
+        if field in df:
+            values = df[field]
+            arrays[field] = values.to_numpy(dtype=dtype) if values.notna().all() else values.to_numpy(dtype='float64')
+    return arrays
+
+def decode_aggregates(payload):
+    """Decode an aggregates response body into ``(body, arrays)``.
+
+    ``arrays`` holds one typed NumPy array per field (``{}`` for an empty page).
+    The ``results`` array is never turned into Python dicts: once a byte-level
+    check confirms that every row has the same keys in the same order, the
+    keys and braces are deleted and the remaining numbers are parsed in one
+    ``np.fromstring`` call into a preallocated (rows, fields) block. Other
+    payloads fall back to ``json``.
+    """
+    match = RESULTS_KEY.search(payload)
+    if match is None:
+        return json.loads(payload), {}
+    # Result rows are flat objects, so the first ']' closes the array
+    end = payload.index(b']', match.end())
+    body = json.loads(payload[:match.start()] + b'"results":[]' + payload[end + 1:])
+    segment = payload[match.end():end].strip()
+    if not segment:
+        return body, {}
+
+    names = [key.decode() for key in FIELD_NAME.findall(segment[:segment.index(b'}') + 1])]
+    rows = segment.count(b'{')
+    row_skeleton = b'{' + b','.join(f'"{name}":'.encode() for name in names) + b'}'
+    # With the numbers removed, a well-formed page is the row skeleton repeated
+    skeleton = segment.translate(None, b'0123456789.-+eE' + WHITESPACE)
+    if len(set(names)) != len(names) or not set(names) <= set(AGGREGATE_FIELDS) \
+            or skeleton != b','.join([row_skeleton] * rows):
+        return body, results_to_arrays(json.loads(b'[' + segment + b']'))
+
+    key_bytes = bytes(set(b''.join(name.encode() for name in names)))
+    numbers = segment.translate(None, b'{}":' + key_bytes + WHITESPACE)
+    block = np.empty((rows, len(names)), dtype='float64')
+    block.ravel()[:] = np.fromstring(numbers, dtype='float64', sep=',')
+    # Integer fields (epoch ms and trade counts) are exact in float64 below 2**53
+    return body, {name: np.ascontiguousarray(block[:, position], dtype=AGGREGATE_FIELDS[name][0])
+                  for position, name in enumerate(names)}
+
+def is_complete_page(response):
+    """True for a page worth caching: status OK with at least one bar.
+
+    Error bodies, DELAYED (not yet final) pages and empty pages are refetched
+    instead of replayed.
+    """
+    return STATUS_OK.search(response.content) is not None and FIRST_RESULT.search(response.content) is not None
+
+def arrays_to_frame(arrays):
+    """Build the aggregate frame from decoded arrays without copying, indexed by ``t`` as datetime64[ms]."""
+    index = pd.DatetimeIndex(arrays['t'].view('datetime64[ms]'), name='timestamp', copy=False)
+    columns = {AGGREGATE_FIELDS[field][1]: values for field, values in arrays.items()}
+    return pd.DataFrame(columns, index=index, copy=False)
+
 class DataFetcher:
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=POLYGON_URL, transport=None):
         self.api_key = api_key
+        self.base_url = base_url
+        self.transport = transport or shared_transport()
 
-    def get_aggregated_data(self, symbol, timespan, interval, from_date, to_date):
-        url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/range/{interval}/{timespan}/{from_date}/{to_date}?adjusted=true&sort=asc&limit=5000&apiKey={self.api_key}"
-       
+    def aggregates_url(self, symbol, timespan, interval, from_date, to_date):
+        return f"{self.base_url}/v2/aggs/ticker/{symbol}/range/{interval}/{timespan}/{from_date}/{to_date}?adjusted=true&sort=asc&limit={PAGE_LIMIT}"
+
+    def is_cached(self, url, ttl=None):
+        """True when ``get_page(url, ttl)`` will be answered from the response cache."""
+        return self.transport.cached(url, {'apiKey': self.api_key}, ttl) is not None
+
+    def get_page(self, url, ttl=0):
+        """Request one page and return ``(arrays, next_url)``; ``next_url`` is None on the last page.
+
+        ``ttl`` is passed to the transport's response cache (None: keep forever).
+        """
         print(f"Req url: {url}")
 
-        response = requests.get(url)
+        # next_url cursors do not carry the key, so it is always sent as a parameter
+        response = self.transport.get(url, ttl=ttl, params={'apiKey': self.api_key}, cacheable=is_complete_page)
 
-        data = response.json()
-        if 'results' in data:
-            return data['results']
-        else:
+        if response.status_code == 429:
+            raise RateLimited(f"Rate limited: {url}", parse_retry_after(response.headers.get('Retry-After')))
+
+        data, results = decode_aggregates(response.content)
+        if not results and data.get('status') not in ('OK', 'DELAYED'):
             print(f"Error: {data}")
             raise ValueError("Unexpected response format or no data available")
+        return results, data.get('next_url')
+
+    def iter_aggregated_pages(self, symbol, timespan, interval, from_date, to_date):
+        """Yield the decoded arrays of a range page by page, following ``next_url`` cursors."""
+        url = self.aggregates_url(symbol, timespan, interval, from_date, to_date)
+        ttl = range_ttl(to_date)
+        while url:
+            results, url = self.get_page(url, ttl)
+            if results:
+                yield results
+
+    def get_aggregated_data(self, symbol, timespan, interval, from_date, to_date):
+        pages = list(self.iter_aggregated_pages(symbol, timespan, interval, from_date, to_date))
+        if not pages:
+            raise ValueError("Unexpected response format or no data available")
+        return {field: np.concatenate([page[field] for page in pages]) for field in pages[0]}
 
     def process_data(self, data):
+        if isinstance(data, dict):
+            return arrays_to_frame(data)
+
         df = pd.DataFrame(data)
         df['timestamp'] = pd.to_datetime(df['t'], unit='ms')
         df.set_index('timestamp', inplace=True)
@@ -35,68 +170,221 @@ class DataFetcher:
         return df
 
 class FileManager:
-    def __init__(self, provider):
+    def __init__(self, provider, store=None, csv_root=None):
         self.provider = provider
-
-    def save_to_csv(self, df, symbol, timespan, interval, from_date, to_date):
-        if not os.path.exists('data'):
-            os.makedirs('data')
-        
-        provider_path = os.path.join('data', self.provider)
-        if not os.path.exists(provider_path):
-            os.makedirs(provider_path)
-
-        timespan_path = os.path.join(provider_path, timespan)
-        if not os.path.exists(timespan_path):
-            os.makedirs(timespan_path)
-
-        filename = f"{timespan_path}/{symbol}_{from_date}_to_{to_date}_{interval}.csv"
-        if os.path.exists(filename):
-            existing_data = pd.read_csv(filename, index_col=0, parse_dates=True)
-            df = pd.concat([existing_data, df])
-            df = df[~df.index.duplicated(keep='first')]
-        df.to_csv(filename)
-        print(f"Data saved to {filename}")
-        return timespan_path
+        self.store = store or BarStore()
+        # With a csv_root, bars are also appended to one CSV file per series under it
+        self.csv_root = csv_root
+
+    def series_key(self, timespan, interval):
+        return timespan if int(interval) == 1 else f"{interval}{timespan}"
+
+    def save_to_store(self, df, symbol, timespan, interval):
+        """Write bars into the columnar store and return the series path."""
+        series_path = self.store.write(df, self.provider, symbol, self.series_key(timespan, interval))
+        print(f"Data saved to {series_path}")
+        return series_path
+
+    def save(self, df, symbol, timespan, interval):
+        """Write bars into the store, and into the series CSV file when ``csv_root`` is set; return the series path."""
+        series_path = self.save_to_store(df, symbol, timespan, interval)
+        if self.csv_root is not None:
+            self.save_to_csv(df, symbol, timespan, interval)
+        return series_path
+
+    def csv_path(self, symbol, timespan, interval):
+        return os.path.join(self.csv_root, self.provider, timespan, f"{symbol}_{interval}.csv")
+
+    def save_to_csv(self, df, symbol, timespan, interval):
+        """Append bars to the series CSV file, which keeps one name across refreshes so only new rows are written.
+
+        The file is not registered in the catalog on every write (that would
+        re-read it); ``findrl catalog scan`` picks it up.
+        """
+        filename = self.csv_path(symbol, timespan, interval)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        rows = append_csv(df, filename)
+        print(f"Data saved to {filename} ({rows} new rows)")
+        return filename
 
 class DataAggregator:
-    def __init__(self, api_key, symbol, month_array, provider="POLYGON"):
+    def __init__(self, api_key, symbol, month_array, provider="POLYGON", store=None, transport=None, journal=None, csv_root=None):
         self.symbol = symbol
         self.api_key = api_key
         self.provider = provider
         self.month_array = month_array
-        self.fetcher = DataFetcher(api_key)
-        self.file_manager = FileManager(provider)
+        self.fetcher = DataFetcher(api_key, transport=transport)
+        self.file_manager = FileManager(provider, store, csv_root)
+        self.journal = journal
+
+    def jobs(self, intervals_timespans):
+        """Return the ``(interval, timespan, from_date, to_date)`` requests to run, resuming the journal when it has any."""
+        if self.journal is not None and self.journal.jobs:
+            return [job[1:] for job in self.journal.unfinished(self.symbol)]
+        jobs = [(item['interval'], item['timespan'], *month_range(start_day)) for item in intervals_timespans for start_day in self.month_array]
+        if self.journal is not None:
+            self.journal.plan([(self.symbol, *job) for job in jobs])
+        return jobs
 
     def run(self, intervals_timespans):
         request_count = 0
 
-        for interval_timespan in intervals_timespans:
-            interval = interval_timespan['interval']
-            timespan = interval_timespan['timespan']
-
-            for start_day in self.month_array:
-                try:
-                    from_date = f"{start_day}-01"
-                    to_date = f"{start_day}-30"
+        for interval, timespan, from_date, to_date in self.jobs(intervals_timespans):
+            key = self.journal.add(self.symbol, interval, timespan, from_date, to_date) if self.journal is not None else None
+            try:
+                # print(f"Calling for the day month of: {from_date} to {to_date} ")
+
+                url = (self.journal.cursor(key) if key else None) or self.fetcher.aggregates_url(self.symbol, timespan, interval, from_date, to_date)
+                ttl = range_ttl(to_date)
+                if key:
+                    self.journal.start(key)
+
+                main_save_pata = None
+                while url:
+                    data, url = self.fetcher.get_page(url, ttl)
+                    rows = 0
+                    if data:
+                        df = self.fetcher.process_data(data)
+                        rows = len(df)
+                        print(f"For interval {interval} - {timespan}: {rows} rows downloded successfully!")
+                        # print(df.head())
+                        main_save_pata = self.file_manager.save(df, self.symbol, timespan, interval)
+                    if key:
+                        self.journal.advance(key, url, rows)
 
-                    # print(f"Calling for the day month of: {from_date} to {to_date} ")
-
-                    data = self.fetcher.get_aggregated_data(self.symbol, timespan, interval, from_date, to_date)
-                    df = self.fetcher.process_data(data)
-                    print(f"For interval {interval} - {timespan}: data downloded successfully!")
-                    # print(df.head())
-                    main_save_pata = self.file_manager.save_to_csv(df, self.symbol, timespan, interval, from_date, to_date)
-                    
                     request_count += 1
 
                     if len(self.month_array) != 0 and request_count % 4 == 0:
                         print("Waiting for 1 minute to avoid API rate limits...")
                         request_count = 0
                         sleep(61)  # Wait for 1.1 minute
-                    print(f"Copy path to analysis data: {main_save_pata}")
-                except Exception as e:
-                    print(f"An error occurred: {e}")
+                if key:
+                    self.journal.done(key)
+                print(f"Copy path to analysis data: {main_save_pata}")
+            except Exception as e:
+                if key:
+                    self.journal.fail(key, e)
+                print(f"An error occurred: {e}")
+
+class AsyncDataAggregator:
+    """Download date ranges concurrently under a token-bucket rate limit.
+
+    The ranges are the months of ``month_array``, or explicit ``(from_date,
+    to_date)`` pairs given as ``ranges`` (e.g. from ``fetcher.Planner.plan_backfill``).
+
+    Up to ``concurrency`` requests are in flight at once, each taking a token
+    from a bucket allowing ``requests_per_minute`` with bursts of ``burst``. A 429
+    pauses the whole bucket for the server's Retry-After (or one token's worth
+    of time) before the page is retried. Each page is written to the store
+    as soon as it arrives, and appended to the series CSV file under
+    ``csv_root`` when one is given.
+
+    With a ``journal`` (``fetcher.Journal.FetchJournal``) every range is
+    journaled and each page's cursor is recorded once the page is committed
+    to the store; a journal that already holds jobs for the symbol is resumed
+    instead of fetching ``ranges``.
+    """
+
+    def __init__(self, api_key, symbol, month_array=None, provider="POLYGON", store=None,
+                 requests_per_minute=5, burst=None, concurrency=4, max_retries=5, base_url=POLYGON_URL, transport=None,
+                 ranges=None, journal=None, csv_root=None):
+        self.symbol = symbol
+        self.month_array = month_array or []
+        self.ranges = ranges if ranges is not None else [month_range(start_day) for start_day in self.month_array]
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.fetcher = DataFetcher(api_key, base_url, transport)
+        self.file_manager = FileManager(provider, store, csv_root)
+        self.journal = journal
+        self.rows_fetched = 0
+
+    async def request_page(self, bucket, url, ttl=0):
+        """Fetch one page under the rate limit, retrying 429s; returns ``(results, next_url)``.
+
+        Pages replayed from the response cache (or offline) do not take a token.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            if not self.fetcher.transport.offline and not self.fetcher.is_cached(url, ttl):
+                await bucket.acquire()
+            try:
+                # requests is blocking, so each call runs on the default thread pool
+                return await loop.run_in_executor(None, self.fetcher.get_page, url, ttl)
+            except RateLimited as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = e.retry_after if e.retry_after is not None else 60.0 / self.requests_per_minute
+                print(f"Rate limited, retrying in {wait:.1f}s...")
+                bucket.pause(wait)
+
+    async def fetch_range(self, bucket, semaphore, interval, timespan, from_date, to_date):
+        """Download one date range page by page, writing each page to the store as it arrives."""
+        if self.journal is None:
+            return await self.fetch_pages(bucket, semaphore, interval, timespan, from_date, to_date)
+
+        key = self.journal.add(self.symbol, interval, timespan, from_date, to_date)
+        try:
+            series_path = await self.fetch_pages(bucket, semaphore, interval, timespan, from_date, to_date, key)
+        except Exception as e:
+            self.journal.fail(key, e)
+            raise
+        self.journal.done(key)
+        return series_path
+
+    async def fetch_pages(self, bucket, semaphore, interval, timespan, from_date, to_date, key=None):
+        # A journaled range that was cut short continues from its next uncommitted page
+        url = (self.journal.cursor(key) if key else None) or self.fetcher.aggregates_url(self.symbol, timespan, interval, from_date, to_date)
+        ttl = range_ttl(to_date)
+        rows = self.journal.rows(key) if key else 0
+
+        async with semaphore:
+            if key:
+                self.journal.start(key)
+            while url:
+                data, url = await self.request_page(bucket, url, ttl)
+                page_rows = 0
+                if data:
+                    df = self.fetcher.process_data(data)
+                    self.file_manager.save(df, self.symbol, timespan, interval)
+                    page_rows = len(df)
+                    self.rows_fetched += page_rows
+                    rows += page_rows
+                if key:
+                    # Only advance past a page once it is committed to the store
+                    self.journal.advance(key, url, page_rows)
+
+        if rows == 0:
+            raise ValueError(f"No data available for {from_date} to {to_date}")
+        print(f"For interval {interval} - {timespan}: {from_date} to {to_date} downloded successfully!")
+        return self.file_manager.store.series_path(self.provider, self.symbol, self.file_manager.series_key(timespan, interval))
+
+    def jobs(self, intervals_timespans):
+        """Return the ``(interval, timespan, from_date, to_date)`` requests to run, resuming the journal when it has any."""
+        if self.journal is not None and self.journal.jobs:
+            return [job[1:] for job in self.journal.unfinished(self.symbol)]
+        jobs = [(item['interval'], item['timespan'], from_date, to_date) for item in intervals_timespans for from_date, to_date in self.ranges]
+        if self.journal is not None:
+            self.journal.plan([(self.symbol, *job) for job in jobs])
+        return jobs
+
+    async def run_async(self, intervals_timespans):
+        """Fetch every range of every interval and return ``{(interval, timespan, from_date, to_date): path or exception}``."""
+        bucket = TokenBucket(self.requests_per_minute, burst=self.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        jobs = self.jobs(intervals_timespans)
+        results = await asyncio.gather(*(self.fetch_range(bucket, semaphore, *job) for job in jobs), return_exceptions=True)
+
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f"An error occurred for {job[2]} to {job[3]}: {result}")
+        return dict(zip(jobs, results))
+
+    def run(self, intervals_timespans):
+        return asyncio.run(self.run_async(intervals_timespans))
 
 
 
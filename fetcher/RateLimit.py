@@ -0,0 +1,61 @@
+import time
+import asyncio
+
+class RateLimited(Exception):
+    """Raised when the API answers 429; ``retry_after`` is the server's wait in seconds, if it sent one."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """Return the seconds of a Retry-After header, or None when it is missing or not a number of seconds."""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Asyncio token bucket: ``rate`` requests per ``period`` seconds with bursts of up to ``burst``.
+
+    Every request takes one token; tokens refill continuously. ``pause`` empties
+    the bucket and blocks every caller until the given delay has passed, which
+    is how a 429 with Retry-After is honoured across all in-flight tasks.
+    """
+
+    def __init__(self, rate, period=60.0, burst=None, clock=time.monotonic):
+        self.rate = rate / period
+        self.capacity = burst or rate
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = self.clock()
+        # While paused ``updated`` lies in the future, so nothing accrues until the pause ends
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self.lock:
+            while True:
+                now = self.refill()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Hold every caller for ``seconds`` and restart from an empty bucket."""
+        now = self.refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.updated = max(self.updated, self.blocked_until)
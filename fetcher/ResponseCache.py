@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import gzip
+import hashlib
+import requests
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.structures import CaseInsensitiveDict
+from data.Store import temp_path, write_json
+
+HTTP_CACHE_ROOT = os.path.join('data', 'cache', 'http')
+
+# Query parameters that identify the caller rather than the data
+SECRET_PARAMS = {'apikey', 'api_key', 'token'}
+
+# Responses for ranges that include today are refreshed after this many seconds
+OPEN_RANGE_TTL = 15 * 60
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """Raised in offline mode when a request has no cached response."""
+
+def normalize_url(url, params=None):
+    """Return the cache identity of a request: lower-case host, sorted query, secrets removed."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += list(params.items())
+    query = sorted((key, str(value)) for key, value in query if key.lower() not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ''))
+
+def range_ttl(end_date, open_ttl=OPEN_RANGE_TTL):
+    """TTL for a response covering data up to ``end_date``: forever once the range is closed."""
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date[:10], '%Y-%m-%d').date()
+    return None if end_date < datetime.now(timezone.utc).date() else open_ttl
+
+class ResponseCache:
+    """On-disk cache of successful HTTP responses keyed on the normalised request URL.
+
+    Bodies are stored gzip-compressed next to a small JSON header file, which
+    is written last so a partially written entry is never read. ``ttl=None``
+    entries (closed historical ranges) never expire.
+    """
+
+    def __init__(self, root=HTTP_CACHE_ROOT):
+        self.root = root
+
+    def paths(self, key_url):
+        key = hashlib.blake2b(key_url.encode(), digest_size=20).hexdigest()
+        directory = os.path.join(self.root, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.gz")
+
+    def get(self, key_url, allow_stale=False, max_age=None):
+        """Return the cached ``requests.Response`` for a URL, or None when missing or expired.
+
+        ``max_age`` (seconds) also rejects entries stored longer ago than that,
+        whatever ttl they were stored with.
+        """
+        meta_path, body_path = self.paths(key_url)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['url'] != key_url:
+            return None
+        if not allow_stale:
+            age = time.time() - meta['stored_at']
+            if meta['ttl'] is not None and age > meta['ttl'] or max_age is not None and age > max_age:
+                return None
+
+        with gzip.open(body_path, 'rb') as f:
+            body = f.read()
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = key_url
+        response.encoding = meta['encoding']
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def put(self, key_url, response, ttl=None):
+        meta_path, body_path = self.paths(key_url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Unique temporary names keep concurrent writers of one entry from truncating each other's files
+        tmp_path = temp_path(body_path)
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(response.content)
+        os.replace(tmp_path, body_path)
+
+        meta = {
+            'url': key_url,
+            'status': response.status_code,
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+            'ttl': ttl,
+        }
+        write_json(meta_path, meta)
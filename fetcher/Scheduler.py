@@ -0,0 +1,101 @@
+import time
+import asyncio
+from data.Store import BarStore
+from fetcher.Planner import plan_backfill
+from fetcher.RateLimit import TokenBucket
+from fetcher.Polygon import AsyncDataAggregator, POLYGON_URL
+from fetcher.Transport import shared_transport
+
+class BackfillScheduler:
+    """Backfill many symbols under one shared rate budget.
+
+    Every symbol's missing ranges are planned up front. Symbols whose stored
+    data is oldest (or absent) go first, and their ranges are interleaved
+    round-robin so each symbol makes progress early. ``concurrency`` workers
+    share a single token bucket and write through the same bar store.
+
+    With a ``journal`` the plan is journaled before any request is made, and
+    a journal that already holds jobs is resumed instead of planning again.
+    """
+
+    def __init__(self, api_key, symbols, start_date, end_date, provider="POLYGON", timespan='minute', interval=1,
+                 store=None, transport=None, requests_per_minute=5, burst=None, concurrency=4, merge_gap=0,
+                 base_url=POLYGON_URL, journal=None, csv_root=None):
+        self.symbols = symbols
+        self.start_date = start_date
+        self.end_date = end_date
+        self.provider = provider
+        self.timespan = timespan
+        self.interval = interval
+        self.store = store or BarStore()
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.concurrency = concurrency
+        self.merge_gap = merge_gap
+        self.journal = journal
+        self.aggregators = {
+            symbol: AsyncDataAggregator(api_key, symbol, provider=provider, store=self.store, base_url=base_url,
+                                        transport=transport or shared_transport(), ranges=[],
+                                        requests_per_minute=requests_per_minute, journal=journal, csv_root=csv_root)
+            for symbol in symbols
+        }
+
+    def plan(self):
+        """Return ``[(symbol, from_date, to_date)]`` in fetch order."""
+        # Most out-of-date first: never-fetched symbols, then by their last stored bar
+        staleness = {symbol: self.store.last_timestamp(self.provider, symbol, self.timespan) for symbol in self.symbols}
+        ordered = sorted(self.symbols, key=lambda symbol: (staleness[symbol] is not None, staleness[symbol] or 0))
+
+        plans = {symbol: plan_backfill(symbol, self.start_date, self.end_date, self.provider, self.timespan,
+                                       self.store, merge_gap=self.merge_gap)
+                 for symbol in ordered}
+        jobs = []
+        for round_number in range(max((len(ranges) for ranges in plans.values()), default=0)):
+            jobs += [(symbol, *plans[symbol][round_number]) for symbol in ordered if round_number < len(plans[symbol])]
+        return jobs
+
+    def jobs(self):
+        """Return the ``(symbol, from_date, to_date)`` requests to run, resuming the journal when it has any."""
+        if self.journal is not None and self.journal.jobs:
+            return [(symbol, from_date, to_date) for symbol, _, _, from_date, to_date in self.journal.unfinished()]
+        jobs = self.plan()
+        if self.journal is not None:
+            self.journal.plan([(symbol, self.interval, self.timespan, from_date, to_date) for symbol, from_date, to_date in jobs])
+        return jobs
+
+    async def run_async(self):
+        jobs = self.jobs()
+        print(f"{len(jobs)} requests planned for {len(self.symbols)} symbols")
+        bucket = TokenBucket(self.requests_per_minute, burst=self.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        results = {}
+        start = time.perf_counter()
+
+        async def worker():
+            while not queue.empty():
+                symbol, from_date, to_date = queue.get_nowait()
+                try:
+                    results[(symbol, from_date, to_date)] = await self.aggregators[symbol].fetch_range(
+                        bucket, semaphore, self.interval, self.timespan, from_date, to_date)
+                except Exception as e:
+                    print(f"An error occurred for {symbol} {from_date} to {to_date}: {e}")
+                    results[(symbol, from_date, to_date)] = e
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        self.report(time.perf_counter() - start)
+        return results
+
+    def run(self):
+        """Fetch every planned range and return ``{(symbol, from_date, to_date): path or exception}``."""
+        return asyncio.run(self.run_async())
+
+    def report(self, elapsed):
+        total = sum(aggregator.rows_fetched for aggregator in self.aggregators.values())
+        for symbol, aggregator in self.aggregators.items():
+            if aggregator.rows_fetched:
+                print(f"{symbol}: {aggregator.rows_fetched} bars")
+        print(f"Fetched {total} bars in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} bars/s)")
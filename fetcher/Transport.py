@@ -0,0 +1,130 @@
+import time
+import threading
+import requests
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+from fetcher.ResponseCache import ResponseCache, OfflineCacheMiss, normalize_url
+
+# Transient server errors are retried by the transport; 429 is left to the caller's rate limiter
+RETRY_STATUSES = (500, 502, 503, 504)
+
+class ServerErrorRetry(Retry):
+    # urllib3 also retries 413/429 carrying Retry-After on its own; only honour it for 503
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+class HttpTransport:
+    """Pooled keep-alive HTTP client shared by the data providers.
+
+    One ``requests.Session`` keeps up to ``max_connections_per_host`` open
+    connections per host (callers block rather than open more), asks for
+    gzip, retries connection errors and 5xx responses ``retries`` times with
+    jittered exponential backoff, and applies a default timeout. Latency,
+    payload bytes and errors are counted per host.
+
+    With a ``cache``, responses requested with a ``ttl`` are stored and replayed;
+    ``offline`` serves only from the cache (expired entries included).
+    """
+
+    def __init__(self, retries=3, backoff_factor=0.5, backoff_jitter=0.5, max_connections_per_host=10,
+                 max_hosts=10, timeout=(5, 60), cache=None, offline=False):
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        retry = ServerErrorRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=['GET'],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_connections_per_host,
+                              pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def get(self, url, ttl=0, cacheable=None, **kwargs):
+        """GET through the shared pool and record the call's latency and size.
+
+        ``ttl`` is how long a successful response may be replayed from the cache:
+        0 neither caches it nor replays a cached one (unless offline), None keeps
+        it forever. A cached entry older than ``ttl`` is refetched even if it was
+        stored with a longer one. ``cacheable(response)`` can refuse to cache a
+        200 that reports an error in its body.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        key_url = normalize_url(url, kwargs.get('params'))
+        cached = self.cached(url, kwargs.get('params'), ttl)
+        if cached is not None:
+            self.record(host, 0.0, 0, 0, cache_hit=True)
+            return cached
+        if self.offline:
+            raise OfflineCacheMiss(f"Offline and not cached: {key_url}")
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.RequestException:
+            self.record(host, time.perf_counter() - start, 0, 0, error=True)
+            raise
+
+        wire_bytes = int(response.headers.get('Content-Length') or len(response.content))
+        self.record(host, time.perf_counter() - start, len(response.content), wire_bytes,
+                    error=response.status_code >= 400)
+        if (self.cache is not None and ttl != 0 and response.status_code == 200
+                and (cacheable is None or cacheable(response))):
+            self.cache.put(key_url, response, ttl)
+        return response
+
+    def cached(self, url, params=None, ttl=None):
+        """Return the response ``get(url, ttl)`` would replay without touching the network, or None."""
+        if self.cache is None or ttl == 0 and not self.offline:
+            return None
+        return self.cache.get(normalize_url(url, params), allow_stale=self.offline, max_age=ttl)
+
+    def record(self, host, seconds, payload_bytes, wire_bytes, error=False, cache_hit=False):
+        with self.lock:
+            counter = self.counters.setdefault(host, {'requests': 0, 'errors': 0, 'cache_hits': 0, 'seconds': 0.0, 'bytes': 0, 'wire_bytes': 0})
+            if cache_hit:
+                counter['cache_hits'] += 1
+                return
+            counter['requests'] += 1
+            counter['errors'] += int(error)
+            counter['seconds'] += seconds
+            counter['bytes'] += payload_bytes
+            counter['wire_bytes'] += wire_bytes
+
+    def stats(self):
+        """Return ``{host: counters}`` with the mean latency of each host."""
+        with self.lock:
+            stats = {host: dict(counter) for host, counter in self.counters.items()}
+        for counter in stats.values():
+            counter['mean_latency'] = counter['seconds'] / counter['requests'] if counter['requests'] else 0.0
+        return stats
+
+    def report(self):
+        for host, counter in self.stats().items():
+            print(f"{host}: {counter['requests']} requests, {counter['cache_hits']} cache hits, {counter['errors']} errors, "
+                  f"{counter['mean_latency'] * 1000:.0f} ms mean latency, "
+                  f"{counter['wire_bytes'] / 1e6:.1f} MB received ({counter['bytes'] / 1e6:.1f} MB decoded)")
+
+    def close(self):
+        self.session.close()
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+def shared_transport():
+    """Return the process-wide transport, creating it on first use."""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport(cache=ResponseCache())
+        return _shared_transport
@@ -1,13 +1,132 @@
 import os
+import time
+import random
 import pandas as pd
 import yfinance as yf
+from data.Store import BarStore, append_csv
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# Intraday Yahoo requests are limited to 7 days each
+CHUNK_DAYS = 7
+
+DAILY_INTERVALS = ('1d', '5d', '1wk', '1mo', '3mo')
+
+# Raised for ranges without bars (weekend or holiday chunks, dates beyond intraday retention): no data, not a failure
+NO_DATA_ERRORS = (yf.exceptions.YFPricesMissingError,)
+
+def chunk_ranges(start_date, end_date, days=CHUNK_DAYS):
+    """Split ``[start_date, end_date)`` into consecutive ranges of at most ``days`` days."""
+    ranges = []
+    current_start = start_date
+    while current_start < end_date:
+        current_end = min(current_start + timedelta(days=days), end_date)
+        ranges.append((current_start, current_end))
+        current_start = current_end
+    return ranges
+
+def download_chunk(symbol, start, end, interval, max_retries=3, backoff=1.0):
+    """Download one chunk, retrying failures with jittered exponential backoff.
+
+    A range without bars is not a failure: it returns an empty frame at once.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            # Without raise_errors yfinance logs every error and returns an empty frame, hiding failures as "no data"
+            data = yf.Ticker(symbol).history(start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'),
+                                             interval=interval, auto_adjust=False, actions=False, raise_errors=True)
+            break
+        except NO_DATA_ERRORS:
+            return pd.DataFrame()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            wait = backoff * 2 ** attempt * (1 + random.random())
+            print(f"Chunk {symbol} {start:%Y-%m-%d} to {end:%Y-%m-%d} failed ({e}), retrying in {wait:.1f}s...")
+            time.sleep(wait)
+
+    if data.empty:
+        return data
+    if interval in DAILY_INTERVALS and data.index.tz is not None:
+        # Daily bars are dated, as yf.download returns them
+        data.index = data.index.tz_localize(None)
+    data.index.name = 'Date' if interval in DAILY_INTERVALS else 'Datetime'
+    return data
+
+def download_chunks(symbols, start_date, end_date, interval, chunk_days=CHUNK_DAYS, max_workers=4, max_retries=3):
+    """Download every (symbol, chunk) pair on a bounded thread pool.
+
+    Returns ``({symbol: frame or None}, {symbol: [error, ...]})``. Chunks are
+    stitched in time order and bars repeated at chunk edges are dropped. A
+    symbol with a chunk that still fails after its retries is left out of the
+    frames and listed in the failures instead, so its data never has a silent
+    hole and the other symbols are unaffected.
+    """
+    if interval in DAILY_INTERVALS:
+        # Daily history has no range limit, so one request per symbol is enough
+        chunk_days = max((end_date - start_date).days, 1)
+    jobs = [(symbol, start, end) for symbol in symbols for start, end in chunk_ranges(start_date, end_date, chunk_days)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {job: pool.submit(download_chunk, *job, interval, max_retries) for job in jobs}
+
+    frames = {symbol: [] for symbol in symbols}
+    failures = {}
+    for (symbol, start, end), future in futures.items():
+        if future.exception() is not None:
+            failures.setdefault(symbol, []).append(f"{start:%Y-%m-%d} to {end:%Y-%m-%d}: {future.exception()}")
+            continue
+        data = future.result()
+        if not data.empty:
+            frames[symbol].append(data)
+            print(f"Fetched {symbol} data from {start} to {end}")
+
+    result = {}
+    for symbol, chunks in frames.items():
+        if symbol in failures:
+            continue
+        if not chunks:
+            result[symbol] = None
+            continue
+        data = pd.concat(chunks).sort_index(kind='stable')
+        result[symbol] = data[~data.index.duplicated(keep='first')]
+    return result, failures
+
+def failure_report(failures):
+    return "Failed to fetch chunks after retries:\n" + "\n".join(
+        f"{symbol} {error}" for symbol, errors in failures.items() for error in errors)
+
+def fetch_symbols(symbols, start_date, end_date, interval, store=None, max_workers=4, max_retries=3, csv_root=None):
+    """Download several tickers through one worker pool and save each into the bar store.
+
+    Every symbol that downloaded completely is saved; the symbols with failed
+    chunks are then reported together in one ``RuntimeError``.
+    """
+    fetchers = {symbol: DataFetcher(symbol, start_date, end_date, store, max_workers=max_workers, max_retries=max_retries,
+                                    csv_root=csv_root)
+                for symbol in symbols}
+    first = next(iter(fetchers.values()))
+    frames, failures = download_chunks(symbols, first.start_date, first.end_date, interval,
+                                       max_workers=max_workers, max_retries=max_retries)
+    for symbol, data in frames.items():
+        if data is None:
+            print(f"No data fetched for {symbol} interval: {interval}")
+            continue
+        fetchers[symbol].data[interval] = data
+        fetchers[symbol].save(data, interval)
+    if failures:
+        raise RuntimeError(failure_report(failures))
+    return frames
 
 class DataFetcher:
-    def __init__(self, symbol, start_date, end_date):
+    def __init__(self, symbol, start_date, end_date, store=None, max_workers=4, max_retries=3, csv_root=None):
         self.symbol = symbol
+        self.max_workers = max_workers
+        self.max_retries = max_retries
         self.start_date = datetime.strptime(start_date, '%Y-%m-%d')
         self.end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        self.store = store or BarStore()
+        # With a csv_root, bars are also appended to one CSV file per symbol and interval under it
+        self.csv_root = csv_root
         self.data = {}
 
     def fetch_data(self, interval):
@@ -15,7 +134,7 @@ class DataFetcher:
         data = self.fetch_interval_data(interval)
         if data is not None:
             self.data[interval] = data
-            self.save_data_to_file(data, interval)
+            self.save(data, interval)
 
     # def fetch_interval_data(self, interval):
     #     data_frames = []
@@ -40,48 +159,36 @@ class DataFetcher:
     #         print(f"No data fetched for interval: {interval}")
     #         return None
         
-    def fetch_interval_data(self,interval='1m'):
-        data_frames = []
-        current_start = self.start_date
-
-        while current_start < self.end_date:
-            current_end = min(current_start + timedelta(days=7), self.end_date)  # Fetch in 7-day chunks
-
-            try:
-                data = yf.download(
-                    tickers=self.symbol,
-                    start=current_start.strftime('%Y-%m-%d'),
-                    end=current_end.strftime('%Y-%m-%d'),
-                    interval=interval
-                )
-
-                if not data.empty:
-                    data_frames.append(data)
-                    print(f"Fetched data from {current_start} to {current_end}")
-
-            except Exception as e:
-                print(f"Failed to fetch data from {current_start} to {current_end}: {e}")
-
-            current_start = current_end
-
-        if data_frames:
-            self.df = pd.concat(data_frames)
-            return self.df
-        else:
+    def fetch_interval_data(self, interval='1m'):
+        """Download the range in parallel 7-day chunks and return one ordered frame."""
+        frames, failures = download_chunks([self.symbol], self.start_date, self.end_date, interval,
+                                           max_workers=self.max_workers, max_retries=self.max_retries)
+        if failures:
+            raise RuntimeError(failure_report(failures))
+        self.df = frames[self.symbol]
+        if self.df is None:
             print(f"No data fetched for interval: {interval}")
-            return None
+        return self.df
+
 
+    def save(self, data, interval):
+        """Write bars into the store, and into the CSV file when ``csv_root`` is set; return the series path."""
+        series_path = self.save_data_to_store(data, interval)
+        if self.csv_root is not None:
+            self.save_data_to_file(data, interval)
+        return series_path
 
     def save_data_to_file(self, data, interval):
-        directory = './data/YAHOO'
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-
-        filename = f"{directory}/{self.symbol}_{self.start_date.strftime('%Y-%m-%d')}_{self.end_date.strftime('%Y-%m-%d')}_{interval}.csv"
-
-        if os.path.exists(filename):
-            existing_data = pd.read_csv(filename, index_col=0, parse_dates=True)
-            data = pd.concat([existing_data, data])
-            data = data[~data.index.duplicated(keep='first')]
-        data.to_csv(filename)
-        print(f"Data saved to {filename}")
+        """Append bars to ``{csv_root}/YAHOO/{symbol}_{interval}.csv``, which keeps its name across refreshes so only new rows are written."""
+        directory = os.path.join(self.csv_root or 'data', 'YAHOO')
+        os.makedirs(directory, exist_ok=True)
+
+        filename = os.path.join(directory, f"{self.symbol}_{interval}.csv")
+        rows = append_csv(data, filename)
+        print(f"Data saved to {filename} ({rows} new rows)")
+        return filename
+
+    def save_data_to_store(self, data, interval):
+        series_path = self.store.write(data, 'YAHOO', self.symbol, interval)
+        print(f"Data saved to {series_path}")
+        return series_path
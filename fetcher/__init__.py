@@ -1,2 +1,3 @@
 from fetcher.Yahoo import DataFetcher
-from fetcher.Polygon import DataAggregator
\ No newline at end of file
+from fetcher.Polygon import DataAggregator, AsyncDataAggregator
+from fetcher.AlphaData import AlphaDataAggregator
\ No newline at end of file
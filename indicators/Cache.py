@@ -0,0 +1,156 @@
+import os
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from data.Store import temp_path
+
+INDICATOR_CACHE_ROOT = os.path.join('data', 'cache', 'indicators')
+
+def data_fingerprint(data, columns):
+    """Hash the index and the given columns of a frame; equal data gives the same fingerprint in every run."""
+    digest = hashlib.blake2b(digest_size=20)
+    index = data.index
+    if isinstance(index, pd.DatetimeIndex):
+        digest.update(memoryview(np.ascontiguousarray(index.asi8)))
+    else:
+        digest.update(pd.util.hash_pandas_object(index, index=False).to_numpy().tobytes())
+    for col in columns:
+        digest.update(col.encode())
+        digest.update(memoryview(np.ascontiguousarray(data[col].to_numpy(dtype='float64'))))
+    return digest.hexdigest()
+
+class IndicatorCache:
+    """Two-tier cache of computed indicator series.
+
+    Entries are keyed on the indicator name, its parameters and the fingerprint
+    of the input columns, and hold the series as read-only float arrays. The
+    in-process tier keeps the most recently used entries within ``max_bytes``;
+    with a ``root`` directory, entries are also written there as ``.npz`` files
+    (trimmed to ``max_disk_bytes``, oldest first) so later runs reuse them.
+    """
+
+    def __init__(self, max_bytes=256 << 20, root=None, max_disk_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.root = root
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, name, params, fingerprint):
+        payload = repr((name, sorted(params.items()), fingerprint)).encode()
+        return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.npz")
+
+    def get(self, key):
+        """Return the cached tuple of arrays, or None on a miss."""
+        with self.lock:
+            arrays = self.entries.get(key)
+            if arrays is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return arrays
+
+        arrays = self.read_disk(key)
+        with self.lock:
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.remember(key, arrays)
+        return arrays
+
+    def put(self, key, arrays):
+        arrays = tuple(np.ascontiguousarray(values, dtype='float64') for values in arrays)
+        for values in arrays:
+            values.flags.writeable = False
+        self.remember(key, arrays)
+        if self.root is not None:
+            self.write_disk(key, arrays)
+        return arrays
+
+    def remember(self, key, arrays):
+        size = sum(values.nbytes for values in arrays)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = arrays
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= sum(values.nbytes for values in evicted)
+
+    def read_disk(self, key):
+        if self.root is None or not os.path.exists(self.entry_path(key)):
+            return None
+        with np.load(self.entry_path(key)) as npz:
+            arrays = tuple(npz[f"arr_{i}"] for i in range(len(npz.files)))
+        for values in arrays:
+            values.flags.writeable = False
+        # Mark the entry as recently used for trimming
+        os.utime(self.entry_path(key))
+        return arrays
+
+    def write_disk(self, key, arrays):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Parallel optimisation runs may write the same entry, so each writes its own temporary file
+        tmp_path = temp_path(path)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, *arrays)
+        os.replace(tmp_path, path)
+        self.trim_disk()
+
+    def trim_disk(self):
+        """Remove the least recently used files until the disk tier fits in ``max_disk_bytes``."""
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.npz'):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def compute(self, name, params, data, columns, func):
+        """Return ``func()``'s arrays for this indicator and data, computing them only on a miss."""
+        key = self.key(name, params, data_fingerprint(data, columns))
+        arrays = self.get(key)
+        if arrays is None:
+            result = func()
+            arrays = self.put(key, result if isinstance(result, tuple) else (result,))
+        return arrays
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def shared_indicator_cache():
+    """Return the process-wide in-memory indicator cache, creating it on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = IndicatorCache()
+        return _shared_cache
@@ -0,0 +1,106 @@
+import numpy as np
+from indicators.Cache import shared_indicator_cache
+
+# Windows from this length use van Herk/Gil-Werman; shorter ones are cheaper by doubling (log2(window) passes)
+VAN_HERK_MIN_WINDOW = 4096
+
+def as_float_array(values):
+    return np.ascontiguousarray(values, dtype='float64')
+
+def extreme_levels(values, longest, function):
+    """Extremes over spans of 1, 2, 4, ... values up to ``longest``: ``levels[k][i]`` covers ``x[i:i + 2**k]``.
+
+    Built by doubling, log2(longest) passes over the data; any window up to
+    ``longest`` is then covered by two overlapping spans of one level, so the
+    levels serve every window of a parameter sweep.
+    """
+    levels = [as_float_array(values)]
+    while 2 ** len(levels) <= longest:
+        current, span = levels[-1], 2 ** (len(levels) - 1)
+        levels.append(function(current[:-span], current[span:]))
+    return levels
+
+def window_extreme(levels, window, function, length, out):
+    """Fill ``out`` with the rolling extreme over ``window`` values from ``extreme_levels``."""
+    if length < window:
+        out[:] = np.nan
+        return out
+    level = int(window).bit_length() - 1
+    span, current = 2 ** level, levels[level]
+    out[:window - 1] = np.nan
+    function(current[:length - window + 1], current[window - span:length - span + 1], out=out[window - 1:])
+    return out
+
+def van_herk(values, window, function, out):
+    """Fill ``out`` with the rolling extreme by van Herk/Gil-Werman: three passes whatever the window.
+
+    In blocks of ``window`` values, the window starting at ``i`` is the
+    suffix extreme of ``i``'s block from ``i`` combined with the prefix
+    extreme of the next block up to ``i + window - 1``.
+    """
+    length = len(values)
+    blocks = -(-length // window)
+    padded = np.zeros((blocks, window))
+    padded.ravel()[:length] = values
+    prefix = function.accumulate(padded, axis=1).ravel()
+    suffix = function.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[:window - 1] = np.nan
+    function(suffix[:length - window + 1], prefix[window - 1:length], out=out[window - 1:])
+    return out
+
+def rolling_extreme(values, window, function):
+    """Rolling ``np.maximum``/``np.minimum`` over ``window`` values, as ``Series.rolling(window).max()``/``min()``.
+
+    NaN where the window is incomplete or holds a NaN. Work per value is
+    bounded whatever the window: doubling below ``VAN_HERK_MIN_WINDOW``,
+    van Herk/Gil-Werman from there.
+    """
+    x = as_float_array(values)
+    if window < 1:
+        raise ValueError(f"window must be positive, got {window}")
+    out = np.empty(len(x))
+    if len(x) < window:
+        out[:] = np.nan
+        return out
+    if window >= VAN_HERK_MIN_WINDOW:
+        return van_herk(x, window, function, out)
+    return window_extreme(extreme_levels(x, window, function), window, function, len(x), out)
+
+def rolling_max(values, window):
+    return rolling_extreme(values, window, np.maximum)
+
+def rolling_min(values, window):
+    return rolling_extreme(values, window, np.minimum)
+
+def rolling_rising(values, window):
+    """1.0 where the last ``window`` values never decrease, else 0.0; NaN where the window is incomplete or holds a NaN.
+
+    Equals ``Series.rolling(window).apply(lambda x: all(np.diff(x) >= 0))`` as
+    the rolling minimum of the ``window - 1`` step flags ending at each value.
+    """
+    x = as_float_array(values)
+    if window < 2:
+        return np.where(np.isnan(x), np.nan, 1.0)
+    steps = np.full(len(x), np.nan)
+    with np.errstate(invalid='ignore'):
+        steps[1:] = x[1:] >= x[:-1]
+    steps[1:][np.isnan(x[1:]) | np.isnan(x[:-1])] = np.nan
+    return rolling_min(steps, window - 1)
+
+def shared(name, data, column, window, func, cache=None):
+    """Compute a rolling extreme of ``data[column]`` once per run: later consumers get it from ``cache``."""
+    cache = cache or shared_indicator_cache()
+    return cache.compute(name, {'window': window}, data, [column], lambda: func(data[column], window))[0]
+
+def shared_rolling_max(data, column, window, cache=None):
+    return shared('rolling_max', data, column, window, rolling_max, cache)
+
+def shared_rolling_min(data, column, window, cache=None):
+    return shared('rolling_min', data, column, window, rolling_min, cache)
+
+def shared_rolling_rising(data, column, window, cache=None):
+    return shared('rolling_rising', data, column, window, rolling_rising, cache)
+
+def shared_extrema(data, high='High', low='Low', period=14, cache=None):
+    """Return the rolling ``(highest_high, lowest_low)`` over ``period`` bars, reused by every consumer of the same data."""
+    return shared_rolling_max(data, high, period, cache), shared_rolling_min(data, low, period, cache)
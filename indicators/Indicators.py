@@ -1,27 +1,168 @@
 import ta
+import pandas as pd
+from indicators import Native, Extrema
+from indicators.Cache import shared_indicator_cache
+
+BACKENDS = ('ta', 'numpy')
+
+def use_native(backend=None):
+    """True when an indicator call should run on the NumPy backend (``indicators.Native``)."""
+    backend = backend or MomentumIndicators.backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown indicator backend {backend!r}, expected one of {BACKENDS}")
+    return backend == 'numpy'
 
 class MomentumIndicators:
+    # Default backend; every method also takes backend='ta' or 'numpy'
+    backend = 'ta'
+
     def __init__(self, data):
         self.data = data
 
     @staticmethod
-    def rsi(data, column='Close', period=14):
+    def rsi(data, column='Close', period=14, backend=None):
+        if use_native(backend):
+            return pd.Series(Native.rsi(data[column], period), index=data.index)
         return ta.momentum.rsi(data[column], window=period)
 
     @staticmethod
-    def macd(data, column='Close', short=12, long=26, signal=9):
+    def macd(data, column='Close', short=12, long=26, signal=9, backend=None):
+        if use_native(backend):
+            macd_line, signal_line = Native.macd(data[column], short, long, signal)
+            return pd.Series(macd_line, index=data.index), pd.Series(signal_line, index=data.index)
         macd_line = ta.trend.macd(data[column], window_slow=long, window_fast=short)
         signal_line = ta.trend.macd_signal(data[column], window_slow=long, window_fast=short, window_sign=signal)
         return macd_line, signal_line
 
+    # so, so_signal and wr take shared=(highest_high, lowest_low) to reuse rolling extrema
+    # computed elsewhere in the run; ta's arithmetic on them gives ta's values on either backend
+
     @staticmethod
-    def so(data, high='High', low='Low', close='Close', period=14):
+    def so(data, high='High', low='Low', close='Close', period=14, backend=None, shared=None):
+        if use_native(backend) or shared is not None:
+            return pd.Series(Native.so(data[high], data[low], data[close], period, shared), index=data.index)
         return ta.momentum.stoch(data[high], data[low], data[close], window=period, smooth_window=3)
 
     @staticmethod
-    def wr(data, high='High', low='Low', close='Close', period=14):
+    def so_signal(data, high='High', low='Low', close='Close', period=14, smooth=3, backend=None, shared=None):
+        if use_native(backend):
+            return pd.Series(Native.so_signal(data[high], data[low], data[close], period, smooth, shared), index=data.index)
+        if shared is not None:
+            return MomentumIndicators.so(data, high, low, close, period, backend, shared).rolling(smooth).mean()
+        return ta.momentum.stoch_signal(data[high], data[low], data[close], window=period, smooth_window=smooth)
+
+    @staticmethod
+    def wr(data, high='High', low='Low', close='Close', period=14, backend=None, shared=None):
+        if use_native(backend) or shared is not None:
+            return pd.Series(Native.wr(data[high], data[low], data[close], period, shared), index=data.index)
         return ta.momentum.williams_r(data[high], data[low], data[close], lbp=period)
 
+    @staticmethod
+    def rolling_max(data, column='High', window=20):
+        return pd.Series(Extrema.rolling_max(data[column], window), index=data.index)
+
+    @staticmethod
+    def rolling_min(data, column='Low', window=20):
+        return pd.Series(Extrema.rolling_min(data[column], window), index=data.index)
+
+    @staticmethod
+    def rolling_rising(data, column='Low', window=20):
+        """1.0 where ``column`` never decreased over the last ``window`` bars (e.g. higher lows), else 0.0."""
+        return pd.Series(Extrema.rolling_rising(data[column], window), index=data.index)
+
+    # Batch versions for parameter sweeps: one vectorized NumPy pass over a vector of
+    # periods, returning a (parameter x time) array whose row i matches the single call with periods[i]
+
+    @staticmethod
+    def sma_grid(data, periods, column='Close'):
+        return Native.sma_grid(data[column], periods)
+
+    @staticmethod
+    def rsi_grid(data, periods, column='Close'):
+        return Native.rsi_grid(data[column], periods)
+
+    @staticmethod
+    def macd_grid(data, combinations, column='Close'):
+        """Return ``(macd_lines, signal_lines)`` with one row per ``(short, long, signal)`` combination."""
+        return Native.macd_grid(data[column], combinations)
+
+    @staticmethod
+    def so_grid(data, periods, high='High', low='Low', close='Close'):
+        return Native.so_grid(data[high], data[low], data[close], periods)
+
+    @staticmethod
+    def so_signal_grid(data, periods, high='High', low='Low', close='Close', smooth=3):
+        return Native.so_signal_grid(data[high], data[low], data[close], periods, smooth)
+
+    @staticmethod
+    def wr_grid(data, periods, high='High', low='Low', close='Close'):
+        return Native.wr_grid(data[high], data[low], data[close], periods)
+
+class CachedMomentumIndicators(MomentumIndicators):
+    """MomentumIndicators memoized by indicator, parameters and data fingerprint.
+
+    Results come from ``cache`` (the process-wide in-memory cache when None;
+    set an ``IndicatorCache`` with a ``root`` to keep them across runs), so
+    strategies and optimisation runs over the same data compute each series once.
+    """
+    cache = None
+
+    @classmethod
+    def cached(cls, name, data, columns, params, func):
+        cache = cls.cache or shared_indicator_cache()
+        arrays = cache.compute(name, params, data, columns, func)
+        series = tuple(pd.Series(values, index=data.index) for values in arrays)
+        return series if len(series) > 1 else series[0]
+
+    @classmethod
+    def rsi(cls, data, column='Close', period=14, backend=None):
+        backend = backend or cls.backend
+        return cls.cached('rsi', data, [column], {'period': period, 'backend': backend},
+                          lambda: MomentumIndicators.rsi(data, column, period, backend))
+
+    @classmethod
+    def macd(cls, data, column='Close', short=12, long=26, signal=9, backend=None):
+        backend = backend or cls.backend
+        return cls.cached('macd', data, [column], {'short': short, 'long': long, 'signal': signal, 'backend': backend},
+                          lambda: MomentumIndicators.macd(data, column, short, long, signal, backend))
+
+    @classmethod
+    def extrema(cls, data, high='High', low='Low', period=14):
+        return Extrema.shared_extrema(data, high, low, period, cls.cache)
+
+    @classmethod
+    def so(cls, data, high='High', low='Low', close='Close', period=14, backend=None):
+        backend = backend or cls.backend
+        return cls.cached('so', data, [high, low, close], {'period': period, 'backend': backend},
+                          lambda: MomentumIndicators.so(data, high, low, close, period, backend,
+                                                        cls.extrema(data, high, low, period)))
+
+    @classmethod
+    def so_signal(cls, data, high='High', low='Low', close='Close', period=14, smooth=3, backend=None):
+        backend = backend or cls.backend
+        return cls.cached('so_signal', data, [high, low, close], {'period': period, 'smooth': smooth, 'backend': backend},
+                          lambda: MomentumIndicators.so_signal(data, high, low, close, period, smooth, backend,
+                                                               cls.extrema(data, high, low, period)))
+
+    @classmethod
+    def wr(cls, data, high='High', low='Low', close='Close', period=14, backend=None):
+        backend = backend or cls.backend
+        return cls.cached('wr', data, [high, low, close], {'period': period, 'backend': backend},
+                          lambda: MomentumIndicators.wr(data, high, low, close, period, backend,
+                                                        cls.extrema(data, high, low, period)))
+
+    @classmethod
+    def rolling_max(cls, data, column='High', window=20):
+        return pd.Series(Extrema.shared_rolling_max(data, column, window, cls.cache), index=data.index)
+
+    @classmethod
+    def rolling_min(cls, data, column='Low', window=20):
+        return pd.Series(Extrema.shared_rolling_min(data, column, window, cls.cache), index=data.index)
+
+    @classmethod
+    def rolling_rising(cls, data, column='Low', window=20):
+        return pd.Series(Extrema.shared_rolling_rising(data, column, window, cls.cache), index=data.index)
+
 # import ta
 
 # class MomentumIndicators:
@@ -0,0 +1,383 @@
+import numpy as np
+from indicators.Extrema import as_float_array, extreme_levels, window_extreme, rolling_max, rolling_min
+
+# Smallest decay factor applied inside one EMA block; keeps the block's rescaled cumulative sum well conditioned
+BLOCK_DECAY_FLOOR = 1e-9
+# Values per batch of EMA rows; rows are grouped by similar alpha so they share a block length
+EMA_BATCH_VALUES = 1 << 20
+# Values per period row and step of rsi_grid's time chunks, sized to keep a chunk in cache
+RSI_CHUNK_VALUES = 1 << 15
+
+def ema(values, alpha, min_periods=0):
+    """Exponential moving average ``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]`` seeded with the first value.
+
+    Matches ``Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()``.
+    Leading NaNs are skipped; NaNs after the first value are not supported.
+    """
+    x = as_float_array(values)
+    out = np.full(len(x), np.nan)
+    start = 0
+    if len(x) and np.isnan(x[0]):
+        valid = ~np.isnan(x)
+        if not valid.any():
+            return out
+        start = int(valid.argmax())
+    if start < len(x):
+        ema_body(x[start:], np.array([alpha]), out=out[None, start:])
+        out[start:start + max(min_periods - 1, 0)] = np.nan
+    return out
+
+def ema_rows(values, alphas, min_periods=0):
+    """EMA of every row of ``values`` (or of one shared 1D series) with its own ``alphas`` entry.
+
+    Returns a ``(len(alphas), time)`` array. Rows may start with NaNs, as a MACD
+    line does; ``min_periods`` may be a scalar or one value per row.
+    """
+    x = as_float_array(values)
+    alphas = np.asarray(alphas, dtype='float64')
+    length = x.shape[-1]
+    out = np.full((len(alphas), length), np.nan)
+    if not length:
+        return out
+    starts = np.broadcast_to(np.isnan(x).argmin(axis=-1), len(alphas))
+    # All-NaN rows stay NaN
+    empty = np.broadcast_to(np.isnan(x[..., -1]), len(alphas))
+    warmup = np.where(empty, length, starts + np.maximum(np.broadcast_to(min_periods, len(alphas)) - 1, 0))
+
+    # Rows of similar alpha share a block length in ema_body
+    order = np.argsort(alphas)
+    batch = max(1, EMA_BATCH_VALUES // length)
+    for first in range(0, len(order), batch):
+        rows = order[first:first + batch]
+        if x.ndim == 1:
+            if not empty[0]:
+                out[rows, starts[0]:] = ema_body(x[starts[0]:], alphas[rows])
+            continue
+        chunk = x[rows]
+        for row, start in zip(chunk, starts[rows]):
+            # Hold the first value over leading NaNs: the EMA of a constant is that constant
+            if np.isnan(row[start]):
+                row[:] = 0.0
+            else:
+                row[:start] = row[start]
+        out[rows] = ema_body(chunk, alphas[rows])
+    for row, end in enumerate(warmup):
+        out[row, :end] = np.nan
+    return out
+
+def ema_body(x, alphas, out=None):
+    """EMA of ``x`` for each of ``alphas``; ``x`` is one shared series or one row per alpha, without NaNs.
+
+    The series is cut into blocks inside which the recursion is a rescaled
+    cumulative sum, so every block of every row is computed at once. The
+    value carried into a block decays by at least ``BLOCK_DECAY_FLOOR`` per
+    block, so summing the last few block ends is exact to rounding.
+    """
+    rows, length = len(alphas), x.shape[-1]
+    if np.isnan(x).any():
+        raise ValueError("ema: NaN values after the start of the series are not supported, use the 'ta' backend")
+    if out is None:
+        out = np.empty((rows, length))
+
+    decays = 1.0 - alphas
+    if (decays <= 0.0).any():
+        # alpha == 1 follows the input; solve such rows on their own
+        for row in np.flatnonzero(decays <= 0.0):
+            out[row] = x if x.ndim == 1 else x[row]
+        rest = np.flatnonzero(decays > 0.0)
+        if len(rest):
+            out[rest] = ema_body(x if x.ndim == 1 else x[rest], alphas[rest])
+        return out
+
+    # One block length for all rows, set by the fastest decaying one
+    block = int(max(1, min(length, np.log(BLOCK_DECAY_FLOOR) / np.log(decays.min()))))
+    blocks = -(-length // block)
+    powers = decays[:, None] ** np.arange(block + 1)
+    work = np.empty((rows, blocks, block))
+    flat = work.reshape(rows, -1)
+
+    # Within a block starting from zero: y[j] = alpha * decay**j * sum(x[k] / decay**k for k <= j)
+    whole = (length // block) * block
+    chunks = x[..., :whole].reshape(-1, whole // block, block)
+    np.multiply(chunks, 1.0 / powers[:, None, :-1], out=work[:, :whole // block])
+    flat[:, whole:length] = x[..., whole:] / powers[:, :length - whole]
+    flat[:, length:] = 0.0
+    np.cumsum(work, axis=2, out=work)
+
+    # Values carried into each block: carry[b + 1] = end[b] + decay**block * carry[b], seeded with x[0]
+    block_decays = powers[:, -1]
+    ends = np.empty((rows, blocks + 1))
+    ends[:, 0] = x[..., 0]
+    ends[:, 1:] = work[:, :, -1] * (alphas * powers[:, -2])[:, None]
+    carry = ends[:, :blocks].copy()
+    # Older block ends have decayed below double precision
+    slowest = block_decays.max()
+    terms = int(np.ceil(np.log(1e-18) / np.log(slowest))) if 0.0 < slowest < 1.0 else blocks
+    for lag in range(1, min(blocks, terms)):
+        carry[:, lag:] += (block_decays ** lag)[:, None] * ends[:, :blocks - lag]
+
+    # y[j] = alpha * decay**j * (sum + carry * decay / alpha)
+    work += (carry * (decays / alphas)[:, None])[:, :, None]
+    work *= (alphas[:, None] * powers[:, :-1])[:, None, :]
+    out[...] = flat[:, :length]
+    return out
+
+def rolling_mean(values, window):
+    """Rolling mean over the last axis of ``values`` (one series or one row per series)."""
+    x = as_float_array(values)
+    length = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if length >= window:
+        total = x[..., :length - window + 1].copy()
+        for offset in range(1, window):
+            total += x[..., offset:length - window + 1 + offset]
+        out[..., window - 1:] = total / window
+    return out
+
+def as_periods(periods):
+    periods = np.atleast_1d(np.asarray(periods, dtype='int64'))
+    if periods.ndim != 1 or (periods < 1).any():
+        raise ValueError(f"Expected a vector of positive periods, got {periods!r}")
+    return periods
+
+def window_sums(x, periods):
+    """Rolling sums of ``x`` over each of ``periods``, as a ``(len(periods), time)`` array.
+
+    One cumulative sum, restarted every ``max(periods)`` values so it stays
+    small next to the values, serves every period: a window ending at offset
+    ``j`` of a block either lies inside it (a difference of two prefix sums)
+    or takes the first ``j + 1`` values of it plus the tail of the block before.
+    """
+    length = len(x)
+    block = int(periods.max())
+    blocks = -(-length // block)
+    padded = np.zeros((blocks, block))
+    padded.ravel()[:length] = x
+    inclusive = np.cumsum(padded, axis=1)
+    exclusive = inclusive - padded
+    # Sum of each block from an offset to its end
+    suffix = inclusive[:, -1:] - exclusive
+
+    out = np.full((len(periods), length), np.nan)
+    work = np.empty((blocks, block))
+    for row, period in enumerate(periods):
+        if period > length:
+            continue
+        np.subtract(inclusive[:, period - 1:], exclusive[:, :block - period + 1], out=work[:, period - 1:])
+        np.add(inclusive[1:, :period - 1], suffix[:-1, block - period + 1:], out=work[1:, :period - 1])
+        out[row, period - 1:] = work.ravel()[period - 1:length]
+    return out
+
+def sma_grid(values, periods):
+    """Simple moving averages for every period at once, as ``Series.rolling(period).mean()`` per row."""
+    x = as_float_array(values)
+    periods = as_periods(periods)
+    missing = np.isnan(x)
+    if missing.any():
+        # Windows holding a NaN are NaN, as in pandas
+        counts = window_sums(missing.astype('float64'), periods)
+        x = np.where(missing, 0.0, x)
+    # Averaging the offsets from the first value keeps the prefix sums small
+    origin = x[0] if len(x) else 0.0
+    out = window_sums(x - origin, periods)
+    out /= periods[:, None]
+    out += origin
+    if missing.any():
+        out[counts > 0] = np.nan
+    return out
+
+def rsi(close, period=14):
+    """Wilder RSI, as ``ta.momentum.rsi``."""
+    return rsi_grid(close, [period])[0]
+
+def macd(close, short=12, long=26, signal=9):
+    """MACD line and signal line in one pass, as ``ta.trend.macd`` and ``ta.trend.macd_signal``."""
+    close = as_float_array(close)
+    fast = ema(close, 2.0 / (short + 1), short)
+    slow = ema(close, 2.0 / (long + 1), long)
+    macd_line = fast - slow
+    return macd_line, ema(macd_line, 2.0 / (signal + 1), signal)
+
+def extrema(high, low, period=14):
+    """Return the rolling ``(highest_high, lowest_low)`` shared by the stochastic oscillator and Williams %R."""
+    return rolling_max(high, period), rolling_min(low, period)
+
+def so(high, low, close, period=14, shared=None):
+    """Stochastic %K, as ``ta.momentum.stoch``; ``shared`` may pass precomputed ``extrema``."""
+    highest_high, lowest_low = shared or extrema(high, low, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * (as_float_array(close) - lowest_low) / (highest_high - lowest_low)
+
+def so_signal(high, low, close, period=14, smooth=3, shared=None):
+    """Stochastic %D, as ``ta.momentum.stoch_signal``."""
+    return rolling_mean(so(high, low, close, period, shared), smooth)
+
+def wr(high, low, close, period=14, shared=None):
+    """Williams %R, as ``ta.momentum.williams_r``."""
+    highest_high, lowest_low = shared or extrema(high, low, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -100 * (highest_high - as_float_array(close)) / (highest_high - lowest_low)
+
+def rsi_grid(close, periods):
+    """Wilder RSI for every period at once, one row per period.
+
+    RSI is ``100 * A(up) / (A(up) + A(down))`` with A the Wilder average. As
+    ``up + down == |delta|``, a row only needs the averages of ``100 * up`` and
+    ``|delta|``, and their shared scale factor cancels in the ratio. The price
+    moves are computed once for all rows and cut into blocks as in
+    ``ema_body``, inside which each average is a rescaled running sum. The
+    values carried between blocks follow the exact recursion, vectorized over
+    the periods, so averages decaying through long flat stretches keep their
+    ratio as in ta. Blocks are then swept offset by offset in cache-sized
+    chunks, every period row being updated at each step.
+    """
+    close = as_float_array(close)
+    periods = as_periods(periods)
+    length = len(close)
+    if not length:
+        return np.empty((len(periods), 0))
+
+    delta = close[1:] - close[:-1]
+    longer = periods > 1
+    if longer.all():
+        out = rsi_rows(delta, periods)
+    else:
+        # The average over one bar is the bar itself: 100 unless the price fell
+        out = np.empty((len(periods), length))
+        out[~longer, 0] = 100.0
+        # NaN deltas count as no move, as in ta
+        out[~longer, 1:] = np.where(delta < 0, 0.0, 100.0)
+        if longer.any():
+            out[longer] = rsi_rows(delta, periods[longer])
+    for row, period in enumerate(periods):
+        out[row, :period - 1] = np.nan
+    return out
+
+def rsi_rows(delta, periods):
+    """RSI rows of ``periods`` (all above 1) over the price moves ``delta``, without the warm-up NaNs."""
+    length = len(delta) + 1
+    alphas = 1.0 / periods
+    decays = 1.0 - alphas
+    block = int(max(1, min(length, np.log(BLOCK_DECAY_FLOOR) / np.log(decays.min()))))
+    blocks = -(-length // block)
+
+    # moves[0] is 100 * up and moves[1] is |delta|, padded to whole blocks; NaN deltas count as no move, as in ta
+    moves = np.zeros((2, blocks * block))
+    np.fmax(delta, 0.0, out=moves[0, 1:length])
+    moves[0] *= 100
+    np.abs(delta, out=moves[1, 1:length])
+    np.fmax(moves[1], 0.0, out=moves[1])
+    x = moves.reshape(2, blocks, block)
+
+    # Inside a block the average at offset j is alpha * decay**j * (carried + sum(x[k] / decay**k for k <= j))
+    scale = decays[:, None] ** -np.arange(block)
+    ends = np.matmul(x, scale.T)
+    # Carried values in the scale of the block they enter, from the exact recursion over blocks
+    steps = ends * (alphas * decays ** (block - 1))
+    block_decays = decays ** block
+    carried = np.empty((blocks, 2, len(periods)))
+    state = np.zeros((2, len(periods)))
+    for position in range(blocks):
+        carried[position] = state
+        state *= block_decays
+        state += steps[:, position]
+    carried *= decays / alphas
+
+    # Offsets are the outer loop, so each step updates every period row and block of a chunk at once
+    by_offset = np.ascontiguousarray(x.transpose(0, 2, 1))
+    chunk = min(blocks, max(1, RSI_CHUNK_VALUES // len(periods)))
+    values = np.empty((block, len(periods), chunk))
+    term = np.empty((len(periods), chunk))
+    out = np.empty((len(periods), blocks * block))
+    out_blocks = out.reshape(len(periods), blocks, block)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for first in range(0, blocks, chunk):
+            last = min(first + chunk, blocks)
+            up = carried[first:last, 0].T.copy()
+            total = carried[first:last, 1].T.copy()
+            chunk_values, chunk_term = values[..., :last - first], term[:, :last - first]
+            for offset in range(block):
+                np.multiply(scale[:, offset, None], by_offset[0, offset, first:last], out=chunk_term)
+                up += chunk_term
+                np.multiply(scale[:, offset, None], by_offset[1, offset, first:last], out=chunk_term)
+                total += chunk_term
+                np.divide(up, total, out=chunk_values[offset])
+                if offset == 0:
+                    # Both averages are zero until the first move (0 / 0), where ta gives 100;
+                    # running sums never decrease inside a block, so such blocks show at offset 0
+                    unmoved = np.flatnonzero(~total.all(axis=0))
+            out_blocks[:, first:last] = chunk_values.transpose(1, 2, 0)
+            if len(unmoved):
+                np.nan_to_num(out_blocks[:, first + unmoved[0]:first + unmoved[-1] + 1], copy=False, nan=100.0)
+    return out[:, :length]
+
+def macd_grid(close, combinations):
+    """MACD lines and signal lines for ``(short, long, signal)`` combinations, one row per combination.
+
+    Every distinct EMA period is computed once and shared by the rows using it.
+    """
+    close = as_float_array(close)
+    combinations = np.asarray(combinations, dtype='int64').reshape(-1, 3)
+    periods, index = np.unique(combinations[:, :2], return_inverse=True)
+    index = index.reshape(-1, 2)
+    emas = ema_rows(close, 2.0 / (periods + 1), periods)
+    macd_lines = np.empty((len(combinations), len(close)))
+    for row, (fast, slow) in enumerate(index):
+        np.subtract(emas[fast], emas[slow], out=macd_lines[row])
+    signals = combinations[:, 2]
+    return macd_lines, ema_rows(macd_lines, 2.0 / (signals + 1), signals)
+
+def extrema_rows(high, low, periods, shared=None):
+    """Yield the rolling ``(highest_high, lowest_low)`` of each period in turn.
+
+    The doubling levels are built once, up to the longest period, and reused
+    by every row; rows come from ``shared`` (an ``extrema_grid``) when given.
+    """
+    if shared is not None:
+        yield from zip(*shared)
+        return
+    high, low = as_float_array(high), as_float_array(low)
+    longest = int(periods.max())
+    high_levels = extreme_levels(high, longest, np.maximum)
+    low_levels = extreme_levels(low, longest, np.minimum)
+    highest_high, lowest_low = np.empty(len(high)), np.empty(len(low))
+    for period in periods:
+        window_extreme(high_levels, period, np.maximum, len(high), highest_high)
+        window_extreme(low_levels, period, np.minimum, len(low), lowest_low)
+        yield highest_high, lowest_low
+
+def extrema_grid(high, low, periods):
+    """Rolling ``(highest_high, lowest_low)`` for every period, one row per period."""
+    periods = as_periods(periods)
+    highest_high, lowest_low = np.empty((2, len(periods), len(high)))
+    for row, (row_high, row_low) in enumerate(extrema_rows(high, low, periods)):
+        highest_high[row], lowest_low[row] = row_high, row_low
+    return highest_high, lowest_low
+
+def so_grid(high, low, close, periods, shared=None):
+    """Stochastic %K for every period, one row per period; ``shared`` may pass precomputed ``extrema_grid``."""
+    close, periods = as_float_array(close), as_periods(periods)
+    values, spread = np.empty((len(periods), len(close))), np.empty(len(close))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for row, (highest_high, lowest_low) in enumerate(extrema_rows(high, low, periods, shared)):
+            np.subtract(close, lowest_low, out=values[row])
+            np.subtract(highest_high, lowest_low, out=spread)
+            np.divide(values[row], spread, out=values[row])
+    values *= 100
+    return values
+
+def so_signal_grid(high, low, close, periods, smooth=3, shared=None):
+    """Stochastic %D for every period, one row per period."""
+    return rolling_mean(so_grid(high, low, close, periods, shared), smooth)
+
+def wr_grid(high, low, close, periods, shared=None):
+    """Williams %R for every period, one row per period."""
+    close, periods = as_float_array(close), as_periods(periods)
+    values, spread = np.empty((len(periods), len(close))), np.empty(len(close))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for row, (highest_high, lowest_low) in enumerate(extrema_rows(high, low, periods, shared)):
+            np.subtract(highest_high, close, out=values[row])
+            np.subtract(highest_high, lowest_low, out=spread)
+            np.divide(values[row], spread, out=values[row])
+    values *= -100
+    return values
@@ -0,0 +1,273 @@
+import os
+import json
+import math
+from collections import deque
+
+NAN = float('nan')
+
+def ratio(numerator, denominator):
+    """``numerator / denominator`` with NumPy's inf/NaN results instead of ZeroDivisionError."""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+class StreamingIndicator:
+    """Base of the incremental indicators: one ``update`` per bar, O(1) work and memory.
+
+    Each indicator replays the batch computation of ``MomentumIndicators``
+    (``ta`` on pandas) one bar at a time, with the same floating-point
+    operations, so its values equal the batch series bar for bar once warmed
+    up (NaN before, as in the batch series). ``state()`` returns a JSON-able
+    dict and ``from_state`` rebuilds the indicator from it, so a live process
+    can restart without replaying history.
+    """
+    # Plain attributes and nested indicators held in the state
+    fields = ()
+    parts = ()
+
+    def state(self):
+        state = {'type': type(self).__name__}
+        state.update({name: getattr(self, name) for name in self.fields})
+        state.update({name: getattr(self, name).state() for name in self.parts})
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        indicator = cls.__new__(cls)
+        for name in cls.fields:
+            setattr(indicator, name, state[name])
+        for name in cls.parts:
+            setattr(indicator, name, restore(state[name]))
+        return indicator
+
+class EMA(StreamingIndicator):
+    """Exponential moving average, as ``Series.ewm(span=period, min_periods=period, adjust=False).mean()``.
+
+    With ``wilder=True`` the smoothing is ``alpha = 1 / period`` (Wilder's),
+    as used by RSI. Missing values (NaN) are skipped but still decay the
+    weight of the previous value, as in pandas.
+    """
+    fields = ('alpha', 'min_periods', 'value', 'old_weight', 'observations')
+
+    def __init__(self, period, wilder=False, min_periods=None):
+        # The center of mass pandas derives from span or alpha, and the alpha it derives back
+        com = (1 - 1 / period) / (1 / period) if wilder else (period - 1) / 2
+        self.alpha = 1.0 / (1.0 + com)
+        self.min_periods = max(period if min_periods is None else min_periods, 1)
+        self.value = NAN
+        self.old_weight = 1.0
+        self.observations = 0
+
+    def update(self, x):
+        observed = not math.isnan(x)
+        if math.isnan(self.value):
+            if observed:
+                self.value = x
+        else:
+            self.old_weight *= 1.0 - self.alpha
+            if observed:
+                if self.value != x:
+                    self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        self.observations += observed
+        return self.current()
+
+    def current(self):
+        return self.value if self.observations >= self.min_periods else NAN
+
+class SMA(StreamingIndicator):
+    """Simple moving average over a ring buffer of the last ``period`` values, as ``Series.rolling(period).mean()``.
+
+    The running sum uses the same compensated add/remove updates as pandas,
+    so it neither drifts nor differs from the batch mean. A window holding a
+    NaN is NaN.
+    """
+    fields = ('period', 'ring', 'position', 'total', 'add_error', 'remove_error',
+              'observations', 'negatives', 'repeats', 'previous')
+
+    def __init__(self, period):
+        self.period = period
+        self.ring = []
+        self.position = 0
+        self.total = 0.0
+        self.add_error = 0.0
+        self.remove_error = 0.0
+        self.observations = 0
+        self.negatives = 0
+        # Run of equal values, reported exactly like pandas does
+        self.repeats = 0
+        self.previous = NAN
+
+    def update(self, x):
+        if len(self.ring) < self.period:
+            self.ring.append(x)
+        else:
+            self.remove(self.ring[self.position])
+            self.ring[self.position] = x
+            self.position = (self.position + 1) % self.period
+        self.add(x)
+        return self.current()
+
+    def add(self, x):
+        if math.isnan(x):
+            return
+        self.observations += 1
+        y = x - self.add_error
+        total = self.total + y
+        self.add_error = total - self.total - y
+        self.total = total
+        self.negatives += math.copysign(1.0, x) < 0
+        self.repeats = self.repeats + 1 if x == self.previous else 1
+        self.previous = x
+
+    def remove(self, x):
+        if math.isnan(x):
+            return
+        self.observations -= 1
+        y = -x - self.remove_error
+        total = self.total + y
+        self.remove_error = total - self.total - y
+        self.total = total
+        self.negatives -= math.copysign(1.0, x) < 0
+
+    def current(self):
+        if self.observations < self.period:
+            return NAN
+        if self.repeats >= self.observations:
+            return self.previous
+        mean = self.total / self.observations
+        if self.negatives == 0 and mean < 0 or self.negatives == self.observations and mean > 0:
+            return 0.0
+        return mean
+
+class RollingExtreme(StreamingIndicator):
+    """Rolling maximum (or minimum) of the last ``period`` values with a monotonic deque.
+
+    The deque holds ``[bar, value]`` pairs with values decreasing (increasing
+    for a minimum) from the front, which is the current extreme; each value
+    is pushed and popped at most once, so updates are amortised O(1). A
+    window holding a NaN is NaN, as in pandas.
+    """
+    fields = ('period', 'maximum', 'bar', 'last_missing')
+
+    def __init__(self, period, maximum=True):
+        self.period = period
+        self.maximum = maximum
+        self.window = deque()
+        self.bar = -1
+        self.last_missing = -1
+
+    def update(self, x):
+        self.bar += 1
+        if math.isnan(x):
+            self.last_missing = self.bar
+        else:
+            window = self.window
+            while window and (window[-1][1] <= x if self.maximum else window[-1][1] >= x):
+                window.pop()
+            window.append([self.bar, x])
+        while self.window and self.window[0][0] <= self.bar - self.period:
+            self.window.popleft()
+        return self.current()
+
+    def current(self):
+        if self.bar + 1 < self.period or self.bar - self.last_missing < self.period:
+            return NAN
+        return self.window[0][1]
+
+    def state(self):
+        state = super().state()
+        state['window'] = [list(pair) for pair in self.window]
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        indicator = super().from_state(state)
+        indicator.window = deque(list(pair) for pair in state['window'])
+        return indicator
+
+class RSI(StreamingIndicator):
+    """Wilder RSI, as ``ta.momentum.rsi``."""
+    fields = ('previous',)
+    parts = ('average_up', 'average_down')
+
+    def __init__(self, period=14):
+        self.previous = NAN
+        self.average_up = EMA(period, wilder=True)
+        self.average_down = EMA(period, wilder=True)
+
+    def update(self, close):
+        delta = close - self.previous
+        self.previous = close
+        # The first bar has no move; ta counts it as zero, as it does NaN moves
+        up = delta if delta > 0 else 0.0
+        down = -(delta if delta < 0 else 0.0)
+        average_up = self.average_up.update(up)
+        average_down = self.average_down.update(down)
+        if average_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + average_up / average_down))
+
+class MACD(StreamingIndicator):
+    """MACD line and signal line, as ``ta.trend.macd`` and ``ta.trend.macd_signal``; ``update`` returns both."""
+    parts = ('fast', 'slow', 'signal')
+
+    def __init__(self, short=12, long=26, signal=9):
+        self.fast = EMA(short)
+        self.slow = EMA(long)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        return macd_line, self.signal.update(macd_line)
+
+class Stochastic(StreamingIndicator):
+    """Stochastic %K and %D, as ``ta.momentum.stoch`` and ``ta.momentum.stoch_signal``; ``update`` returns both."""
+    parts = ('highest_high', 'lowest_low', 'signal')
+
+    def __init__(self, period=14, smooth=3):
+        self.highest_high = RollingExtreme(period, maximum=True)
+        self.lowest_low = RollingExtreme(period, maximum=False)
+        self.signal = SMA(smooth)
+
+    def update(self, high, low, close):
+        highest_high = self.highest_high.update(high)
+        lowest_low = self.lowest_low.update(low)
+        k_percent = ratio(100 * (close - lowest_low), highest_high - lowest_low)
+        return k_percent, self.signal.update(k_percent)
+
+class WilliamsR(StreamingIndicator):
+    """Williams %R, as ``ta.momentum.williams_r``."""
+    parts = ('highest_high', 'lowest_low')
+
+    def __init__(self, period=14):
+        self.highest_high = RollingExtreme(period, maximum=True)
+        self.lowest_low = RollingExtreme(period, maximum=False)
+
+    def update(self, high, low, close):
+        highest_high = self.highest_high.update(high)
+        lowest_low = self.lowest_low.update(low)
+        return ratio(-100 * (highest_high - close), highest_high - lowest_low)
+
+STREAMING_INDICATORS = {cls.__name__: cls for cls in (EMA, SMA, RollingExtreme, RSI, MACD, Stochastic, WilliamsR)}
+
+def restore(state):
+    """Rebuild an indicator from its ``state()``."""
+    return STREAMING_INDICATORS[state['type']].from_state(state)
+
+def save_states(path, indicators):
+    """Write a dict of named indicators' states to ``path``, atomically (temporary file and ``os.replace``)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({name: indicator.state() for name, indicator in indicators.items()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_states(path):
+    """Return the dict of named indicators saved by ``save_states``."""
+    with open(path) as f:
+        return {name: restore(state) for name, state in json.load(f).items()}
@@ -1,12 +1,12 @@
-import ta
 import numpy as np
 import pandas as pd
 from backtesting import Strategy
 from backtesting.test import SMA
 from backtesting.lib import crossover
+from indicators.Indicators import CachedMomentumIndicators
 
 class FlatTopBreakout(Strategy):
-    indicators = None
+    indicators = CachedMomentumIndicators
     profit_target = 0.1
     stop_loss = 0.05
 
@@ -18,14 +18,13 @@ class FlatTopBreakout(Strategy):
         self.indicators = self.indicators(self.data.df)
 
         # Convert internal data to Pandas Series for rolling calculations
-        high_series = pd.Series(self.data.High, index=self.data.index)
-        low_series = pd.Series(self.data.Low, index=self.data.index)
         close_series = pd.Series(self.data.Close, index=self.data.index)
 
-        # Calculate necessary indicators for the strategy
-        self.high_max = self.I(lambda: high_series.rolling(window=20).max())
-        self.low_min = self.I(lambda: low_series.rolling(window=20).min())
-        self.higher_lows = self.I(lambda: low_series.rolling(window=20).apply(lambda x: all(np.diff(x) >= 0)))
+        # Calculate necessary indicators for the strategy; rolling extrema are shared with other consumers of the data
+        df = self.data.df
+        self.high_max = self.I(lambda: self.indicators.rolling_max(df, 'High', 20))
+        self.low_min = self.I(lambda: self.indicators.rolling_min(df, 'Low', 20))
+        self.higher_lows = self.I(lambda: self.indicators.rolling_rising(df, 'Low', 20))
 
         # Calculate momentum indicators
         self.rsi = self.I(lambda: self.indicators.rsi(self.data.df))
@@ -61,7 +60,7 @@ class FlatTopBreakout(Strategy):
                 self.position.close()
 
 class EnhancedFlatTopBreakout(Strategy):
-    indicators = None
+    indicators = CachedMomentumIndicators
     profit_target = 0.1
     stop_loss = 0.05
 
@@ -73,14 +72,13 @@ class EnhancedFlatTopBreakout(Strategy):
         self.indicators = self.indicators(self.data.df)
 
         # Convert internal data to Pandas Series for rolling calculations
-        high_series = pd.Series(self.data.High, index=self.data.index)
-        low_series = pd.Series(self.data.Low, index=self.data.index)
         close_series = pd.Series(self.data.Close, index=self.data.index)
 
-        # Calculate necessary indicators for the strategy
-        self.high_max = self.I(lambda: high_series.rolling(window=20).max())
-        self.low_min = self.I(lambda: low_series.rolling(window=20).min())
-        self.higher_lows = self.I(lambda: low_series.rolling(window=20).apply(lambda x: all(np.diff(x) >= 0)))
+        # Calculate necessary indicators for the strategy; rolling extrema are shared with other consumers of the data
+        df = self.data.df
+        self.high_max = self.I(lambda: self.indicators.rolling_max(df, 'High', 20))
+        self.low_min = self.I(lambda: self.indicators.rolling_min(df, 'Low', 20))
+        self.higher_lows = self.I(lambda: self.indicators.rolling_rising(df, 'Low', 20))
 
         # Calculate momentum indicators
         self.rsi = self.I(lambda: self.indicators.rsi(self.data.df))
@@ -150,18 +148,20 @@ class BreakoutBuildup(Strategy):
                 self.sell(sl=self.data.Close[-1] * (1 + self.stop_loss), tp=self.data.Close[-1] * (1 - self.profit_target))
 
 class MomentumSRMStrategy(Strategy):
+    indicators = CachedMomentumIndicators
+
     def init(self):
+        df = self.data.df
+
         # Calculate Stochastic Oscillator
-        self.stoch_k = self.I(ta.momentum.stoch, self.data.High, self.data.Low, self.data.Close, window=14, smooth_window=3)
-        self.stoch_d = self.I(ta.momentum.stoch_signal, self.data.High, self.data.Low, self.data.Close, window=14, smooth_window=3)
+        self.stoch_k = self.I(lambda: self.indicators.so(df, period=14))
+        self.stoch_d = self.I(lambda: self.indicators.so_signal(df, period=14, smooth=3))
         
         # Calculate RSI
-        self.rsi = self.I(ta.momentum.rsi, self.data.Close, window=14)
+        self.rsi = self.I(lambda: self.indicators.rsi(df, period=14))
         
         # Calculate MACD
-        macd = ta.trend.MACD(self.data.Close, window_slow=26, window_fast=12, window_sign=9)
-        self.macd = self.I(lambda: macd.macd())
-        self.macd_signal = self.I(lambda: macd.macd_signal())
+        self.macd, self.macd_signal = self.I(lambda: self.indicators.macd(df, short=12, long=26, signal=9))
         
     def next(self):
         # Define buy signal conditions
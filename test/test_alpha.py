@@ -0,0 +1,66 @@
+import threading
+import pandas as pd
+from data.Store import BarStore
+from fetcher.AlphaData import AlphaDataAggregator, interval_timespan
+from test.test_catalog import StubResponse
+
+class AlphaTransport:
+    """Answers TIME_SERIES_INTRADAY requests with newest-first 5min bars in US/Eastern time.
+
+    Each month also holds a bar of the next month, as Alpha Vantage's ``month``
+    responses can; the first ``limited`` requests get a limit notice instead.
+    """
+
+    offline = False
+
+    def __init__(self, limited=0):
+        self.limited = limited
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def cached(self, url, params=None, ttl=None):
+        return None
+
+    def get(self, url, ttl=0, params=None, cacheable=None, **kwargs):
+        with self.lock:
+            self.calls.append(params)
+            if self.limited:
+                self.limited -= 1
+                response = StubResponse({'Information': 'Thank you for using Alpha Vantage! Please slow down.'})
+                assert not cacheable(response)
+                return response
+        month = pd.Period(params['month'])
+        stamps = [f'{month.start_time:%Y-%m}-02 09:{minute:02d}:00' for minute in (30, 35, 40)]
+        stamps.append(f'{(month + 1).start_time:%Y-%m}-01 09:30:00')
+        series = {stamp: {'1. open': '470.1', '2. high': '471.0', '3. low': '469.5', '4. close': str(470 + i), '5. volume': '1200'}
+                  for i, stamp in enumerate(stamps)}
+        body = {'Meta Data': {'1. Information': 'Intraday (5min) open, high, low, close prices and volume',
+                              '6. Time Zone': 'US/Eastern'},
+                f"Time Series ({params['interval']})": dict(reversed(list(series.items())))}
+        response = StubResponse(body)
+        assert cacheable(response)
+        return response
+
+def test_months_are_stored_in_utc_through_limit_notices(tmp_path):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    transport = AlphaTransport(limited=2)
+    aggregator = AlphaDataAggregator('KEY', 'SPY', ['2024-01', '2024-07'], store=store, transport=transport,
+                                     requests_per_minute=6000)
+    results = aggregator.run([{'interval': '5min', 'timespan': 'minute'}])
+
+    assert list(results) == [('5min', 'minute', '2024-01'), ('5min', 'minute', '2024-07')]
+    assert all(result == store.series_path('ALPHA', 'SPY', '5minute') for result in results.values())
+    assert len(transport.calls) == 2 + 2
+    assert all(params['apikey'] == 'KEY' and params['outputsize'] == 'full' for params in transport.calls)
+
+    df = store.read('ALPHA', 'SPY', '5minute')
+    # Bars of the next month are left out; Eastern time is UTC-5 in January and UTC-4 in July
+    assert df.index.strftime('%Y-%m-%d %H:%M').tolist() == [
+        '2024-01-02 14:30', '2024-01-02 14:35', '2024-01-02 14:40',
+        '2024-07-02 13:30', '2024-07-02 13:35', '2024-07-02 13:40']
+    assert df['close'].tolist() == [470.0, 471.0, 472.0] * 2
+
+def test_interval_timespan():
+    assert interval_timespan('1min') == (1, 'minute')
+    assert interval_timespan('15min') == (15, 'minute')
+    assert interval_timespan('60min') == (1, 'hour')
@@ -0,0 +1,51 @@
+import json
+import numpy as np
+from data.Store import BarStore
+from data.Catalog import DataCatalog
+from fetcher.Polygon import DataAggregator
+
+class StubResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(body).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+class StubTransport:
+    """Answers every aggregates request with ``rows`` minute bars from 2024-01-02 14:30 UTC."""
+
+    def __init__(self, rows=120):
+        self.rows = rows
+
+    def get(self, url, ttl=0, params=None, **kwargs):
+        t0 = int(np.datetime64('2024-01-02T14:30', 'ms').astype('int64'))
+        results = [{'v': 100.5, 'vw': 1.0, 'o': 1.0, 'c': 1.0, 'h': 1.0, 'l': 1.0, 't': t0 + i * 60000, 'n': 3}
+                   for i in range(self.rows)]
+        return StubResponse({'status': 'OK', 'resultsCount': len(results), 'results': results})
+
+def test_fetched_partitions_are_catalogued(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    DataAggregator('KEY', 'SPY', ['2024-01'], store=store, transport=StubTransport()).run([{'interval': 1, 'timespan': 'minute'}])
+
+    catalog = DataCatalog(str(tmp_path / 'catalog.sqlite'))
+    files = catalog.find('SPY', 'POLYGON', 'minute', '2024-01-01', '2024-01-31')
+    assert len(files) == 1
+    assert files[0]['path'] == store.partition_path('POLYGON', 'SPY', 'minute', 2024, 1)
+    assert files[0]['rows'] == 120
+    assert catalog.find('SPY', 'POLYGON', 'minute', '2024-02-01', '2024-02-28') == []
+
+    df = catalog.load('SPY', 'POLYGON', 'minute', '2024-01-01', '2024-01-31')
+    assert len(df) == 120
+    assert df.index[0] == np.datetime64('2024-01-02T14:30')
+
+def test_rewritten_partition_refreshes_catalog(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    aggregator = DataAggregator('KEY', 'SPY', ['2024-01'], store=store, transport=StubTransport(rows=60))
+    aggregator.run([{'interval': 1, 'timespan': 'minute'}])
+    aggregator.fetcher.transport = StubTransport(rows=90)
+    aggregator.run([{'interval': 1, 'timespan': 'minute'}])
+
+    files = DataCatalog(str(tmp_path / 'catalog.sqlite')).find('SPY', 'POLYGON', 'minute')
+    assert [row['rows'] for row in files] == [90]
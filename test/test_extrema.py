@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import Extrema, Native
+
+def series(rows=12000, seed=5):
+    values = pd.Series(np.random.default_rng(seed).normal(size=rows).cumsum())
+    # Missing values alone, in a run, and near the end
+    values.iloc[[rows // 1000, rows * 3 // 8, rows - 3]] = np.nan
+    values.iloc[rows // 2:rows // 2 + 20] = np.nan
+    return values
+
+@pytest.mark.parametrize('window', [1, 2, 3, 14, 4095, 4096, 5000])
+def test_rolling_extrema_equal_pandas(window):
+    values = series()
+    np.testing.assert_array_equal(Extrema.rolling_max(values, window), values.rolling(window).max().to_numpy())
+    np.testing.assert_array_equal(Extrema.rolling_min(values, window), values.rolling(window).min().to_numpy())
+
+@pytest.mark.parametrize('window', [14, 5000])
+def test_rolling_extrema_of_short_series_are_missing(window):
+    values = series(rows=window - 1)
+    assert np.isnan(Extrema.rolling_max(values, window)).all()
+    assert np.isnan(Extrema.rolling_min(values, window)).all()
+
+@pytest.mark.parametrize('window', [1, 2, 14, 5000])
+def test_rolling_extrema_of_series_as_long_as_window(window):
+    values = pd.Series(np.random.default_rng(9).normal(size=window))
+    np.testing.assert_array_equal(Extrema.rolling_max(values, window), values.rolling(window).max().to_numpy())
+    np.testing.assert_array_equal(Extrema.rolling_min(values, window), values.rolling(window).min().to_numpy())
+
+def test_rolling_extrema_refuse_empty_window():
+    with pytest.raises(ValueError):
+        Extrema.rolling_max(series(rows=10), 0)
+
+@pytest.mark.parametrize('window', [1, 2, 3, 5, 4097])
+def test_rolling_rising_equals_pandas(window):
+    values = series(rows=9000).round(0)
+    # Long climbs so that wide windows see both outcomes
+    values.iloc[100:4400] = np.arange(4300) // 3
+    expected = values.rolling(window).apply(lambda x: float(all(np.diff(x) >= 0)), raw=True)
+    np.testing.assert_array_equal(Extrema.rolling_rising(values, window), expected.to_numpy())
+
+def test_extrema_grid_rows_equal_pandas():
+    high, low = series(seed=1), series(seed=2)
+    periods = [1, 2, 14, 30, 4096, 5000]
+    highest_high, lowest_low = Native.extrema_grid(high, low, periods)
+    for row, period in enumerate(periods):
+        np.testing.assert_array_equal(highest_high[row], high.rolling(period).max().to_numpy())
+        np.testing.assert_array_equal(lowest_low[row], low.rolling(period).min().to_numpy())
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from indicators.Cache import IndicatorCache
+from indicators.Indicators import MomentumIndicators, CachedMomentumIndicators
+
+def ohlc(rows=2000, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, rows))
+    spread = rng.uniform(0.05, 1.0, rows)
+    index = pd.date_range('2024-01-02 09:30', periods=rows, freq='min', name='Date')
+    return pd.DataFrame({'Open': close, 'High': close + spread, 'Low': close - spread, 'Close': close}, index=index)
+
+CALLS = [
+    ('rsi', {'period': 14}),
+    ('macd', {'short': 12, 'long': 26, 'signal': 9}),
+    ('so', {'period': 14}),
+    ('so_signal', {'period': 14, 'smooth': 3}),
+    ('wr', {'period': 21}),
+]
+
+def as_tuple(result):
+    return result if isinstance(result, tuple) else (result,)
+
+@pytest.fixture
+def cached(monkeypatch, tmp_path):
+    cache = IndicatorCache(root=str(tmp_path / 'indicators'))
+    monkeypatch.setattr(CachedMomentumIndicators, 'cache', cache)
+    return cache
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('name, params', CALLS)
+def test_cached_series_equal_computed_ones(cached, name, params, backend):
+    data = ohlc()
+    expected = as_tuple(getattr(MomentumIndicators, name)(data, backend=backend, **params))
+    first = as_tuple(getattr(CachedMomentumIndicators, name)(data, backend=backend, **params))
+    again = as_tuple(getattr(CachedMomentumIndicators, name)(data.copy(), backend=backend, **params))
+
+    for want, got, hit in zip(expected, first, again):
+        pd.testing.assert_series_equal(got, want, check_names=False)
+        pd.testing.assert_series_equal(hit, want, check_names=False)
+    assert cached.stats()['hits'] >= 1
+
+def test_disk_tier_returns_identical_arrays(cached, tmp_path):
+    data = ohlc()
+    first = CachedMomentumIndicators.macd(data)
+    # A new process starts with an empty memory tier over the same directory
+    CachedMomentumIndicators.cache = IndicatorCache(root=cached.root)
+    replayed = CachedMomentumIndicators.macd(data)
+
+    assert CachedMomentumIndicators.cache.stats()['hits'] == 1
+    for want, got in zip(first, replayed):
+        np.testing.assert_array_equal(got.to_numpy(), want.to_numpy())
+        assert not got.to_numpy().flags.writeable
+    files = [name for _, _, names in os.walk(cached.root) for name in names]
+    assert len(files) == 1 and files[0].endswith('.npz')
+
+def test_changed_data_or_parameters_miss(cached):
+    data = ohlc()
+    CachedMomentumIndicators.rsi(data)
+    changed = data.copy()
+    changed.iloc[-1, changed.columns.get_loc('Close')] += 1.0
+
+    pd.testing.assert_series_equal(CachedMomentumIndicators.rsi(changed), MomentumIndicators.rsi(changed), check_names=False)
+    CachedMomentumIndicators.rsi(data, period=21)
+    assert cached.stats()['misses'] == 3
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from data.Data import DataLoder
+from data.Ingest import read_bars
+from test.test_resample import write_gappy_minutes
+
+def test_polygon_bars_keep_values_and_index(tmp_path):
+    source = write_gappy_minutes(tmp_path)
+    df = read_bars(str(tmp_path / 'SPY.csv'))
+
+    plain = pd.read_csv(tmp_path / 'SPY.csv')
+    assert df.index.equals(pd.DatetimeIndex(pd.to_datetime(plain['timestamp']).to_numpy(), name='timestamp').as_unit('ms'))
+    assert 'timestamp' not in df
+    assert df['number_of_trades'].dtype == np.int64
+    for col in ('volume', 'vw', 'open', 'close', 'high', 'low', 't', 'number_of_trades'):
+        np.testing.assert_array_equal(df[col].to_numpy(), plain[col].to_numpy())
+    assert len(df) == len(source)
+
+def test_float32_prices(tmp_path):
+    write_gappy_minutes(tmp_path)
+    df = read_bars(str(tmp_path / 'SPY.csv'), price_dtype='float32')
+    plain = pd.read_csv(tmp_path / 'SPY.csv')
+    assert df['close'].dtype == np.float32 and df['volume'].dtype == np.float64
+    np.testing.assert_array_equal(df['close'].to_numpy(), plain['close'].to_numpy(dtype='float32'))
+
+def test_yahoo_offsets_parse_through_utc(tmp_path):
+    # Offsets change across the daylight saving switch of 2024-03-10
+    index = pd.DatetimeIndex(['2024-03-08 09:30', '2024-03-11 09:30'], tz='America/New_York')
+    pd.DataFrame({'Open': [1.0, 2.0], 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Adj Close': 1.0, 'Volume': [10, 20]},
+                 index=index).to_csv(tmp_path / 'SPY_1m.csv')
+    df = read_bars(str(tmp_path / 'SPY_1m.csv'))
+    assert df.index.equals(pd.DatetimeIndex(index, name='Date'))
+    assert df['Volume'].tolist() == [10, 20]
+
+def test_loader_indexes_csv_bars_by_date(tmp_path):
+    frame = pd.DataFrame({'Date': pd.date_range('2024-01-02 09:30', periods=3, freq='1h'), 'Volume': [1.0, 2.0, 3.0],
+                          'VW': 1.0, 'Open': 1.0, 'Close': [1.0, 2.0, 3.0], 'High': 1.0, 'Low': 1.0, 'Number_of_trades': 1})
+    frame.to_csv(tmp_path / '1h_SPY.csv', index=False)
+    df = DataLoder(str(tmp_path), 0).load()
+    assert isinstance(df.index, pd.DatetimeIndex) and df.index.name == 'Date'
+    assert df.index.equals(pd.DatetimeIndex(frame['Date'], name='Date'))
+    assert df['Close'].tolist() == [1.0, 2.0, 3.0]
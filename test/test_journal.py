@@ -0,0 +1,52 @@
+import requests
+from data.Store import BarStore
+from fetcher.Journal import FetchJournal, DONE, FAILED
+from fetcher.Polygon import AsyncDataAggregator
+from test.test_polygon import PagedTransport
+
+class DroppingTransport(PagedTransport):
+    """A PagedTransport whose connection drops when the ``fail_url`` page is requested."""
+
+    def __init__(self, fail_url, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_url = fail_url
+
+    def get(self, url, ttl=0, params=None, **kwargs):
+        if url == self.fail_url:
+            raise requests.ConnectionError('connection reset')
+        return super().get(url, ttl, params, **kwargs)
+
+def aggregator(tmp_path, transport, journal):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    return AsyncDataAggregator('KEY', 'SPY', ['2024-01', '2024-02'], store=store, transport=transport,
+                               requests_per_minute=6000, journal=journal)
+
+def test_interrupted_run_resumes_from_the_last_committed_page(tmp_path):
+    path = str(tmp_path / 'journal' / 'POLYGON_SPY.json')
+    intervals = [{'interval': 1, 'timespan': 'minute'}]
+    first = aggregator(tmp_path, PagedTransport(), None)
+    january_url = first.fetcher.aggregates_url('SPY', 'minute', 1, '2024-01-01', '2024-01-31')
+    dropped = f"{january_url}&cursor=2"
+
+    results = aggregator(tmp_path, DroppingTransport(dropped, pages=4, rows=30), FetchJournal(path)).run(intervals)
+    assert isinstance(results[(1, 'minute', '2024-01-01', '2024-01-31')], requests.ConnectionError)
+
+    journal = FetchJournal.load(path)
+    january, february = journal.jobs.values()
+    assert (january['state'], january['cursor'], january['rows']) == (FAILED, dropped, 60)
+    assert (february['state'], february['rows']) == (DONE, 120)
+    assert journal.unfinished() == [('SPY', 1, 'minute', '2024-01-01', '2024-01-31')]
+
+    transport = PagedTransport(pages=4, rows=30)
+    resumed = aggregator(tmp_path, transport, journal)
+    results = resumed.run(intervals)
+
+    # Only the pages after the last committed one are requested again
+    assert [url for url, _ in transport.calls] == [dropped, f"{january_url}&cursor=3"]
+    assert list(results) == [(1, 'minute', '2024-01-01', '2024-01-31')]
+    assert FetchJournal.load(path).summary() == {DONE: 2}
+    assert FetchJournal.load(path).jobs[next(iter(journal.jobs))]['rows'] == 120
+
+    df = resumed.file_manager.store.read('POLYGON', 'SPY', 'minute')
+    assert len(df) == 2 * 4 * 30
+    assert df.index.is_unique and df.index.is_monotonic_increasing
@@ -0,0 +1,19 @@
+import os
+import pandas as pd
+from data.Data import DataResampler
+from test.test_resample_cache import write_minutes
+
+def test_ladder_output_does_not_replace_process_output(tmp_path):
+    data = tmp_path / 'SPY'
+    data.mkdir()
+    write_minutes(data)
+
+    resampler = DataResampler(str(data), cache=False)
+    output_file = resampler.process('15min')
+    ladder_files = DataResampler(str(data), cache=False).process_ladder(['15min', '1h'])
+
+    assert ladder_files['15min'] != output_file
+    assert os.path.basename(ladder_files['15min']) == '15min_ladder_SPY.csv'
+    processed = pd.read_csv(output_file, float_precision='round_trip')
+    assert processed['VW'].tolist() == resampler.resampled_df['VW'].tolist()
+    assert len(pd.read_csv(ladder_files['15min'])) == len(processed)
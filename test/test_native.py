@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators.Indicators import MomentumIndicators
+from test.test_indicator_cache import ohlc
+
+TOLERANCE = 1e-9
+
+def assert_close(expected, actual):
+    """Same NaN positions and values within TOLERANCE."""
+    expected = expected.to_numpy(dtype='float64')
+    actual = actual.to_numpy(dtype='float64')
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual[~np.isnan(expected)], expected[~np.isnan(expected)], rtol=0, atol=TOLERANCE)
+
+CALLS = [
+    ('rsi', {'period': 14}),
+    ('rsi', {'period': 2}),
+    ('macd', {'short': 12, 'long': 26, 'signal': 9}),
+    ('macd', {'short': 3, 'long': 50, 'signal': 1}),
+    ('so', {'period': 14}),
+    ('so_signal', {'period': 14, 'smooth': 3}),
+    ('wr', {'period': 30}),
+]
+
+@pytest.mark.parametrize('rows', [5, 3000])
+@pytest.mark.parametrize('name, params', CALLS)
+def test_numpy_backend_matches_ta(name, params, rows):
+    data = ohlc(rows)
+    # A flat stretch: no down moves (RSI 100) and zero high-low spreads
+    data.iloc[rows // 30:rows // 20] = data.iloc[0].to_numpy()
+    expected = getattr(MomentumIndicators, name)(data, backend='ta', **params)
+    actual = getattr(MomentumIndicators, name)(data, backend='numpy', **params)
+    for want, got in zip(*[(result if isinstance(result, tuple) else (result,)) for result in (expected, actual)]):
+        assert got.index.equals(want.index)
+        assert_close(want, got)
+
+def test_leading_nans_match_ta():
+    data = ohlc(500)
+    data.iloc[:20] = np.nan
+    assert_close(MomentumIndicators.rsi(data, backend='ta'), MomentumIndicators.rsi(data, backend='numpy'))
+    for want, got in zip(MomentumIndicators.macd(data, backend='ta'), MomentumIndicators.macd(data, backend='numpy')):
+        assert_close(want, got)
+
+def test_nan_inside_the_series_is_refused():
+    data = ohlc(500)
+    data.iloc[200, data.columns.get_loc('Close')] = np.nan
+    with pytest.raises(ValueError, match="'ta' backend"):
+        MomentumIndicators.macd(data, backend='numpy')
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match='backend'):
+        MomentumIndicators.rsi(ohlc(50), backend='talib')
+
+def test_rsi_grid_rows_match_single_calls_and_ta():
+    data = ohlc(5000)
+    # A long flat stretch: both averages decay for hundreds of bars and must keep their ratio
+    data.iloc[1000:1400] = data.iloc[1000].to_numpy()
+    data.iloc[:3, data.columns.get_loc('Close')] = np.nan
+    periods = [1, 2, 3, 14, 30, 200]
+    grid = MomentumIndicators.rsi_grid(data, periods)
+
+    assert grid.shape == (len(periods), len(data))
+    for row, period in zip(grid, periods):
+        expected = MomentumIndicators.rsi(data, period=period, backend='ta')
+        assert_close(expected, pd.Series(row))
+        assert_close(MomentumIndicators.rsi(data, period=period, backend='numpy'), pd.Series(row))
+
+def test_rsi_grid_of_a_short_or_flat_series():
+    flat = pd.DataFrame({'Close': np.full(10, 3.0)})
+    assert (MomentumIndicators.rsi_grid(flat, [2, 5])[:, 4:] == 100.0).all()
+    assert MomentumIndicators.rsi_grid(flat.iloc[:0], [2, 5]).shape == (2, 0)
+    short = MomentumIndicators.rsi_grid(ohlc(3), [2, 14])
+    assert np.isnan(short[1]).all() and not np.isnan(short[0, 1:]).any()
@@ -0,0 +1,48 @@
+import pandas as pd
+from data.Store import BarStore
+from fetcher.Planner import NYSEEarlyCloseCalendar, plan_backfill, session_close, trading_days
+
+def session_bars(days, close='16:00', freq='min'):
+    """Bars of the regular session of every market day, indexed in naive UTC as the store keeps them."""
+    index = pd.DatetimeIndex([])
+    for day in days:
+        session = pd.date_range(f'{day} 09:30', f'{day} {close}', freq=freq, inclusive='left', tz='America/New_York')
+        index = index.append(session.tz_convert('UTC').tz_localize(None))
+    return pd.DataFrame({'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0, 'volume': 1.0}, index=index)
+
+def test_trading_days_skip_weekends_and_holidays():
+    days = trading_days('2024-01-12', '2024-01-17')
+    # 2024-01-15 is Martin Luther King Jr. Day
+    assert days.strftime('%Y-%m-%d').tolist() == ['2024-01-12', '2024-01-16', '2024-01-17']
+    assert pd.Timestamp('2024-07-04') not in trading_days('2024-07-01', '2024-07-31')
+    assert pd.Timestamp('2024-12-25') not in trading_days('2024-12-01', '2024-12-31')
+
+def test_early_closes():
+    early = NYSEEarlyCloseCalendar().holidays('2018-01-01', '2026-12-31').strftime('%Y-%m-%d').tolist()
+    assert {'2019-07-03', '2023-07-03', '2024-11-29', '2024-12-24', '2025-07-03'} <= set(early)
+    # Friday half days are the observed holidays instead
+    assert '2020-07-03' not in early and '2021-12-24' not in early
+    assert session_close('2024-11-29') == pd.Timedelta(hours=13)
+    assert session_close('2024-11-27') == pd.Timedelta(hours=16)
+
+def test_plan_skips_stored_days(tmp_path):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    store.write(session_bars(['2024-01-03', '2024-01-04', '2024-01-10']), 'POLYGON', 'SPY', 'minute')
+
+    assert plan_backfill('SPY', '2024-01-01', '2024-01-17', store=store) == [
+        ('2024-01-02', '2024-01-02'), ('2024-01-05', '2024-01-09'), ('2024-01-11', '2024-01-17')]
+    assert plan_backfill('SPY', '2024-01-01', '2024-01-17', store=store, merge_gap=2) == [('2024-01-02', '2024-01-17')]
+    assert plan_backfill('SPY', '2024-01-03', '2024-01-04', store=store) == []
+
+def test_unfinished_last_day_is_refetched(tmp_path):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    store.write(session_bars(['2024-01-03', '2024-01-04'], close='12:00'), 'POLYGON', 'SPY', 'minute')
+    assert plan_backfill('SPY', '2024-01-03', '2024-01-04', store=store) == [('2024-01-04', '2024-01-04')]
+
+def test_half_day_ending_at_the_early_close_is_complete(tmp_path):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    store.write(session_bars(['2024-11-29'], close='13:00'), 'POLYGON', 'SPY', 'minute')
+    store.write(session_bars(['2024-11-29'], close='13:00', freq='5min'), 'POLYGON', 'SPY', '5minute')
+
+    assert plan_backfill('SPY', '2024-11-25', '2024-11-29', store=store) == [('2024-11-25', '2024-11-27')]
+    assert plan_backfill('SPY', '2024-11-29', '2024-11-29', timespan='5minute', store=store) == []
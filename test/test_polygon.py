@@ -0,0 +1,166 @@
+import re
+import json
+import threading
+import pytest
+import requests
+import numpy as np
+import pandas as pd
+from data.Store import BarStore
+from fetcher.Transport import HttpTransport
+from fetcher.ResponseCache import ResponseCache
+from fetcher.Polygon import PAGE_LIMIT, DataFetcher, DataAggregator, AsyncDataAggregator, decode_aggregates
+from test.test_catalog import StubResponse, StubTransport
+
+def test_csv_output_keeps_one_file_per_series(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    for _ in range(2):
+        DataAggregator('KEY', 'SPY', ['2024-01'], store=store, transport=StubTransport(),
+                       csv_root=str(tmp_path / 'csv')).run([{'interval': 1, 'timespan': 'minute'}])
+
+    assert [path.name for path in (tmp_path / 'csv' / 'POLYGON' / 'minute').iterdir()] == ['SPY_1.csv']
+    stored = pd.read_csv(tmp_path / 'csv' / 'POLYGON' / 'minute' / 'SPY_1.csv', index_col=0, parse_dates=True)
+    assert len(stored) == 120
+    assert stored.index.is_monotonic_increasing
+
+class PagedTransport:
+    """Serves ``pages`` pages of ``rows`` minute bars per range through next_url cursors.
+
+    The first ``rate_limited`` requests are answered with a 429.
+    """
+
+    offline = False
+
+    def __init__(self, pages=2, rows=30, rate_limited=0):
+        self.pages = pages
+        self.rows = rows
+        self.rate_limited = rate_limited
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def cached(self, url, params=None, ttl=None):
+        return None
+
+    def get(self, url, ttl=0, params=None, **kwargs):
+        with self.lock:
+            self.calls.append((url, params))
+            if self.rate_limited:
+                self.rate_limited -= 1
+                return StubResponse({'status': 'ERROR'}, status_code=429, headers={'Retry-After': '0'})
+        base, _, cursor = url.partition('&cursor=')
+        page = int(cursor or 0)
+        from_date = re.search(r'/(\d{4}-\d{2}-\d{2})/\d{4}-\d{2}-\d{2}', base).group(1)
+        t0 = int(np.datetime64(f'{from_date}T14:30', 'ms').astype('int64')) + page * self.rows * 60000
+        results = [{'v': 10.0, 'vw': 1.0, 'o': 1.0, 'c': 1.0, 'h': 1.0, 'l': 1.0, 't': t0 + i * 60000, 'n': 1}
+                   for i in range(self.rows)]
+        body = {'status': 'OK', 'resultsCount': self.rows, 'results': results}
+        if page + 1 < self.pages:
+            body['next_url'] = f"{base}&cursor={page + 1}"
+        return StubResponse(body)
+
+def test_async_aggregator_fetches_every_range_through_a_429(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    transport = PagedTransport(rate_limited=1)
+    aggregator = AsyncDataAggregator('KEY', 'SPY', ['2024-01', '2024-02'], store=store, transport=transport,
+                                     requests_per_minute=6000, concurrency=2)
+    results = aggregator.run([{'interval': 1, 'timespan': 'minute'}])
+
+    assert list(results) == [(1, 'minute', '2024-01-01', '2024-01-31'), (1, 'minute', '2024-02-01', '2024-02-29')]
+    assert all(result == store.series_path('POLYGON', 'SPY', 'minute') for result in results.values())
+    assert len(transport.calls) == 2 * 2 + 1
+    assert aggregator.rows_fetched == 2 * 2 * 30
+    df = store.read('POLYGON', 'SPY', 'minute')
+    assert len(df) == 120
+    assert df.index.is_monotonic_increasing
+
+def test_pages_follow_next_url_with_the_key():
+    transport = PagedTransport(pages=3, rows=40)
+    fetcher = DataFetcher('KEY', transport=transport)
+    arrays = fetcher.get_aggregated_data('SPY', 'minute', 1, '2024-01-01', '2024-01-31')
+
+    assert f'limit={PAGE_LIMIT}' in transport.calls[0][0]
+    assert [url.partition('&cursor=')[2] for url, _ in transport.calls] == ['', '1', '2']
+    # Cursors do not carry the key, so every page sends it as a parameter
+    assert all(params == {'apiKey': 'KEY'} for _, params in transport.calls)
+    assert len(arrays['t']) == 120
+    assert (np.diff(arrays['t']) == 60000).all()
+
+def test_aggregator_stores_every_page_of_a_range(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    DataAggregator('KEY', 'SPY', ['2024-01'], store=store, transport=PagedTransport(pages=3)).run(
+        [{'interval': 1, 'timespan': 'minute'}])
+    assert len(store.read('POLYGON', 'SPY', 'minute')) == 90
+
+class BodySession:
+    """Answers every GET with the next of ``bodies``."""
+
+    def __init__(self, bodies):
+        self.bodies = list(bodies)
+
+    def get(self, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self.bodies.pop(0)).encode()
+        return response
+
+def test_only_complete_pages_are_cached(tmp_path):
+    bar = {'v': 1.0, 'vw': 1.0, 'o': 1.0, 'c': 1.0, 'h': 1.0, 'l': 1.0, 't': 1704205800000, 'n': 1}
+    bodies = [
+        {'status': 'ERROR', 'error': 'Unknown API Key'},
+        {'status': 'DELAYED', 'resultsCount': 1, 'results': [bar]},
+        {'status': 'OK', 'resultsCount': 0, 'results': []},
+        {'status': 'OK', 'resultsCount': 1, 'results': [bar]},
+    ]
+    transport = HttpTransport(cache=ResponseCache(str(tmp_path / 'http')))
+    transport.session = BodySession(bodies)
+    fetcher = DataFetcher('KEY', transport=transport)
+    url = fetcher.aggregates_url('SPY', 'minute', 1, '2024-01-01', '2024-01-31')
+
+    with pytest.raises(ValueError):
+        fetcher.get_page(url, ttl=None)
+    for _ in range(3):
+        assert not fetcher.is_cached(url, ttl=None)
+        fetcher.get_page(url, ttl=None)
+    assert fetcher.is_cached(url, ttl=None)
+    assert transport.session.bodies == []
+    assert fetcher.get_page(url, ttl=None)[0]['t'].tolist() == [1704205800000]
+
+def aggregates_payload(results, separators=(',', ':')):
+    body = {'ticker': 'SPY', 'queryCount': len(results), 'resultsCount': len(results), 'adjusted': True,
+            'results': results, 'status': 'OK', 'request_id': 'a1b2c3', 'count': len(results),
+            'next_url': 'https://api.polygon.io/v2/aggs/ticker/SPY/range/1/minute/1704205800000/2024-01-31?cursor=abc'}
+    return json.dumps(body, separators=separators).encode()
+
+def polygon_bars(rows=50, seed=3):
+    rng = np.random.default_rng(seed)
+    t0 = 1704205800000
+    return [{'v': float(rng.integers(1, 10**6)), 'vw': round(float(rng.uniform(470, 480)), 4),
+             'o': round(float(rng.uniform(470, 480)), 2), 'c': round(float(rng.uniform(470, 480)), 2),
+             'h': 480.5, 'l': 469.25, 't': t0 + i * 60000, 'n': int(rng.integers(1, 5000))} for i in range(rows)]
+
+def assert_matches_json(payload):
+    body, arrays = decode_aggregates(payload)
+    expected = json.loads(payload)
+    frame = pd.DataFrame(expected.pop('results'))
+    frame = frame[frame['t'].notna()]
+    expected['results'] = []
+    assert body == expected
+    assert sorted(arrays) == sorted(frame)
+    assert arrays['t'].dtype == np.int64
+    for field, values in arrays.items():
+        np.testing.assert_array_equal(values, frame[field].to_numpy(dtype='float64'))
+
+@pytest.mark.parametrize('separators', [(',', ':'), (', ', ': ')])
+def test_decoded_page_matches_json(separators):
+    assert_matches_json(aggregates_payload(polygon_bars(), separators))
+
+def test_page_with_missing_fields_matches_json():
+    bars = polygon_bars()
+    del bars[3]['vw'], bars[7]['n'], bars[8]['n']
+    del bars[20]['t']
+    payload = aggregates_payload(bars)
+    assert_matches_json(payload)
+
+    arrays = decode_aggregates(payload)[1]
+    assert len(arrays['t']) == len(bars) - 1
+    assert np.isnan(arrays['vw'][3]) and np.isnan(arrays['n'][7])
+    assert (np.diff(arrays['t']) > 0).all()
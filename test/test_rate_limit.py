@@ -0,0 +1,46 @@
+import time
+import asyncio
+from fetcher.RateLimit import TokenBucket, parse_retry_after
+
+async def timed_acquires(bucket, count):
+    start = time.monotonic()
+    for _ in range(count):
+        await bucket.acquire()
+    return time.monotonic() - start
+
+def test_burst_is_free_then_requests_are_spaced():
+    async def run():
+        bucket = TokenBucket(600, burst=3)
+        # 3 tokens are in the bucket; the next 2 refill at 10 per second
+        return await timed_acquires(bucket, 3), await timed_acquires(bucket, 2)
+
+    burst, spaced = asyncio.run(run())
+    assert burst < 0.05
+    assert 0.15 < spaced < 0.5
+
+def test_pause_holds_every_caller():
+    async def run():
+        bucket = TokenBucket(6000, burst=10)
+        bucket.pause(0.2)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+        return time.monotonic() - start
+
+    assert 0.2 <= asyncio.run(run()) < 0.5
+
+def test_tokens_never_exceed_burst():
+    now = [0.0]
+    bucket = TokenBucket(60, burst=5, clock=lambda: now[0])
+    bucket.tokens = 0.0
+    now[0] = 2.0
+    bucket.refill()
+    assert bucket.tokens == 2.0
+    now[0] = 3600.0
+    bucket.refill()
+    assert bucket.tokens == 5
+
+def test_parse_retry_after():
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.Data import DataResampler, RESAMPLE_AGGREGATIONS
+from data.Aggregate import reduceat_resample
+
+def write_gappy_minutes(folder, periods=3000, seed=7):
+    """Polygon-layout minute bars over several days with missing minutes and missing values."""
+    rng = np.random.default_rng(seed)
+    t = np.datetime64('2024-01-02T09:30', 'ms').astype('int64') + np.arange(periods) * 60000
+    t = t[rng.random(periods) > 0.2]
+    close = 100 + np.cumsum(rng.normal(0, 0.1, len(t)))
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(t, unit='ms'), 'volume': rng.integers(0, 500, len(t)).astype('float64'),
+        'vw': close + 0.01, 'open': close - 0.02, 'close': close, 'high': close + 0.05, 'low': close - 0.05,
+        't': t, 'number_of_trades': rng.integers(1, 20, len(t)),
+    })
+    for col in ('vw', 'open', 'close', 'volume'):
+        df.loc[rng.random(len(df)) < 0.05, col] = np.nan
+    df.to_csv(folder / 'SPY.csv', index=False)
+    return df
+
+@pytest.fixture
+def minutes(tmp_path):
+    folder = tmp_path / 'SPY'
+    folder.mkdir()
+    write_gappy_minutes(folder)
+    return folder
+
+@pytest.mark.parametrize('interval', ['1min', '5min', '15min', '1h', '1D'])
+def test_numpy_engine_matches_pandas_resample(minutes, interval):
+    resampler = DataResampler(str(minutes), cache=False)
+    resampler.load_source()
+    df = resampler.df
+
+    expected = df.resample(interval, origin='start_day').agg(RESAMPLE_AGGREGATIONS)
+    result = reduceat_resample(df, interval, RESAMPLE_AGGREGATIONS)
+    # reduceat skips empty buckets, which pandas fills with NaN (or 0 for sums)
+    rows = df['close'].resample(interval, origin='start_day').size()
+    assert result.index.equals(rows.index[rows > 0])
+    expected = expected.loc[result.index]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_freq=False)
+
+    by_engine = [DataResampler(str(minutes), cache=False, engine=engine) for engine in ('pandas', 'numpy')]
+    for resampler in by_engine:
+        resampler.load_source()
+    pd.testing.assert_frame_equal(by_engine[1].resample_data(interval), by_engine[0].resample_data(interval), check_dtype=False)
+
+@pytest.mark.parametrize('engine', ['pandas', 'numpy'])
+@pytest.mark.parametrize('chunksize', [5, 37, 1000, 100_000])
+def test_chunked_resample_matches_in_memory(minutes, engine, chunksize):
+    output_file = DataResampler(str(minutes), cache=False, engine=engine).process('15min')
+    with open(output_file) as f:
+        expected = f.read()
+
+    assert DataResampler(str(minutes), engine=engine).process_stream('15min', chunksize=chunksize) == output_file
+    with open(output_file) as f:
+        assert f.read() == expected
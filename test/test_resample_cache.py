@@ -0,0 +1,45 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data.Data import DataResampler
+from data.Cache import ResampleCache
+
+def write_minutes(folder, periods=120):
+    t = np.datetime64('2024-01-02T14:30', 'ms').astype('int64') + np.arange(periods) * 60000
+    close = 100 + np.arange(periods) / 3
+    pd.DataFrame({
+        'timestamp': pd.to_datetime(t, unit='ms'), 'volume': 10.0, 'vw': close, 'open': close, 'close': close,
+        'high': close, 'low': close, 't': t, 'number_of_trades': 2,
+    }).to_csv(folder / 'SPY.csv', index=False)
+
+def test_cache_key_covers_engine_and_price_dtype(tmp_path, capsys):
+    data = tmp_path / 'SPY'
+    data.mkdir()
+    write_minutes(data)
+    cache = ResampleCache(str(tmp_path / 'cache'))
+
+    runs = [('pandas', 'float64'), ('numpy', 'float64'), ('pandas', 'float32'), ('pandas', 'float64')]
+    for engine, price_dtype in runs:
+        DataResampler(str(data), cache=cache, engine=engine, price_dtype=price_dtype).process('15min')
+    hits = capsys.readouterr().out.count('loaded from cache')
+
+    # Only the repeated pandas/float64 run is served from the cache
+    assert hits == 1
+    assert len(cache.load_index()['entries']) == 3
+
+def test_concurrent_puts_keep_every_entry(tmp_path):
+    cache = ResampleCache(str(tmp_path / 'cache'))
+    frame = pd.DataFrame({'Close': np.arange(1000.0)})
+
+    def put(number):
+        return cache.put(f"source-{number}", f"fingerprint-{number}", '15min', frame)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(put, range(32)))
+
+    entries = cache.load_index()['entries']
+    assert len(entries) == 32
+    assert sorted(os.listdir(cache.root)) == sorted([f"{key}.pkl" for key in entries] + ['index.json', 'index.lock'])
+    frame_back, _ = cache.get('fingerprint-7', '15min')
+    pd.testing.assert_frame_equal(frame_back, frame)
@@ -0,0 +1,38 @@
+from data.Store import BarStore
+from fetcher.Scheduler import BackfillScheduler
+from utils import read_symbols
+from test.test_planner import session_bars
+from test.test_polygon import PagedTransport
+
+def scheduler(tmp_path, transport=None):
+    store = BarStore(str(tmp_path / 'store'), catalog=False)
+    store.write(session_bars(['2024-01-03', '2024-01-05']), 'POLYGON', 'SPY', 'minute')
+    store.write(session_bars(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08', '2024-01-09']),
+                'POLYGON', 'IWM', 'minute')
+    return BackfillScheduler('KEY', ['SPY', 'IWM', 'QQQ'], '2024-01-02', '2024-01-10', store=store,
+                             transport=transport or PagedTransport(pages=1), requests_per_minute=6000)
+
+def test_stalest_symbols_go_first_round_robin(tmp_path):
+    assert scheduler(tmp_path).plan() == [
+        ('QQQ', '2024-01-02', '2024-01-10'),
+        ('SPY', '2024-01-02', '2024-01-02'),
+        ('IWM', '2024-01-10', '2024-01-10'),
+        ('SPY', '2024-01-04', '2024-01-04'),
+        ('SPY', '2024-01-08', '2024-01-10'),
+    ]
+
+def test_run_fetches_every_planned_range(tmp_path):
+    transport = PagedTransport(pages=2, rows=10)
+    backfill = scheduler(tmp_path, transport)
+    results = backfill.run()
+
+    assert len(results) == 5
+    assert all(not isinstance(result, Exception) for result in results.values())
+    assert len(transport.calls) == 5 * 2
+    assert backfill.aggregators['QQQ'].rows_fetched == 20
+    assert len(backfill.store.read('POLYGON', 'QQQ', 'minute')) == 20
+
+def test_read_symbols(tmp_path):
+    (tmp_path / 'symbols.txt').write_text('aapl\n# index funds\nSPY  # S&P 500\n\nmsft\n')
+    assert read_symbols('spy, QQQ,,') == ['SPY', 'QQQ']
+    assert read_symbols('QQQ', str(tmp_path / 'symbols.txt')) == ['QQQ', 'AAPL', 'SPY', 'MSFT']
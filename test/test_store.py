@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data.Store import BarStore, append_csv
+from data.Catalog import DataCatalog
+
+def minute_bars(start, periods):
+    index = pd.date_range(start, periods=periods, freq='min')
+    close = np.arange(periods, dtype='float64')
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': close + 0.5}, index=index)
+
+def write_bars(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    # 2023-03-01 23:00 to 2023-03-03 00:59
+    store.write(minute_bars('2023-03-01 23:00', 26 * 60), 'POLYGON', 'SPY', 'minute')
+    return store
+
+def test_date_only_end_includes_the_whole_day(tmp_path):
+    store = write_bars(tmp_path)
+    last = np.datetime64('2023-03-02T23:59', 'ms').astype('int64')
+
+    assert store.read_arrays('POLYGON', 'SPY', 'minute', end='2023-03-02')['t'][-1] == last
+    assert store.memmap_arrays('POLYGON', 'SPY', 'minute', end='2023-03-02')['t'][-1] == last
+    assert store.read('POLYGON', 'SPY', 'minute', '2023-03-02', '2023-03-02').index[-1] == pd.Timestamp('2023-03-02 23:59')
+    assert len(store.read('POLYGON', 'SPY', 'minute', '2023-03-02', '2023-03-02')) == 24 * 60
+
+def test_timestamp_end_stays_exact(tmp_path):
+    store = write_bars(tmp_path)
+    arrays = store.read_arrays('POLYGON', 'SPY', 'minute', end='2023-03-02 00:00')
+    assert arrays['t'][-1] == np.datetime64('2023-03-02T00:00', 'ms').astype('int64')
+    arrays = store.read_arrays('POLYGON', 'SPY', 'minute', end=pd.Timestamp('2023-03-02'))
+    assert arrays['t'][-1] == np.datetime64('2023-03-02T00:00', 'ms').astype('int64')
+
+def test_catalog_date_only_end_includes_the_whole_day(tmp_path):
+    write_bars(tmp_path)
+    catalog = DataCatalog(str(tmp_path / 'catalog.sqlite'))
+    assert len(catalog.find('SPY', 'POLYGON', 'minute', '2023-03-02', '2023-03-02')) == 1
+    df = catalog.load('SPY', 'POLYGON', 'minute', '2023-03-02', '2023-03-02')
+    assert df.index[0] == pd.Timestamp('2023-03-02 00:00')
+    assert df.index[-1] == pd.Timestamp('2023-03-02 23:59')
+
+def test_concurrent_consolidate(tmp_path):
+    store = write_bars(tmp_path)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(lambda _: store.consolidate('POLYGON', 'SPY', 'minute'), range(16)))
+
+    assert len(set(paths)) == 1
+    assert not [name for name in os.listdir(paths[0]) if name.endswith('.tmp')]
+    arrays = store.memmap_arrays('POLYGON', 'SPY', 'minute')
+    assert len(arrays['t']) == 26 * 60
+    assert np.array_equal(arrays['close'], np.arange(26 * 60, dtype='float64'))
+
+def test_fractional_volume_is_kept(tmp_path):
+    store = write_bars(tmp_path)
+    arrays = store.read_arrays('POLYGON', 'SPY', 'minute', end='2023-03-01 23:02')
+    assert arrays['volume'].dtype == np.float64
+    assert list(arrays['volume']) == [0.5, 1.5, 2.5]
+
+def test_newer_rows_are_appended_in_place(tmp_path):
+    store = write_bars(tmp_path)
+    partition_path = store.partition_path('POLYGON', 'SPY', 'minute', 2023, 3)
+    inode = os.stat(os.path.join(partition_path, 'close.npy')).st_ino
+    checksum = store.read_meta(partition_path)['checksum']
+
+    store.write(minute_bars('2023-03-03 01:00', 60), 'POLYGON', 'SPY', 'minute')
+
+    assert os.stat(os.path.join(partition_path, 'close.npy')).st_ino == inode
+    meta = store.read_meta(partition_path)
+    assert meta['rows'] == 26 * 60 + 60 and meta['checksum'] != checksum
+    df = store.read('POLYGON', 'SPY', 'minute', '2023-03-03 00:59', '2023-03-03 01:01')
+    assert df['close'].tolist() == [26 * 60 - 1, 0.0, 1.0]
+    assert DataCatalog(str(tmp_path / 'catalog.sqlite')).find('SPY', 'POLYGON', 'minute', '2023-03-03', '2023-03-03')[-1]['rows'] == meta['rows']
+
+def test_overlapping_rows_are_merged(tmp_path):
+    store = write_bars(tmp_path)
+    partition_path = store.partition_path('POLYGON', 'SPY', 'minute', 2023, 3)
+    inode = os.stat(os.path.join(partition_path, 'close.npy')).st_ino
+
+    store.write(minute_bars('2023-03-03 00:30', 60) + 1000, 'POLYGON', 'SPY', 'minute')
+
+    assert os.stat(os.path.join(partition_path, 'close.npy')).st_ino != inode
+    df = store.read('POLYGON', 'SPY', 'minute', '2023-03-03 00:59', '2023-03-03 01:00')
+    # Stored rows win over re-downloaded ones
+    assert df['close'].tolist() == [26 * 60 - 1, 1030.0]
+
+def test_append_csv_writes_only_new_rows(tmp_path):
+    filename = str(tmp_path / 'SPY_1.csv')
+    bars = minute_bars('2024-01-02 14:30', 30)
+
+    assert append_csv(bars.iloc[:20], filename) == 20
+    assert append_csv(bars.iloc[20:], filename) == 10
+    changed = bars.iloc[15:].copy()
+    changed['close'] += 1000
+    assert append_csv(changed, filename) == 0
+
+    stored = pd.read_csv(filename, index_col=0, parse_dates=True)
+    pd.testing.assert_frame_equal(stored, bars, check_freq=False, check_names=False)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators.Indicators import MomentumIndicators
+from indicators.Streaming import EMA, SMA, RollingExtreme, RSI, MACD, Stochastic, WilliamsR, save_states, load_states
+from test.test_indicator_cache import ohlc
+
+def bars(rows=1500):
+    data = ohlc(rows)
+    # A flat stretch (zero moves and spreads) and a missing close
+    data.iloc[300:340] = data.iloc[300].to_numpy()
+    data.iloc[700, data.columns.get_loc('Close')] = np.nan
+    return data
+
+def indicators():
+    return {
+        'rsi': RSI(14),
+        'macd': MACD(12, 26, 9),
+        'stochastic': Stochastic(14, 3),
+        'wr': WilliamsR(21),
+        'ema': EMA(10),
+        'sma': SMA(20),
+        'high': RollingExtreme(30, maximum=True),
+    }
+
+def batch(data):
+    """The batch series each streaming indicator must reproduce, as columns of one frame."""
+    macd_line, signal_line = MomentumIndicators.macd(data, backend='ta')
+    return pd.DataFrame({
+        'rsi': MomentumIndicators.rsi(data, backend='ta'),
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'so': MomentumIndicators.so(data, backend='ta'),
+        'so_signal': MomentumIndicators.so_signal(data, backend='ta'),
+        'wr': MomentumIndicators.wr(data, period=21, backend='ta'),
+        'ema': data['Close'].ewm(span=10, min_periods=10, adjust=False).mean(),
+        'sma': data['Close'].rolling(20).mean(),
+        'high': data['High'].rolling(30).max(),
+    })
+
+def stream(running, data):
+    rows = []
+    for high, low, close in data[['High', 'Low', 'Close']].itertuples(index=False):
+        macd_line, signal_line = running['macd'].update(close)
+        so, so_signal = running['stochastic'].update(high, low, close)
+        rows.append({
+            'rsi': running['rsi'].update(close),
+            'macd': macd_line,
+            'macd_signal': signal_line,
+            'so': so,
+            'so_signal': so_signal,
+            'wr': running['wr'].update(high, low, close),
+            'ema': running['ema'].update(close),
+            'sma': running['sma'].update(close),
+            'high': running['high'].update(high),
+        })
+    return pd.DataFrame(rows, index=data.index)
+
+def test_streaming_equals_batch_bar_for_bar():
+    data = bars()
+    expected = batch(data)
+    pd.testing.assert_frame_equal(stream(indicators(), data), expected, check_exact=True)
+
+@pytest.mark.parametrize('split', [5, 320, 701, 1200])
+def test_restored_states_continue_the_series(tmp_path, split):
+    data = bars()
+    running = indicators()
+    first = stream(running, data.iloc[:split])
+    save_states(str(tmp_path / 'live' / 'states.json'), running)
+    second = stream(load_states(str(tmp_path / 'live' / 'states.json')), data.iloc[split:])
+
+    pd.testing.assert_frame_equal(pd.concat([first, second]), batch(data), check_exact=True)
+    assert sorted(path.name for path in (tmp_path / 'live').iterdir()) == ['states.json']
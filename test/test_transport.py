@@ -0,0 +1,71 @@
+import os
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from fetcher import ResponseCache as response_cache
+from fetcher.Transport import HttpTransport
+from fetcher.ResponseCache import ResponseCache
+
+URL = 'https://api.example.com/v2/aggs'
+
+class StubSession:
+    """Answers every GET with a numbered body, counting the calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = f'{{"call": {self.calls}}}'.encode()
+        return response
+
+def stub_transport(tmp_path):
+    transport = HttpTransport(cache=ResponseCache(str(tmp_path / 'http')))
+    transport.session = StubSession()
+    return transport
+
+def test_ttl_zero_skips_cached_response(tmp_path):
+    transport = stub_transport(tmp_path)
+    assert transport.get(URL, ttl=None).json() == {'call': 1}
+    assert transport.get(URL, ttl=None).json() == {'call': 1}
+
+    assert transport.get(URL, ttl=0).json() == {'call': 2}
+    assert transport.cached(URL, ttl=0) is None
+    assert transport.session.calls == 2
+
+def test_entry_older_than_ttl_is_refetched(tmp_path, monkeypatch):
+    transport = stub_transport(tmp_path)
+    transport.get(URL, ttl=None)
+
+    now = time.time()
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now + 120)
+    assert transport.get(URL, ttl=300).json() == {'call': 1}
+    assert transport.get(URL, ttl=60).json() == {'call': 2}
+
+def test_offline_serves_expired_entries(tmp_path, monkeypatch):
+    transport = stub_transport(tmp_path)
+    transport.get(URL, ttl=60)
+
+    now = time.time()
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now + 120)
+    assert transport.cached(URL, ttl=60) is None
+    transport.offline = True
+    assert transport.get(URL, ttl=0).json() == {'call': 1}
+
+def test_concurrent_puts_leave_one_readable_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'http'))
+
+    def put(call):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = f'{{"call": {call}, "pad": "{"x" * 100000}"}}'.encode()
+        cache.put(URL, response, ttl=None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(put, range(32)))
+
+    assert cache.get(URL).json()['call'] in range(32)
+    files = [name for _, _, names in os.walk(tmp_path / 'http') for name in names]
+    assert sorted(os.path.splitext(name)[1] for name in files) == ['.gz', '.json']
@@ -0,0 +1,44 @@
+import pytest
+import pandas as pd
+import yfinance as yf
+from data.Store import BarStore
+from fetcher import Yahoo
+
+class StubTicker:
+    """Minute bars for SPY on weekdays; weekend ranges have no prices and BAD always errors.
+
+    As in yfinance, errors only raise with ``raise_errors``; otherwise they give an empty frame.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, start, end, interval, raise_errors=False, **kwargs):
+        days = [day for day in pd.date_range(start, end, inclusive='left') if day.weekday() < 5]
+        if self.symbol == 'BAD' or not days:
+            if not raise_errors:
+                return pd.DataFrame()
+            if self.symbol == 'BAD':
+                raise ConnectionError('connection reset')
+            raise yf.exceptions.YFPricesMissingError(self.symbol, f'{start} to {end}')
+        index = pd.DatetimeIndex([day + pd.Timedelta(hours=14, minutes=30) for day in days], tz='UTC')
+        return pd.DataFrame({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Adj Close': 1.0, 'Volume': 100}, index=index)
+
+@pytest.fixture
+def stub_ticker(monkeypatch):
+    monkeypatch.setattr(yf, 'Ticker', StubTicker)
+
+def test_empty_chunks_are_not_failures(stub_ticker):
+    # 2024-01-06..07 is a weekend: its chunk has no data
+    frames, failures = Yahoo.download_chunks(['SPY'], pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-08'), '1m',
+                                             chunk_days=1, max_retries=0)
+    assert failures == {}
+    assert len(frames['SPY']) == 5
+
+def test_failed_symbol_does_not_discard_others(stub_ticker, tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    with pytest.raises(RuntimeError, match='BAD'):
+        Yahoo.fetch_symbols(['SPY', 'BAD'], '2024-01-01', '2024-01-08', '1m', store=store, max_retries=0)
+    assert len(store.read('YAHOO', 'SPY', '1m')) == 5
+    with pytest.raises(FileNotFoundError):
+        store.read('YAHOO', 'BAD', '1m')
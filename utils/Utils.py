@@ -1,7 +1,9 @@
 import os
+import heapq
 import pandas as pd
 from datetime import datetime
 import matplotlib.pyplot as plt
+from data.Ingest import SCHEMAS, read_options
 from dateutil.relativedelta import relativedelta
 
 def total_months_month_array(from_date, to_date):
@@ -18,19 +20,69 @@ def total_months_month_array(from_date, to_date):
 
     return total_months, month_array
 
-def combine_csv_files_data(input_directory, output_file):
-
-    all_files = [os.path.join(input_directory, f) for f in os.listdir(input_directory) if f.endswith('.csv')]
-    all_data = []
-
-    for file in all_files:
-        df = pd.read_csv(file, parse_dates=['timestamp'])
-        all_data.append(df)
-
-    combined_df = pd.concat(all_data)
-    combined_df = combined_df.sort_values(by='timestamp')
-    combined_df.to_csv(output_file, index=False)
-    print(f"Combined data saved to {output_file} and started analyzation...")
+def combine_csv_files_data(input_directory, output_file, chunksize=100_000):
+    """Merge time-sorted CSV files into one sorted CSV without loading them all.
+
+    Each file is read in chunks and the chunks are merged through a heap keyed
+    on each chunk's last timestamp: every round writes all rows up to the
+    smallest of those timestamps, so memory stays bounded by chunksize x files.
+    Rows repeating an already written timestamp are dropped.
+    """
+    all_files = sorted(os.path.join(input_directory, f) for f in os.listdir(input_directory) if f.endswith('.csv'))
+
+    # Polygon files carry an int64 epoch 't' column: merge on it and copy the timestamp text through unparsed
+    if all_files and 't' in pd.read_csv(all_files[0], nrows=0).columns:
+        key = 't'
+        dtypes, _ = read_options(SCHEMAS['POLYGON'])
+        dtypes['timestamp'] = str
+        readers = [pd.read_csv(file, dtype=dtypes, chunksize=chunksize) for file in all_files]
+    else:
+        key = 'timestamp'
+        readers = [pd.read_csv(file, parse_dates=['timestamp'], chunksize=chunksize) for file in all_files]
+
+    def next_chunk(file_index):
+        for chunk in readers[file_index]:
+            if not chunk.empty:
+                return chunk
+        return None
+
+    heap = []
+    for file_index in range(len(readers)):
+        chunk = next_chunk(file_index)
+        if chunk is not None:
+            heapq.heappush(heap, (chunk[key].iloc[-1], file_index, chunk))
+
+    last_written = None
+    rows_written = 0
+    with open(output_file, 'w', newline='') as out:
+        while heap:
+            bound = heap[0][0]
+            batch, remaining = [], []
+            for _, file_index, chunk in sorted(heap, key=lambda entry: entry[1]):
+                ready = chunk[key] <= bound
+                batch.append(chunk[ready])
+                if ready.all():
+                    chunk = next_chunk(file_index)
+                    if chunk is not None:
+                        remaining.append((chunk[key].iloc[-1], file_index, chunk))
+                else:
+                    chunk = chunk[~ready]
+                    remaining.append((chunk[key].iloc[-1], file_index, chunk))
+            heap = remaining
+            heapq.heapify(heap)
+
+            merged = pd.concat(batch).sort_values(by=key, kind='stable')
+            merged = merged.drop_duplicates(subset=key, keep='first')
+            if last_written is not None:
+                merged = merged[merged[key] > last_written]
+            if merged.empty:
+                continue
+
+            merged.to_csv(out, header=rows_written == 0, index=False)
+            rows_written += len(merged)
+            last_written = merged[key].iloc[-1]
+
+    print(f"Combined {rows_written} rows from {len(all_files)} files into {output_file} and started analyzation...")
     print(f"For backtese use this data file: {output_file}")
 
 def custom_plot(results, trades, data, resample=None):
@@ -82,6 +134,15 @@ def convert_to_minutes(interval):
     else:
         raise ValueError("Unsupported interval format")
 
+def read_symbols(symbols=None, symbols_file=None):
+    """Collect symbols from a comma-separated string and/or a file with one symbol per line (``#`` comments)."""
+    collected = [symbol.strip() for symbol in (symbols or '').split(',')]
+    if symbols_file:
+        with open(symbols_file) as f:
+            collected += [line.split('#', 1)[0].strip() for line in f]
+    # Keep the first occurrence of each symbol, in order
+    return list(dict.fromkeys(symbol.upper() for symbol in collected if symbol))
+
 
 # interval_minutes = convert_to_minutes(interval)
 # if interval_minutes <= 30: